@@ -2,7 +2,6 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
 from django.urls import reverse
-from django.db.models import Avg, Count
 from decimal import Decimal
 from django import forms
 from .models import (
@@ -38,7 +37,7 @@ class CustomUserAdmin(UserAdmin):
         try:
             wallet = obj.wallet
             url = reverse('admin:accounts_wallet_change', args=[wallet.id])
-            return format_html('<a href="{}">${}</a>', url, wallet.balance)
+            return format_html('<a href="{}">${}</a>', url, wallet.total_balance)
         except Wallet.DoesNotExist:
             return "$0.00"
     wallet_balance.short_description = "Wallet Balance"
@@ -82,11 +81,11 @@ class WalletReceiveTransactionInline(admin.TabularInline):
 
 
 class WalletAdmin(admin.ModelAdmin):
-    list_display = ('user', 'balance', 'transaction_count', 'created_at', 'updated_at')
+    list_display = ('user', 'total_balance', 'shard_count', 'transaction_count', 'created_at', 'updated_at')
     search_fields = ('user__email', 'user__username')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('shard_count', 'created_at', 'updated_at')
     inlines = [WalletTransactionInline, WalletReceiveTransactionInline]
-    actions = ['add_funds', 'reset_balance']
+    actions = ['add_funds', 'reset_balance', 'enable_shards', 'disable_shards']
     
     def transaction_count(self, obj):
         """Count all transactions involving this wallet"""
@@ -105,12 +104,27 @@ class WalletAdmin(admin.ModelAdmin):
     def reset_balance(self, request, queryset):
         """Admin action to reset wallet balance to $0"""
         for wallet in queryset:
-            if wallet.balance > 0:
-                wallet.withdraw(wallet.balance)
-            elif wallet.balance < 0:
-                wallet.deposit(abs(wallet.balance))
+            balance = wallet.total_balance
+            if balance > 0:
+                wallet.withdraw(balance)
+            elif balance < 0:
+                wallet.deposit(abs(balance))
         self.message_user(request, f"Reset balance to $0.00 for {queryset.count()} wallets.")
     reset_balance.short_description = "Reset balance to $0"
+    
+    def enable_shards(self, request, queryset):
+        """Admin action to spread credits to busy wallets over 16 shards"""
+        for wallet in queryset:
+            wallet.set_shard_count(16)
+        self.message_user(request, f"Enabled 16 credit shards on {queryset.count()} wallets.")
+    enable_shards.short_description = "Enable credit shards for high-volume wallets"
+    
+    def disable_shards(self, request, queryset):
+        """Admin action to consolidate and remove credit shards"""
+        for wallet in queryset:
+            wallet.set_shard_count(0)
+        self.message_user(request, f"Disabled credit shards on {queryset.count()} wallets.")
+    disable_shards.short_description = "Disable credit shards"
 
 
 class TransactionAdmin(admin.ModelAdmin):
@@ -179,13 +193,16 @@ class ServiceAdmin(admin.ModelAdmin):
     list_display = ('name', 'business', 'category', 'avg_rating', 'review_count', 'created_at')
     list_filter = ('category', 'created_at', 'business__email')
     search_fields = ('name', 'description', 'business__email', 'business__username')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = (
+        'created_at', 'updated_at', 'rating_sum', 'rating_count', 'avg_rating',
+        'rating_0_count', 'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count'
+    )
     
     def avg_rating(self, obj):
         """Display average rating with star symbols"""
-        avg = obj.reviews.aggregate(Avg('rating'))['rating__avg']
-        if avg is None:
+        if not obj.rating_count:
             return "No ratings"
+        avg = obj.avg_rating
         
         # Round to nearest half star
         rounded = round(avg * 2) / 2
@@ -199,11 +216,13 @@ class ServiceAdmin(admin.ModelAdmin):
             
         return f"{stars} ({avg:.1f})"
     avg_rating.short_description = "Rating"
+    avg_rating.admin_order_field = 'avg_rating'
     
     def review_count(self, obj):
         """Display number of reviews for this service"""
-        return obj.reviews.count()
+        return obj.rating_count
     review_count.short_description = "Reviews"
+    review_count.admin_order_field = 'rating_count'
     
     def save_model(self, request, obj, form, change):
         """Handle validation errors gracefully"""
@@ -1,8 +1,8 @@
 from django.contrib import admin
 from django.core.exceptions import PermissionDenied
 from django.db import models
-from django.db.models import Sum, Count, Avg, Q
-from django.db.models.functions import TruncDay, TruncMonth
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDay
 from django.http import JsonResponse
 from django.template.response import TemplateResponse
 from django.urls import path
@@ -13,8 +13,10 @@ from django.utils.safestring import mark_safe
 
 from .models import (
     User, Service, Inquiry, Transaction,
-    Wallet, Review, Category
+    Wallet, Review, Category, WalletMonthlySummary
 )
+from .money import SumCents
+from .response_cache import cache_stats
 
 import datetime
 import json
@@ -65,15 +67,12 @@ class DashboardAdmin(admin.ModelAdmin):
         total_reviews = Review.objects.count() 
         
         # Get wallet statistics
-        wallet_sum = Wallet.objects.aggregate(Sum('balance'))['balance__sum'] or 0
+        wallet_cents = Wallet.objects.aggregate(total=SumCents('balance'))['total']
         
         # Get top-rated services
-        top_services = Service.objects.annotate(
-            avg_rating=Avg('reviews__rating'),
-            review_count=Count('reviews')
-        ).filter(
-            review_count__gt=0
-        ).order_by('-avg_rating')[:5]
+        top_services = Service.objects.filter(
+            rating_count__gt=0
+        ).order_by('-avg_rating', '-rating_count')[:5]
         
         # Get top categories
         top_categories = Category.objects.annotate(
@@ -96,7 +95,7 @@ class DashboardAdmin(admin.ModelAdmin):
                 'total_inquiries': total_inquiries,
                 'open_inquiries': open_inquiries,
                 'total_reviews': total_reviews,
-                'wallet_total': float(wallet_sum),
+                'wallet_total': wallet_cents / 100,
             },
             'top_services': top_services,
             'top_categories': top_categories,
@@ -168,17 +167,23 @@ class DashboardAdmin(admin.ModelAdmin):
         end_date = timezone.now()
         start_date = end_date - datetime.timedelta(days=180)
         
-        # Group transactions by month and type
-        monthly_transactions = Transaction.objects.filter(
-            created_at__gte=start_date,
-            created_at__lte=end_date
-        ).annotate(
-            month=TruncMonth('created_at')
+        # Group transactions by month and type from the monthly summaries.
+        # Deposits and transfers are totalled on the receiving wallet and
+        # withdrawals on the paying wallet, so each transaction counts once.
+        # Totals stay in integer cents until they are written out.
+        monthly_transactions = WalletMonthlySummary.objects.filter(
+            month__gte=start_date.date().replace(day=1),
+            month__lte=end_date.date()
         ).values('month', 'transaction_type').annotate(
-            count=Count('id'),
-            total=Sum('amount')
+            inflow=SumCents('inflow'),
+            outflow=SumCents('outflow')
         ).order_by('month', 'transaction_type')
         
+        totals = {}
+        for item in monthly_transactions:
+            side = 'outflow' if item['transaction_type'] == 'WITHDRAWAL' else 'inflow'
+            totals[(item['month'].strftime('%Y-%m'), item['transaction_type'])] = item[side]
+        
         # Format data for the chart
         months = []
         deposits = []
@@ -191,22 +196,9 @@ class DashboardAdmin(admin.ModelAdmin):
             months.append(current.strftime('%b %Y'))
             
             # Find data for this month
-            deposit_amount = 0
-            withdrawal_amount = 0
-            transfer_amount = 0
-            
-            for item in monthly_transactions:
-                if item['month'].strftime('%Y-%m') == month_str:
-                    if item['transaction_type'] == 'DEPOSIT':
-                        deposit_amount = float(item['total'])
-                    elif item['transaction_type'] == 'WITHDRAWAL':
-                        withdrawal_amount = float(item['total'])
-                    elif item['transaction_type'] == 'TRANSFER':
-                        transfer_amount = float(item['total'])
-            
-            deposits.append(deposit_amount)
-            withdrawals.append(withdrawal_amount)
-            transfers.append(transfer_amount)
+            deposits.append(totals.get((month_str, 'DEPOSIT'), 0) / 100)
+            withdrawals.append(totals.get((month_str, 'WITHDRAWAL'), 0) / 100)
+            transfers.append(totals.get((month_str, 'TRANSFER'), 0) / 100)
             
             # Move to next month
             if current.month == 12:
@@ -255,7 +247,8 @@ class DashboardAdmin(admin.ModelAdmin):
             'ratings': {
                 'labels': ratings,
                 'data': rating_counts,
-            }
+            },
+            'cache': cache_stats(),
         })
 
 # Don't register this as a model, it's just for the dashboard
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        # Connects the post_delete receivers that keep the statistics
+        # counters and registers the response cache's system check
+        from . import business_stats, response_cache  # noqa: F401
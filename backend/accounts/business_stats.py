@@ -0,0 +1,213 @@
+"""
+Incremental maintenance of the business dashboard statistics.
+
+ServiceViewSet.statistics reads three kinds of stored counters instead of
+counting services, inquiries, reviews and verifications on every load:
+
+    BusinessStats       totals per business, one row read by primary key
+    Service             per-service inquiry and verified customer counts,
+                        next to the rating aggregates of apply_rating_changes
+    BusinessDailyStats  new bookings, reviews and verifications per business
+                        and day, for the dashboard time series
+
+Writes move the counters with F() expressions inside the transaction that
+made the change, so concurrent writers never overwrite each other. Missing
+rows are inserted empty with ignore_conflicts first, which is safe when two
+writers create the same row; decrements never insert, since a missing row
+(say, one deleted along with its business) has nothing to take away from.
+Daily rows record activity on the day it happened: deleting an inquiry or
+review later lowers the totals but does not rewrite the series.
+
+Deleted inquiries and verifications are counted by post_delete receivers,
+which also run for cascades such as deleting a customer. Rows deleted along
+with their service are skipped: Service.delete removes everything counted
+for it at once. Bulk writes that bypass the model methods (bulk_create,
+QuerySet.delete of services) are not counted; rebuild_business_stats
+recomputes everything.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import BusinessDailyStats, BusinessStats, Inquiry, Review, Service, VerifiedServiceCustomer
+from .prefetch import related_count
+
+STATS_FIELDS = ['active_listings', 'total_bookings', 'total_reviews', 'rating_sum', 'verified_customers']
+DAILY_FIELDS = ['bookings', 'reviews', 'rating_sum', 'verified_customers']
+SERVICE_FIELDS = ['inquiry_count', 'verified_customer_count']
+
+
+def increment(model, lookups, deltas, **values):
+    """
+    Add deltas to the row matching lookups, creating it first if missing.
+
+    values are assigned along with the increments.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    changes.update(values)
+    if not model.objects.filter(**lookups).update(**changes) and max(deltas.values()) > 0:
+        model.objects.bulk_create([model(**lookups)], ignore_conflicts=True)
+        model.objects.filter(**lookups).update(**changes)
+
+
+def record_business(business_id, **deltas):
+    """Move the BusinessStats totals of one business"""
+    # update() skips auto_now
+    increment(BusinessStats, {'business_id': business_id}, deltas, updated_at=timezone.now())
+
+
+def record_day(business_id, moment, **deltas):
+    """Add activity that happened at moment to the business's daily row"""
+    increment(BusinessDailyStats, {'business_id': business_id, 'day': timezone.localdate(moment)}, deltas)
+
+
+def record_booking(service, delta, created_at=None):
+    """
+    Count an added (delta 1) or removed (delta -1) inquiry about service.
+
+    created_at is given for new inquiries, which also count as activity on
+    that day.
+    """
+    increment(Service, {'pk': service.pk}, {'inquiry_count': delta})
+    record_business(service.business_id, total_bookings=delta)
+    if created_at is not None:
+        record_day(service.business_id, created_at, bookings=delta)
+
+
+def record_verification(service, delta, verified_at=None):
+    """Count an added or removed verified customer of service, like record_booking"""
+    increment(Service, {'pk': service.pk}, {'verified_customer_count': delta})
+    record_business(service.business_id, verified_customers=delta)
+    if verified_at is not None:
+        record_day(service.business_id, verified_at, verified_customers=delta)
+
+
+def record_ratings(per_service):
+    """
+    Apply rating aggregate changes of apply_rating_changes to the businesses.
+
+    Args:
+        per_service: Dict mapping service id to (review count delta,
+            rating sum delta)
+    """
+    per_business = defaultdict(Counter)
+    owners = Service.objects.filter(pk__in=per_service).values_list('pk', 'business_id')
+    for service_id, business_id in owners:
+        count, rating = per_service[service_id]
+        per_business[business_id]['total_reviews'] += count
+        per_business[business_id]['rating_sum'] += rating
+    # Ascending id order, like apply_rating_changes, so writers never deadlock
+    for business_id in sorted(per_business):
+        record_business(business_id, **per_business[business_id])
+
+
+def service_totals(counters):
+    """BusinessStats deltas for a whole service with the given counters"""
+    return {
+        'active_listings': 1,
+        'total_bookings': counters['inquiry_count'],
+        'total_reviews': counters['rating_count'],
+        'rating_sum': counters['rating_sum'],
+        'verified_customers': counters['verified_customer_count'],
+    }
+
+
+def record_listing(business_id, counters, delta):
+    """Add (delta 1) or remove (delta -1) a service and everything counted for it"""
+    record_business(business_id, **{field: value * delta for field, value in service_totals(counters).items()})
+
+
+def counted_service(instance, origin):
+    """
+    The service a deleted row was counted for, or None if it needs no recording.
+
+    Rows deleted by their service's delete() were removed from the totals
+    by record_listing.
+    """
+    if isinstance(origin, Service) and origin.pk == instance.service_id:
+        return None
+    return Service.objects.filter(pk=instance.service_id).only('pk', 'business_id').first()
+
+
+@receiver(post_delete, sender=Inquiry)
+def inquiry_deleted(sender, instance, origin=None, **kwargs):
+    service = counted_service(instance, origin)
+    if service is not None:
+        record_booking(service, -1)
+
+
+@receiver(post_delete, sender=VerifiedServiceCustomer)
+def verification_deleted(sender, instance, origin=None, **kwargs):
+    service = counted_service(instance, origin)
+    if service is not None:
+        record_verification(service, -1)
+
+
+def aggregate_stats():
+    """
+    Compute every counter from the source tables.
+
+    Returns:
+        (BusinessStats values by business id, Service counters by service id,
+        BusinessDailyStats values by (business id, day))
+    """
+    services = {
+        row['pk']: row for row in Service.objects.annotate(
+            inquiry_total=related_count(Inquiry.objects.all(), 'service'),
+            verification_total=related_count(VerifiedServiceCustomer.objects.all(), 'service')
+        ).values('pk', 'business_id', 'inquiry_total', 'verification_total', 'rating_count', 'rating_sum')
+    }
+    per_service = {
+        service_id: {'inquiry_count': row['inquiry_total'], 'verified_customer_count': row['verification_total']}
+        for service_id, row in services.items()
+    }
+
+    totals = defaultdict(Counter)
+    for row in services.values():
+        totals[row['business_id']].update(service_totals({
+            **per_service[row['pk']],
+            'rating_count': row['rating_count'],
+            'rating_sum': row['rating_sum'],
+        }))
+
+    daily = defaultdict(Counter)
+    sources = [
+        (Inquiry.objects.all(), 'created_at', {'bookings': Count('pk')}),
+        (Review.objects.all(), 'created_at', {'reviews': Count('pk'), 'rating_sum': Sum('rating')}),
+        (VerifiedServiceCustomer.objects.all(), 'verified_at', {'verified_customers': Count('pk')}),
+    ]
+    for queryset, field, aggregates in sources:
+        rows = queryset.annotate(day=TruncDate(field)).values('service__business_id', 'day').annotate(
+            **aggregates
+        ).order_by()
+        for row in rows:
+            daily[(row['service__business_id'], row['day'])].update(
+                {name: row[name] for name in aggregates}
+            )
+
+    return (
+        {business_id: dict(counts) for business_id, counts in totals.items()},
+        per_service,
+        {key: dict(counts) for key, counts in daily.items()},
+    )
+
+
+def current_stats():
+    """Return the stored counters keyed like aggregate_stats()"""
+    totals = {
+        row.pop('business_id'): row
+        for row in BusinessStats.objects.values('business_id', *STATS_FIELDS)
+    }
+    per_service = {row.pop('pk'): row for row in Service.objects.values('pk', *SERVICE_FIELDS)}
+    daily = {
+        (row.pop('business_id'), row.pop('day')): row
+        for row in BusinessDailyStats.objects.values('business_id', 'day', *DAILY_FIELDS)
+    }
+    return totals, per_service, daily
@@ -0,0 +1,134 @@
+"""
+Conditional GET support for the read endpoints in accounts.views.
+
+ConditionalGetMixin answers list and retrieve requests carrying
+If-None-Match (or If-Modified-Since, for details) with 304 Not Modified
+before anything is serialized. The validators are cheap:
+
+    list      Max(updated_at) and the row count of the filtered queryset,
+              so edits, additions and deletions all change the ETag
+    retrieve  the object's updated_at, which get_object() already loaded
+
+Related rows a serializer nests (messages, comments) are covered by
+validator_related, which adds their latest timestamp, count and, for
+models with is_read, unread count, in one extra query.
+
+Views whose responses are cached under version counters (see
+accounts.response_cache) supply get_version_validators() instead, so
+validating a request needs no database query at all; such ETags come
+without Last-Modified.
+
+ETags are weak (the representation is not hashed) and private to the
+requesting user, since querysets and some fields depend on who is asking.
+"""
+import hashlib
+
+from django.db.models import Count, Max, Q
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified validators for list and retrieve.
+
+    Attributes:
+        validator_field: Timestamp field bumped on every change of the model
+        validator_related: Reverse relation name -> timestamp field of the
+            related rows included in the representation
+    """
+    validator_field = 'updated_at'
+    validator_related = {}
+
+    def get_related_validators(self, parents):
+        """Latest timestamp and counts of the validator_related rows of parents"""
+        values = {}
+        model = parents.model
+        for name, field in self.validator_related.items():
+            relation = model._meta.get_field(name)
+            aggregates = {'last_modified': Max(field), 'count': Count('pk')}
+            if any(related.name == 'is_read' for related in relation.related_model._meta.fields):
+                aggregates['unread'] = Count('pk', filter=Q(is_read=False))
+            values[name] = relation.related_model._default_manager.filter(
+                **{f'{relation.field.name}__in': parents.order_by().values('pk')}
+            ).aggregate(**aggregates)
+        return values
+
+    def get_version_validators(self):
+        """Validators from counters the view maintains, or None to query the rows"""
+        # Provided by mixins later in the MRO, such as VersionedCacheMixin
+        parent = getattr(super(), 'get_version_validators', None)
+        return parent() if parent else None
+
+    def get_list_validators(self, queryset):
+        """Values that change whenever the list representation may"""
+        validators = queryset.order_by().aggregate(
+            last_modified=Max(self.validator_field),
+            count=Count('pk')
+        )
+        validators.update(self.get_related_validators(queryset))
+        return validators
+
+    def get_object_validators(self, instance):
+        """Values that change whenever the detail representation may"""
+        validators = {'last_modified': getattr(instance, self.validator_field)}
+        validators.update(self.get_related_validators(type(instance)._default_manager.filter(pk=instance.pk)))
+        return validators
+
+    def make_etag(self, kind, validators):
+        parts = [
+            kind,
+            str(self.request.user.pk),
+            getattr(self.request, 'accepted_renderer', None) and self.request.accepted_renderer.format,
+            repr(sorted(validators.items())),
+        ]
+        return 'W/"%s"' % hashlib.sha1('\n'.join(map(str, parts)).encode()).hexdigest()
+
+    def conditional_response(self, etag, last_modified=None):
+        """304 response when the client's copy is current, else None"""
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        return get_conditional_response(self.request, etag=etag, last_modified=timestamp)
+
+    def set_validators(self, response, etag, last_modified=None):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Revalidate on every use; the representation is per user
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def get_object(self):
+        # retrieve() loads the object for its validators before the
+        # serializing handler asks for it again
+        if not hasattr(self, '_conditional_object'):
+            self._conditional_object = super().get_object()
+        return self._conditional_object
+
+    def list(self, request, *args, **kwargs):
+        validators = self.get_version_validators()
+        if validators is None:
+            validators = self.get_list_validators(self.filter_queryset(self.get_queryset()))
+        etag = self.make_etag('list', validators)
+        # Lists only send an ETag: a deletion does not move Max(updated_at),
+        # so If-Modified-Since alone could miss it
+        not_modified = self.conditional_response(etag)
+        if not_modified is not None:
+            return not_modified
+        return self.set_validators(super().list(request, *args, **kwargs), etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        validators = self.get_version_validators()
+        if validators is not None:
+            last_modified = None
+        else:
+            validators = self.get_object_validators(self.get_object())
+            timestamps = [validators['last_modified']] + [
+                validators[name]['last_modified'] for name in self.validator_related
+            ]
+            last_modified = max(filter(None, timestamps))
+        etag = self.make_etag('retrieve', validators)
+        not_modified = self.conditional_response(etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        return self.set_validators(super().retrieve(request, *args, **kwargs), etag, last_modified)
@@ -0,0 +1,54 @@
+"""
+Sparse fieldsets for read endpoints.
+
+    ?fields=id,name,fixed_price    only these fields
+    ?omit=description              every field but these
+
+Serializers with SparseFieldsetMixin drop the other fields, so nothing is
+computed for them (image URLs, method fields). OptimizedQuerysetMixin (see
+accounts.prefetch) prunes the queryset to match: joins and prefetches
+only serve selected fields, and columns are limited with only().
+
+Only GET and HEAD are affected; a write always validates every field.
+Names the serializer does not have are ignored, and nested serializers
+keep all their fields.
+"""
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def split_names(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def sparse_fieldset(request, names):
+    """The subset of field names request selects, or None when it does not choose"""
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = request.query_params
+    if FIELDS_PARAM not in params and OMIT_PARAM not in params:
+        return None
+    selected = set(names)
+    if params.get(FIELDS_PARAM):
+        selected &= split_names(params[FIELDS_PARAM])
+    selected -= split_names(params.get(OMIT_PARAM, ''))
+    return frozenset(selected)
+
+
+class SparseFieldsetMixin:
+    """Serializer fields trimmed by the request's ?fields= and ?omit="""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+        selected = sparse_fieldset(self.context.get('request'), fields)
+        if selected is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in selected}
@@ -0,0 +1,110 @@
+"""
+Idempotency-Key support for money-moving endpoints.
+
+Clients that retry a request on timeout send the same ``Idempotency-Key``
+header with every attempt. The first attempt inserts an IdempotencyKey row
+and runs the view inside the same database transaction; the response is
+stored on the row before the transaction commits.
+
+A concurrent duplicate tries to insert the same (user, key) row and blocks on
+the unique index until the first attempt finishes:
+- if the first attempt committed, the insert fails and the stored response is
+  replayed without touching any Wallet rows;
+- if the first attempt rolled back, the insert succeeds and the duplicate runs
+  the operation itself.
+
+Keys are kept for settings.IDEMPOTENCY_KEY_TTL seconds. Every
+IdempotencyKey.PURGE_EVERY inserts, the expired ones are purged once the
+request's transaction commits; the purge_idempotency_keys command does the
+same on a schedule.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(request):
+    """Hash of the method, path and body, used to detect a reused key"""
+    payload = json.dumps(
+        [request.method, request.path, request.data],
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def idempotent(view_func):
+    """
+    Make a view replay its stored response for a repeated Idempotency-Key.
+
+    Works on function views (below @api_view) and on APIView methods.
+    Requests without the header run normally. Server errors are not stored,
+    so they can be retried.
+    """
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        request = next(arg for arg in args if isinstance(arg, Request))
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_func(*args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fingerprint = request_fingerprint(request)
+
+        with transaction.atomic():
+            try:
+                # Blocks while another attempt holding the same key is in flight
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=request.user,
+                        key=key,
+                        fingerprint=fingerprint
+                    )
+            except IntegrityError:
+                record = None
+            else:
+                if record.pk % IdempotencyKey.PURGE_EVERY == 0:
+                    transaction.on_commit(IdempotencyKey.purge_expired)
+
+            if record is not None:
+                response = view_func(*args, **kwargs)
+
+                if response.status_code >= 500:
+                    transaction.set_rollback(True)
+                    return response
+
+                record.response_status = response.status_code
+                record.response_body = response.data
+                record.save(update_fields=['response_status', 'response_body'])
+                return response
+
+        # The key belongs to a committed attempt, read it outside the
+        # transaction that failed to insert it
+        record = IdempotencyKey.objects.get(user=request.user, key=key)
+        if record.fingerprint != fingerprint:
+            return Response(
+                {'error': f'{IDEMPOTENCY_HEADER} has already been used for a different request'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+
+        response = Response(record.response_body, status=record.response_status)
+        response[REPLAY_HEADER] = 'true'
+        return response
+
+    return wrapper
@@ -0,0 +1,222 @@
+"""
+Image variants rendered off the request path.
+
+Uploads are stored as they come; VariantImageField rejects any larger than
+MAX_ORIGINAL_SIZE from the image header alone, which bounds what is served
+until the variants exist. Saving a model whose image changed clears the
+image's variants and queues an ImageJob; the process_images command
+claims queued jobs, renders the boxes listed in the model's IMAGE_VARIANTS
+in a process pool and records the stored names in the image's
+<field>_variants column:
+
+    {"48": "profile_images/variants/photo_48.jpg", "96": ..., "256": ..., "512": ...}
+
+VariantImageField serves the smallest variant at least as wide as it asks
+for, and the original until that variant is ready, so a request never
+waits for Pillow. List serializers ask for the 48 and 96 pixel thumbnails
+of avatars, detail serializers for the full sizes. Variants are JPEGs: transparency is flattened onto white
+and images are padded to their box.
+
+The queue is worked by process_images: the web container starts it in
+the background when RUN_IMAGE_WORKER is set (see docker-entrypoint.sh),
+and docker-compose runs it as its own service.
+"""
+import os
+from datetime import timedelta
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image
+from rest_framework import serializers
+
+BACKGROUND = (255, 255, 255)
+JPEG_QUALITY = 90
+# Failed renders are retried this many times in total
+MAX_ATTEMPTS = 3
+# A job running for longer is assumed to belong to a dead worker
+STALE_AFTER_SECONDS = 600
+# Longest side of an uploaded original; larger uploads are rejected
+MAX_ORIGINAL_SIZE = 2048
+
+
+def variants_field(field):
+    """Name of the column holding the variants of image field"""
+    return f'{field}_variants'
+
+
+def flatten(image):
+    """image as RGB, with any transparency composited onto BACKGROUND"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, BACKGROUND)
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def fit(image, box):
+    """image scaled down to fit box, centred on a box-sized background"""
+    image = image.copy()
+    image.thumbnail(box, Image.LANCZOS)
+    if image.size != tuple(box):
+        background = Image.new('RGB', box, BACKGROUND)
+        background.paste(image, ((box[0] - image.size[0]) // 2, (box[1] - image.size[1]) // 2))
+        image = background
+    return image
+
+
+def render_variants(name, boxes):
+    """
+    Render the stored image name at every (width, height) in boxes.
+
+    Runs in the worker processes, so it touches storage but not the database.
+
+    Returns:
+        Dict mapping each width, as a string, to the stored variant's name
+    """
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    with default_storage.open(name) as source, Image.open(source) as image:
+        image = flatten(image)
+    variants = {}
+    for width, height in boxes:
+        output = BytesIO()
+        fit(image, (width, height)).save(output, format='JPEG', quality=JPEG_QUALITY)
+        variants[str(width)] = default_storage.save(
+            os.path.join(directory, 'variants', f'{stem}_{width}.jpg'), ContentFile(output.getvalue())
+        )
+    return variants
+
+
+def pick_variant(variants, width):
+    """Name of the smallest variant at least width wide, or None"""
+    widths = sorted(int(size) for size in variants if int(size) >= width)
+    return variants[str(widths[0])] if widths else None
+
+
+def changed_images(instance, previous, save_kwargs):
+    """
+    Image fields of instance that differ from previous and will be saved.
+
+    previous is instance.stored_values(): the stored names by field, or None
+    for a new row.
+    The variants of changed fields are cleared, and added to save_kwargs'
+    update_fields if it has them.
+    """
+    update_fields = save_kwargs.get('update_fields')
+    changed = []
+    for field in instance.IMAGE_VARIANTS:
+        if update_fields is not None and field not in update_fields:
+            continue
+        stored = (previous or {}).get(field) or ''
+        file = getattr(instance, field)
+        if stored != (file.name or ''):
+            setattr(instance, variants_field(field), {})
+            changed.append(field)
+    if changed and update_fields is not None:
+        save_kwargs['update_fields'] = [*update_fields, *map(variants_field, changed)]
+    return changed
+
+
+def queue_variants(instance, fields):
+    """Queue the variants of the saved images in fields, replacing queued jobs for older uploads"""
+    from .models import ImageJob
+    for field in fields:
+        lookups = {'model': instance._meta.label_lower, 'object_id': instance.pk, 'field': field}
+        ImageJob.objects.filter(status=ImageJob.Status.PENDING, **lookups).delete()
+        name = getattr(instance, field).name
+        if name:
+            ImageJob.objects.create(source=name, **lookups)
+
+
+def claim_jobs(limit):
+    """Mark up to limit queued or stale jobs as running and return them"""
+    from .models import ImageJob
+    now = timezone.now()
+    stale = now - timedelta(seconds=STALE_AFTER_SECONDS)
+    with transaction.atomic():
+        jobs = list(
+            ImageJob.objects.select_for_update(skip_locked=True).filter(
+                Q(status=ImageJob.Status.PENDING) | Q(status=ImageJob.Status.RUNNING, started_at__lt=stale)
+            ).order_by('created_at')[:limit]
+        )
+        ImageJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=ImageJob.Status.RUNNING, started_at=now, attempts=F('attempts') + 1
+        )
+    return jobs
+
+
+def job_boxes(job):
+    return apps.get_model(job.model).IMAGE_VARIANTS[job.field]
+
+
+def store_variants(job, variants):
+    """
+    Record rendered variants on the job's row, if it still shows the job's source.
+
+    An image replaced or removed meanwhile gets its own job; the variants
+    of the old one are left for collect_media, as other rows may share them.
+    """
+    from .response_cache import invalidate_labels, invalidate_services
+    model = apps.get_model(job.model)
+    values = {variants_field(job.field): variants}
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        # Moves the ETags of responses showing the row
+        values['updated_at'] = timezone.now()
+    with transaction.atomic():
+        stored = model.objects.filter(pk=job.object_id, **{job.field: job.source}).update(**values)
+        job.delete()
+    if not stored:
+        return False
+    if job.model == 'accounts.service':
+        invalidate_services([job.object_id])
+    elif job.model == 'accounts.user':
+        # Business images are shown on every cached service response
+        invalidate_labels()
+    return True
+
+
+def fail_job(job, error):
+    """Queue the job again, or mark it failed after MAX_ATTEMPTS"""
+    from .models import ImageJob
+    attempts = job.attempts + 1
+    status = ImageJob.Status.FAILED if attempts >= MAX_ATTEMPTS else ImageJob.Status.PENDING
+    ImageJob.objects.filter(pk=job.pk).update(status=status, error=str(error)[:1000])
+    return status
+
+
+class VariantImageField(serializers.ImageField):
+    """
+    ImageField rendered as the URL of a variant at least width pixels wide.
+
+    Falls back to the original while the variants are being rendered. Without
+    width it is a plain ImageField. Uploads larger than MAX_ORIGINAL_SIZE are
+    rejected.
+    """
+
+    def __init__(self, *args, width=None, **kwargs):
+        self.width = width
+        super().__init__(*args, **kwargs)
+
+    def to_internal_value(self, data):
+        file = super().to_internal_value(data)
+        # Django's ImageField has only parsed the header: no pixels are decoded here
+        width, height = file.image.size
+        if max(width, height) > MAX_ORIGINAL_SIZE:
+            raise serializers.ValidationError(
+                f'Images can be at most {MAX_ORIGINAL_SIZE}x{MAX_ORIGINAL_SIZE} pixels.'
+            )
+        return file
+
+    def to_representation(self, value):
+        if value and self.width is not None:
+            variants = getattr(value.instance, variants_field(value.field.name), None) or {}
+            name = pick_variant(variants, self.width)
+            if name:
+                value = value.field.attr_class(value.instance, value.field, name)
+        return super().to_representation(value)
@@ -0,0 +1,330 @@
+"""
+Wallet ledger engine.
+
+All balance changes are applied as single conditional UPDATE statements,
+e.g. ``UPDATE ... SET balance = balance - x WHERE id = ... AND balance >= x``,
+so the database itself enforces that a wallet can never go negative. There is
+no SELECT ... FOR UPDATE followed by a re-read: each leg of an operation is
+one round-trip, and the row lock taken by the UPDATE is held until the
+surrounding transaction commits.
+
+Operations touching several wallets apply their legs in ascending wallet id
+order, so two concurrent transfers between the same wallets always lock the
+rows in the same order and cannot deadlock each other.
+
+Wallets with shard_count > 0 take credits on a random WalletShard row instead
+of the wallet row, so many concurrent payments to one recipient spread their
+row locks over several rows. A debit that the wallet row cannot cover first
+consolidates the shards back into it under lock.
+"""
+import random
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, F, Value, When
+from django.utils import timezone
+
+from .models import Wallet, WalletShard, Transaction
+from .money import to_cents
+from .summaries import record_transactions
+
+
+class InsufficientFunds(ValueError):
+    """Raised when a conditional debit does not match the wallet row"""
+
+    def __init__(self, message="Insufficient funds"):
+        super().__init__(message)
+
+
+def to_amount(amount):
+    """
+    Normalise an amount to a positive Decimal.
+
+    Raises:
+        ValueError: If the amount is zero or negative
+    """
+    if not isinstance(amount, Decimal):
+        amount = Decimal(str(amount))
+
+    if amount <= Decimal('0'):
+        raise ValueError("Amount must be positive")
+
+    return amount
+
+
+MAX_SHARDS = 64
+
+
+def credit(wallet_id, amount, shard_count=0):
+    """
+    Add amount to a wallet with a single UPDATE statement.
+
+    Sharded wallets are credited on a random shard row. If that shard has
+    been removed in the meantime the wallet row is credited instead.
+    """
+    if shard_count:
+        credited = WalletShard.objects.filter(
+            wallet_id=wallet_id,
+            index=random.randrange(shard_count)
+        ).update(balance=F('balance') + to_cents(amount))
+        if credited:
+            return
+
+    updated = Wallet.objects.filter(pk=wallet_id).update(
+        balance=F('balance') + to_cents(amount),
+        updated_at=timezone.now()
+    )
+    if not updated:
+        raise Wallet.DoesNotExist(f"Wallet {wallet_id} does not exist")
+
+
+def debit(wallet_id, amount):
+    """
+    Subtract amount from a wallet with a single conditional UPDATE statement.
+
+    If the wallet row alone cannot cover the amount, credits waiting in its
+    shards are consolidated into it and the debit is retried once.
+
+    Raises:
+        InsufficientFunds: If the wallet balance is lower than amount
+    """
+    def conditional_debit():
+        return Wallet.objects.filter(pk=wallet_id, balance__gte=amount).update(
+            balance=F('balance') - to_cents(amount),
+            updated_at=timezone.now()
+        )
+
+    if conditional_debit():
+        return
+    if not consolidate(wallet_id) or not conditional_debit():
+        raise InsufficientFunds()
+
+
+def consolidate(wallet_id):
+    """
+    Move every shard balance of a wallet into the wallet row.
+
+    Locks the wallet row, then its shards in index order. Must be called
+    inside transaction.atomic().
+
+    Returns:
+        The amount moved
+    """
+    list(Wallet.objects.select_for_update().filter(pk=wallet_id).values_list('pk', flat=True))
+    shards = list(
+        WalletShard.objects.select_for_update()
+        .filter(wallet_id=wallet_id)
+        .order_by('index')
+        .values_list('pk', 'balance')
+    )
+
+    total = sum((balance for _, balance in shards), Decimal('0'))
+    if not total:
+        return total
+
+    WalletShard.objects.filter(pk__in=[pk for pk, balance in shards if balance]).update(balance=Decimal('0'))
+    Wallet.objects.filter(pk=wallet_id).update(
+        balance=F('balance') + to_cents(total),
+        updated_at=timezone.now()
+    )
+    return total
+
+
+def set_shard_count(wallet, shard_count):
+    """
+    Enable, resize or disable (shard_count=0) credit shards for a wallet.
+
+    Existing shard balances are consolidated into the wallet row first, so no
+    funds are left behind on removed shards.
+    """
+    if not 0 <= shard_count <= MAX_SHARDS:
+        raise ValueError(f"Shard count must be between 0 and {MAX_SHARDS}")
+
+    with transaction.atomic():
+        consolidate(wallet.pk)
+        WalletShard.objects.filter(wallet=wallet, index__gte=shard_count).delete()
+        WalletShard.objects.bulk_create(
+            [WalletShard(wallet=wallet, index=index) for index in range(shard_count)],
+            ignore_conflicts=True
+        )
+        Wallet.objects.filter(pk=wallet.pk).update(shard_count=shard_count)
+        wallet.shard_count = shard_count
+        refresh_balances(wallet)
+
+
+def apply_legs(legs, shard_counts=None):
+    """
+    Apply a set of balance changes in deterministic lock order.
+
+    Must be called inside transaction.atomic() so that a failing leg rolls
+    back the legs already applied.
+
+    Args:
+        legs: Iterable of (wallet_id, delta) pairs. Deltas for the same
+            wallet are netted before being applied.
+        shard_counts: Optional dict of wallet_id to shard_count for sharded
+            wallets
+    """
+    shard_counts = shard_counts or {}
+    net = {}
+    for wallet_id, delta in legs:
+        net[wallet_id] = net.get(wallet_id, Decimal('0')) + delta
+
+    for wallet_id in sorted(net):
+        delta = net[wallet_id]
+        if delta > 0:
+            credit(wallet_id, delta, shard_counts.get(wallet_id, 0))
+        elif delta < 0:
+            debit(wallet_id, -delta)
+
+
+def refresh_balances(*wallets):
+    """Reload balance and updated_at for the given wallet instances in one query"""
+    rows = Wallet.objects.filter(
+        pk__in=[wallet.pk for wallet in wallets]
+    ).values_list('pk', 'balance', 'updated_at')
+
+    current = {pk: (balance, updated_at) for pk, balance, updated_at in rows}
+    for wallet in wallets:
+        if wallet.pk in current:
+            wallet.balance, wallet.updated_at = current[wallet.pk]
+
+
+def deposit(wallet, amount):
+    """Credit a wallet and record a DEPOSIT transaction"""
+    amount = to_amount(amount)
+
+    with transaction.atomic():
+        credit(wallet.pk, amount, wallet.shard_count)
+        tx = Transaction.objects.create(
+            to_wallet=wallet,
+            amount=amount,
+            transaction_type=Transaction.TransactionType.DEPOSIT
+        )
+        refresh_balances(wallet)
+
+    return tx
+
+
+def withdraw(wallet, amount):
+    """Debit a wallet and record a WITHDRAWAL transaction"""
+    amount = to_amount(amount)
+
+    with transaction.atomic():
+        debit(wallet.pk, amount)
+        tx = Transaction.objects.create(
+            from_wallet=wallet,
+            amount=amount,
+            transaction_type=Transaction.TransactionType.WITHDRAWAL
+        )
+        refresh_balances(wallet)
+
+    return tx
+
+
+def transfer(from_wallet, to_wallet, amount):
+    """Move funds between two wallets and record a TRANSFER transaction"""
+    amount = to_amount(amount)
+
+    if from_wallet.pk == to_wallet.pk:
+        raise ValueError("Cannot transfer to the same wallet")
+
+    with transaction.atomic():
+        apply_legs(
+            [
+                (from_wallet.pk, -amount),
+                (to_wallet.pk, amount),
+            ],
+            {to_wallet.pk: to_wallet.shard_count}
+        )
+        tx = Transaction.objects.create(
+            from_wallet=from_wallet,
+            to_wallet=to_wallet,
+            amount=amount,
+            transaction_type=Transaction.TransactionType.TRANSFER
+        )
+        refresh_balances(from_wallet, to_wallet)
+
+    return tx
+
+
+def batch_transfer(from_wallet, payouts, chunk_size=500):
+    """
+    Pay many wallets from one wallet in a single database transaction.
+
+    All wallets involved are locked up front in ascending id order, the
+    sender is debited the total with one conditional UPDATE, recipients are
+    credited with one CASE UPDATE per chunk and the Transaction rows are
+    written with bulk_create, so the number of queries does not grow with
+    the number of payouts (beyond a few statements per chunk).
+
+    Args:
+        from_wallet: The paying wallet
+        payouts: List of (to_wallet_id, amount) pairs, one per Transaction
+        chunk_size: Maximum wallets per credit UPDATE and rows per INSERT
+
+    Raises:
+        ValueError: If the list is empty, an amount is not positive or the
+            sender pays itself
+        InsufficientFunds: If the sender cannot cover the total
+    """
+    if not payouts:
+        raise ValueError("At least one transfer is required")
+
+    payouts = [(wallet_id, to_amount(amount)) for wallet_id, amount in payouts]
+
+    credits = {}
+    for wallet_id, amount in payouts:
+        if wallet_id == from_wallet.pk:
+            raise ValueError("Cannot transfer to the same wallet")
+        credits[wallet_id] = credits.get(wallet_id, Decimal('0')) + amount
+    total = sum(credits.values(), Decimal('0'))
+
+    with transaction.atomic():
+        # Take every row lock in the same order apply_legs would
+        shard_counts = dict(
+            Wallet.objects.select_for_update()
+            .filter(pk__in=[from_wallet.pk, *credits])
+            .order_by('pk')
+            .values_list('pk', 'shard_count')
+        )
+        missing = set(credits) - set(shard_counts)
+        if missing:
+            raise Wallet.DoesNotExist(f"Wallets {sorted(missing)} do not exist")
+
+        debit(from_wallet.pk, total)
+
+        # Sharded recipients are credited on their shards, the rest in bulk
+        for wallet_id in sorted(credits):
+            if shard_counts[wallet_id]:
+                credit(wallet_id, credits[wallet_id], shard_counts[wallet_id])
+
+        now = timezone.now()
+        wallet_ids = sorted(wallet_id for wallet_id in credits if not shard_counts[wallet_id])
+        for start in range(0, len(wallet_ids), chunk_size):
+            chunk = wallet_ids[start:start + chunk_size]
+            Wallet.objects.filter(pk__in=chunk).update(
+                balance=F('balance') + Case(
+                    *[When(pk=wallet_id, then=Value(to_cents(credits[wallet_id]))) for wallet_id in chunk],
+                    output_field=BigIntegerField()
+                ),
+                updated_at=now
+            )
+
+        transactions = Transaction.objects.bulk_create(
+            [
+                Transaction(
+                    from_wallet=from_wallet,
+                    to_wallet_id=wallet_id,
+                    amount=amount,
+                    transaction_type=Transaction.TransactionType.TRANSFER
+                )
+                for wallet_id, amount in payouts
+            ],
+            batch_size=chunk_size
+        )
+        # bulk_create bypasses Transaction.save, so record the summaries here
+        record_transactions(transactions)
+        refresh_balances(from_wallet)
+
+    return transactions
@@ -0,0 +1,53 @@
+"""
+Rebuild the item-to-item service recommendations from inquiries and reviews.
+
+    python manage.py build_recommendations
+    python manage.py build_recommendations --top-k 10 --min-support 2
+
+Meant to run periodically (e.g. nightly from cron); the similar services
+endpoint serves the table written by the last run.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import recommendations
+
+
+class Command(BaseCommand):
+    help = "Compute the most similar services of every service and store them for /api/services/{id}/similar/"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=recommendations.TOP_K,
+            help="Neighbours kept per service"
+        )
+        parser.add_argument(
+            '--min-support',
+            type=int,
+            default=recommendations.MIN_SUPPORT,
+            help="Customers two services must share to count as similar"
+        )
+
+    def handle(self, *args, **options):
+        if options['top_k'] < 1 or options['min_support'] < 1:
+            raise CommandError("--top-k and --min-support must be positive")
+
+        started = time.perf_counter()
+        customers, services, weights = recommendations.load_interactions()
+        loaded = time.perf_counter()
+        self.stdout.write(f"Read {len(customers)} interactions in {loaded - started:.1f}s")
+
+        neighbours = recommendations.neighbours(
+            customers, services, weights, options['top_k'], options['min_support']
+        )
+        computed = time.perf_counter()
+        backend = "NumPy" if recommendations.numpy is not None else "pure Python"
+        self.stdout.write(f"Computed neighbours of {len(neighbours)} services with {backend} in {computed - loaded:.1f}s")
+
+        written = recommendations.store_neighbours(neighbours)
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {written} similarities in {time.perf_counter() - computed:.1f}s"
+        ))
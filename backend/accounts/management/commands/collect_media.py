@@ -0,0 +1,112 @@
+"""
+Remove media files no row references.
+
+    python manage.py collect_media --dry-run     # list what would be removed
+    python manage.py collect_media               # remove it
+    python manage.py collect_media --legacy      # also files saved before hashing
+
+Referenced names are read by streaming every file field of every model,
+the <field>_variants columns of models with IMAGE_VARIANTS and the sources
+of queued image jobs. Storage is then walked and content-addressed blobs
+(see accounts.storage) outside that set are removed, along with abandoned
+partial writes. Once the walk is done the referenced names are read a
+second time and candidates named since the first scan are dropped; files
+modified within --grace-hours are kept, checked again just before removal,
+so uploads and renders whose rows are not committed yet survive.
+"""
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+from django.utils import timezone
+
+from accounts.images import variants_field
+from accounts.models import ImageJob
+from accounts.storage import is_content_addressed, is_temporary
+
+
+def referenced_names(chunk_size=2000):
+    """Every media name stored in the database"""
+    names = set()
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField):
+                names.update(
+                    model._base_manager.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True})
+                    .values_list(field.name, flat=True).order_by().iterator(chunk_size=chunk_size)
+                )
+        for field in getattr(model, 'IMAGE_VARIANTS', {}):
+            for variants in model._base_manager.values_list(variants_field(field), flat=True).order_by().iterator(
+                chunk_size=chunk_size
+            ):
+                names.update((variants or {}).values())
+    names.update(ImageJob.objects.values_list('source', flat=True).order_by().iterator(chunk_size=chunk_size))
+    return names
+
+
+def stored_names(storage, directory=''):
+    """Every file in storage under directory, walked lazily"""
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield f'{directory}/{name}' if directory else name
+    for child in directories:
+        yield from stored_names(storage, f'{directory}/{child}' if directory else child)
+
+
+class Command(BaseCommand):
+    help = "Remove content-addressed media files that no database row references"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only list the files that would be removed"
+        )
+        parser.add_argument(
+            '--grace-hours',
+            type=float,
+            default=24,
+            help="Keep files modified more recently than this"
+        )
+        parser.add_argument(
+            '--legacy',
+            action='store_true',
+            help="Also remove unreferenced files saved before content addressing"
+        )
+
+    def handle(self, *args, **options):
+        if options['grace_hours'] < 0:
+            raise CommandError("--grace-hours must not be negative")
+
+        storage = default_storage
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        referenced = referenced_names()
+        self.stdout.write(f"{len(referenced)} media files are referenced")
+
+        candidates = [
+            name for name in stored_names(storage)
+            if name not in referenced
+            and (is_content_addressed(name) or is_temporary(name) or options['legacy'])
+            and storage.get_modified_time(name) <= cutoff
+        ]
+        # Rows committed during the walk may name candidates by now
+        referenced = referenced_names()
+
+        removed = freed = 0
+        for name in candidates:
+            if name in referenced or storage.get_modified_time(name) > cutoff:
+                continue
+            size = storage.size(name)
+            if options['dry_run']:
+                self.stdout.write(name)
+            elif hasattr(storage, 'purge'):
+                storage.purge(name)
+            else:
+                storage.delete(name)
+            removed += 1
+            freed += size
+
+        verb = "Would remove" if options['dry_run'] else "Removed"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} files ({freed} bytes)"))
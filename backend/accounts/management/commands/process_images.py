@@ -0,0 +1,136 @@
+"""
+Render the size variants of uploaded images.
+
+    python manage.py process_images                # work the queue until stopped
+    python manage.py process_images --once         # exit when the queue is empty
+    python manage.py process_images --backfill     # queue images missing a variant
+
+--backfill --once renders the variants of existing images, e.g. after a
+box is added to a model's IMAGE_VARIANTS, and exits.
+
+Resizing runs in a pool of --workers processes; this process claims the
+jobs and records the results, so the pool never touches the database.
+Several workers can share the queue: claimed jobs are skipped by the others
+on databases with SELECT ... SKIP LOCKED.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from accounts import images
+from accounts.models import ImageJob
+
+
+class InlineExecutor:
+    """Stands in for the pool with --workers 0"""
+
+    def map(self, function, *iterables):
+        return map(function, *iterables)
+
+    def shutdown(self):
+        pass
+
+
+def render(name, boxes):
+    """images.render_variants, returning the exception instead of raising it"""
+    try:
+        return images.render_variants(name, boxes)
+    except Exception as error:
+        return error
+
+
+class Command(BaseCommand):
+    help = "Render the queued image variants in a process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Resizing processes (0 resizes in this process)"
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=50,
+            help="Jobs claimed at a time"
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Exit when the queue is empty instead of polling"
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help="Seconds to wait when the queue is empty"
+        )
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help="First queue every image missing one of its model's variants"
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 0 or options['batch'] < 1:
+            raise CommandError("--workers must not be negative and --batch must be positive")
+
+        if options['backfill']:
+            self.stdout.write(f"Queued {self.backfill()} images")
+
+        if options['workers']:
+            # Forked processes must not share this process's connections
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup)
+        else:
+            executor = InlineExecutor()
+
+        stored = failed = 0
+        try:
+            while True:
+                jobs = images.claim_jobs(options['batch'])
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                results = executor.map(
+                    render, [job.source for job in jobs], [images.job_boxes(job) for job in jobs]
+                )
+                for job, result in zip(jobs, results):
+                    if isinstance(result, Exception):
+                        failed += 1
+                        status = images.fail_job(job, result)
+                        self.stderr.write(f"{job}: {result} ({status.label})")
+                    else:
+                        stored += images.store_variants(job, result)
+        finally:
+            executor.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f"Stored the variants of {stored} images, {failed} renders failed"))
+
+    def backfill(self):
+        """Queue a job for every stored image missing a variant, unless one is queued"""
+        queued = 0
+        for model in apps.get_app_config('accounts').get_models():
+            label = model._meta.label_lower
+            for field, boxes in getattr(model, 'IMAGE_VARIANTS', {}).items():
+                queued_ids = set(ImageJob.objects.filter(
+                    model=label, field=field, status__in=[ImageJob.Status.PENDING, ImageJob.Status.RUNNING]
+                ).values_list('object_id', flat=True))
+                rows = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).exclude(
+                    **{f'{images.variants_field(field)}__has_keys': [str(width) for width, _ in boxes]}
+                ).values_list('pk', field)
+                jobs = [
+                    ImageJob(model=label, object_id=pk, field=field, source=name)
+                    for pk, name in rows.iterator(chunk_size=1000) if pk not in queued_ids
+                ]
+                ImageJob.objects.bulk_create(jobs, batch_size=1000)
+                queued += len(jobs)
+        return queued
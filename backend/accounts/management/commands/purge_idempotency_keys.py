@@ -0,0 +1,40 @@
+"""
+Delete Idempotency-Key records past their replay window.
+
+    python manage.py purge_idempotency_keys --dry-run   # count what would go
+    python manage.py purge_idempotency_keys             # delete it
+
+Keys older than settings.IDEMPOTENCY_KEY_TTL seconds are deleted in chunks,
+so the command can run on a schedule without long locks.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses older than IDEMPOTENCY_KEY_TTL"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only count the expired keys"
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help="Keys deleted per statement"
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        if options['dry_run']:
+            self.stdout.write(f"Would purge {IdempotencyKey.expired().count()} idempotency keys")
+            return
+
+        purged = IdempotencyKey.purge_expired(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} idempotency keys"))
@@ -0,0 +1,78 @@
+"""
+Rebuild and verify the business dashboard counters from the source tables.
+
+    python manage.py rebuild_business_stats            # rebuild, then verify
+    python manage.py rebuild_business_stats --verify   # only report drift
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.business_stats import (
+    DAILY_FIELDS, SERVICE_FIELDS, STATS_FIELDS, aggregate_stats, current_stats
+)
+from accounts.models import BusinessDailyStats, BusinessStats, Service
+
+
+def normalize(entries, fields):
+    """Map keys to value tuples in fields order, dropping rows that are all zero"""
+    rows = {key: tuple(values.get(field, 0) for field in fields) for key, values in entries.items()}
+    return {key: values for key, values in rows.items() if any(values)}
+
+
+class Command(BaseCommand):
+    help = "Rebuild the business statistics counters and verify them against services, inquiries and reviews"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="Only compare the stored counters with the source tables, do not rebuild"
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            with transaction.atomic():
+                totals, per_service, daily = aggregate_stats()
+                BusinessStats.objects.all().delete()
+                BusinessStats.objects.bulk_create(
+                    [BusinessStats(business_id=business_id, **values) for business_id, values in totals.items()],
+                    batch_size=1000
+                )
+                Service.objects.bulk_update(
+                    [Service(pk=service_id, **values) for service_id, values in per_service.items()],
+                    SERVICE_FIELDS,
+                    batch_size=1000
+                )
+                BusinessDailyStats.objects.all().delete()
+                BusinessDailyStats.objects.bulk_create(
+                    [
+                        BusinessDailyStats(business_id=business_id, day=day, **values)
+                        for (business_id, day), values in daily.items()
+                    ],
+                    batch_size=1000
+                )
+            self.stdout.write(
+                f"Rebuilt stats of {len(totals)} businesses, {len(per_service)} services and {len(daily)} days"
+            )
+
+        mismatches = 0
+        tables = zip(
+            ("Business", "Service", "Day"),
+            (STATS_FIELDS, SERVICE_FIELDS, DAILY_FIELDS),
+            aggregate_stats(),
+            current_stats()
+        )
+        for label, fields, expected, stored in tables:
+            expected, stored = normalize(expected, fields), normalize(stored, fields)
+            for key in sorted(set(expected) | set(stored)):
+                if expected.get(key) != stored.get(key):
+                    mismatches += 1
+                    self.stdout.write(
+                        f"{label} {key}: stored {stored.get(key)}, expected {expected.get(key)} "
+                        f"({', '.join(fields)})"
+                    )
+
+        if mismatches:
+            raise CommandError(f"{mismatches} statistics rows do not match the source tables")
+
+        self.stdout.write(self.style.SUCCESS("Verified the business statistics against the source tables"))
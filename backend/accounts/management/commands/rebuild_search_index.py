@@ -0,0 +1,20 @@
+"""
+Rebuild the service full-text search index.
+
+Needed after writes that bypass Service.save, such as bulk_create or
+QuerySet.update:
+
+    python manage.py rebuild_search_index
+"""
+from django.core.management.base import BaseCommand
+
+from accounts.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Reindex every service in the full-text search backend"
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the {type(backend).__name__} index"))
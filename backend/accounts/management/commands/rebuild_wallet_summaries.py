@@ -0,0 +1,85 @@
+"""
+Rebuild and verify the WalletMonthlySummary table from the Transaction ledger.
+
+    python manage.py rebuild_wallet_summaries            # rebuild, then verify
+    python manage.py rebuild_wallet_summaries --verify   # only report drift
+
+A rebuild locks every wallet and shard row until it has been verified, so
+ledger writes wait for it. --verify takes no locks, so writes committing
+while it reads can show up as drift.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import Wallet, WalletMonthlySummary, WalletShard
+from accounts.money import from_cents
+from accounts.summaries import aggregate_ledger, current_summaries
+
+
+def describe(entry):
+    """Format a [count, inflow cents, outflow cents] entry"""
+    if entry is None:
+        return "none"
+    count, inflow, outflow = entry
+    return f"{count} transactions, in {from_cents(inflow)}, out {from_cents(outflow)}"
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-wallet monthly transaction summaries and verify them against the ledger"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="Only compare the stored summaries with the ledger, do not rebuild"
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            self.verify()
+            return
+
+        with transaction.atomic():
+            # A ledger write updates a wallet or one of its shards before
+            # inserting its Transaction. Holding every wallet lock, then every
+            # shard lock (in ledger.consolidate's order), keeps new
+            # transactions out until the rebuild is verified and committed
+            list(Wallet.objects.select_for_update().order_by('pk').values_list('pk', flat=True))
+            list(WalletShard.objects.select_for_update().order_by('wallet_id', 'index').values_list('pk', flat=True))
+            WalletMonthlySummary.objects.all().delete()
+            WalletMonthlySummary.objects.bulk_create(
+                [
+                    WalletMonthlySummary(
+                        wallet_id=wallet_id,
+                        month=month,
+                        transaction_type=tx_type,
+                        count=count,
+                        inflow=from_cents(inflow),
+                        outflow=from_cents(outflow)
+                    )
+                    for (wallet_id, month, tx_type), (count, inflow, outflow) in aggregate_ledger().items()
+                ],
+                batch_size=1000
+            )
+            self.stdout.write(f"Rebuilt {WalletMonthlySummary.objects.count()} summary rows")
+            self.verify()
+
+    def verify(self):
+        """Compare the stored summaries with the ledger, raising CommandError on drift"""
+        expected = aggregate_ledger()
+        stored = current_summaries()
+
+        mismatches = 0
+        for key in sorted(set(expected) | set(stored)):
+            if expected.get(key) != stored.get(key):
+                mismatches += 1
+                wallet_id, month, tx_type = key
+                self.stdout.write(
+                    f"Wallet {wallet_id} {month:%Y-%m} {tx_type}: "
+                    f"stored {describe(stored.get(key))}, ledger {describe(expected.get(key))}"
+                )
+
+        if mismatches:
+            raise CommandError(f"{mismatches} summary rows do not match the ledger")
+
+        self.stdout.write(self.style.SUCCESS(f"Verified {len(stored)} summary rows against the ledger"))
@@ -0,0 +1,109 @@
+"""
+Verify wallet balances against the Transaction ledger.
+
+Only the transactions after each wallet's last BalanceCheckpoint are
+replayed, and wallet id ranges are processed by parallel worker processes.
+
+    python manage.py reconcile_wallets --workers 8 --report discrepancies.csv
+    python manage.py reconcile_wallets --full      # ignore checkpoints
+"""
+import csv
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from accounts.models import Wallet
+from accounts.reconciliation import (
+    reconcile_range, save_checkpoints, settled_high_water_mark, wallet_id_ranges
+)
+
+REPORT_FIELDS = ['wallet_id', 'email', 'balance', 'expected', 'difference', 'checkpoint_pk']
+
+
+class Command(BaseCommand):
+    help = "Incrementally reconcile wallet balances with the transaction ledger"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Number of worker processes")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Wallet ids per work unit")
+        parser.add_argument(
+            '--settle-seconds',
+            type=int,
+            default=60,
+            help="Only checkpoint transactions older than this, so in-flight ones are never skipped"
+        )
+        parser.add_argument('--full', action='store_true', help="Ignore checkpoints and replay the whole ledger")
+        parser.add_argument('--no-checkpoint', action='store_true', help="Do not write new checkpoints")
+        parser.add_argument('--report', help="Write the discrepancy report to this CSV file ('-' for stdout)")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        high_water = settled_high_water_mark(options['settle_seconds'])
+        ranges = wallet_id_ranges(options['chunk_size'])
+
+        discrepancies = []
+        checkpoints = []
+        for range_discrepancies, range_checkpoints in self.run_ranges(ranges, high_water, options):
+            discrepancies += range_discrepancies
+            checkpoints += range_checkpoints
+
+        if not options['no_checkpoint']:
+            save_checkpoints(checkpoints)
+
+        if discrepancies:
+            emails = dict(
+                Wallet.objects.filter(
+                    pk__in=[row['wallet_id'] for row in discrepancies]
+                ).values_list('pk', 'user__email')
+            )
+            for row in discrepancies:
+                row['email'] = emails.get(row['wallet_id'])
+            discrepancies.sort(key=lambda row: row['wallet_id'])
+
+        if options['report']:
+            self.write_report(options['report'], discrepancies)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Checked {len(ranges)} wallet ranges up to transaction {high_water} in {elapsed:.2f}s: "
+            f"{len(checkpoints)} checkpoints written, {len(discrepancies)} discrepancies"
+        )
+
+        if discrepancies:
+            for row in discrepancies[:20]:
+                self.stdout.write(
+                    f"  wallet {row['wallet_id']} ({row['email']}): balance {row['balance']}, "
+                    f"ledger {row['expected']}, difference {row['difference']}"
+                )
+            raise CommandError(f"{len(discrepancies)} wallets do not match the ledger")
+
+        self.stdout.write(self.style.SUCCESS("All wallets reconcile"))
+
+    def run_ranges(self, ranges, high_water, options):
+        args = [(low, high, high_water, options['full']) for low, high in ranges]
+
+        # Workers are forked so they inherit the configured Django setup
+        can_fork = 'fork' in multiprocessing.get_all_start_methods()
+        if options['workers'] <= 1 or len(ranges) <= 1 or not can_fork:
+            return [reconcile_range(*item) for item in args]
+
+        # Close the parent's connections first so no worker shares a socket
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=options['workers'],
+            mp_context=multiprocessing.get_context('fork')
+        ) as executor:
+            return list(executor.map(reconcile_range, *zip(*args)))
+
+    def write_report(self, path, discrepancies):
+        output = self.stdout if path == '-' else open(path, 'w', newline='')
+        try:
+            writer = csv.DictWriter(output, fieldnames=REPORT_FIELDS, lineterminator='\n')
+            writer.writeheader()
+            writer.writerows(discrepancies)
+        finally:
+            if output is not self.stdout:
+                output.close()
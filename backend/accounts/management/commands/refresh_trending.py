@@ -0,0 +1,21 @@
+"""
+Refresh the trending scores of services and blog posts.
+
+Run periodically, e.g. every 15 minutes from cron:
+
+    python manage.py refresh_trending
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.trending import refresh
+
+
+class Command(BaseCommand):
+    help = "Decay the trending scores and add the inquiries, reviews, comments and views since the last refresh"
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        refresh()
+        self.stdout.write(self.style.SUCCESS(f"Refreshed the trending scores in {time.perf_counter() - started:.1f}s"))
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0022_servicereport'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['from_wallet', 'created_at'], name='tx_from_wallet_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['to_wallet', 'created_at'], name='tx_to_wallet_created_idx'),
+        ),
+    ]
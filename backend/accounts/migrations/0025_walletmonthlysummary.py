@@ -0,0 +1,75 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:53
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_summaries(apps, schema_editor):
+    """Aggregate the existing ledger into monthly summary rows"""
+    Transaction = apps.get_model('accounts', 'Transaction')
+    WalletMonthlySummary = apps.get_model('accounts', 'WalletMonthlySummary')
+
+    totals = {}
+    for field, index in (('to_wallet', 1), ('from_wallet', 2)):
+        rows = Transaction.objects.filter(
+            **{f'{field}__isnull': False}
+        ).annotate(
+            month=TruncMonth('created_at', output_field=DateField())
+        ).values(field, 'month', 'transaction_type').annotate(
+            count=Count('id'),
+            total=Sum('amount')
+        ).order_by()
+
+        for row in rows:
+            entry = totals.setdefault(
+                (row[field], row['month'], row['transaction_type']),
+                [0, Decimal('0'), Decimal('0')]
+            )
+            entry[0] += row['count']
+            entry[index] += row['total']
+
+    WalletMonthlySummary.objects.bulk_create(
+        [
+            WalletMonthlySummary(
+                wallet_id=wallet_id,
+                month=month,
+                transaction_type=tx_type,
+                count=count,
+                inflow=inflow,
+                outflow=outflow
+            )
+            for (wallet_id, month, tx_type), (count, inflow, outflow) in totals.items()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0024_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletMonthlySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('transaction_type', models.CharField(choices=[('DEPOSIT', 'Deposit'), ('WITHDRAWAL', 'Withdrawal'), ('TRANSFER', 'Transfer')], max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('inflow', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('outflow', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_summaries', to='accounts.wallet')),
+            ],
+            options={
+                'ordering': ['-month', 'transaction_type'],
+                'indexes': [models.Index(fields=['month', 'transaction_type'], name='summary_month_type_idx')],
+                'constraints': [models.UniqueConstraint(fields=('wallet', 'month', 'transaction_type'), name='unique_wallet_month_type')],
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
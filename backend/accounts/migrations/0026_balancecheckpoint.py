@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:02
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0025_walletmonthlysummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_transaction_pk', models.BigIntegerField(default=0, help_text='Highest Transaction id included in the balance')),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('wallet', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='balance_checkpoint', to='accounts.wallet')),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:08
+
+import accounts.identifiers
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0027_wallet_shards'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='conversation',
+            name='conversation_id',
+            field=models.UUIDField(default=accounts.identifiers.uuid7, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='conversationmessage',
+            name='message_id',
+            field=models.UUIDField(default=accounts.identifiers.uuid7, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='paymentrequest',
+            name='request_id',
+            field=models.UUIDField(default=accounts.identifiers.uuid7, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='supportticket',
+            name='ticket_id',
+            field=models.UUIDField(default=accounts.identifiers.uuid7, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='transaction_id',
+            field=models.UUIDField(default=accounts.identifiers.uuid7, editable=False, unique=True),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:12
+
+import accounts.money
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Round
+
+# (model, field, has default) for every amount moved to integer cents
+MONEY_FIELDS = [
+    ('wallet', 'balance', True),
+    ('walletshard', 'balance', True),
+    ('transaction', 'amount', False),
+    ('walletmonthlysummary', 'inflow', True),
+    ('walletmonthlysummary', 'outflow', True),
+    ('balancecheckpoint', 'balance', True),
+    ('service', 'fixed_price', True),
+    ('paymentrequest', 'amount', False),
+]
+
+
+def copy_to_cents(apps, schema_editor):
+    """Fill each new cents column from its decimal column"""
+    for model_name, field, _ in MONEY_FIELDS:
+        model = apps.get_model('accounts', model_name)
+        model.objects.update(**{f'{field}_cents': Round(F(field) * 100)})
+
+
+def copy_from_cents(apps, schema_editor):
+    """Fill each decimal column back from its cents column"""
+    for model_name, field, _ in MONEY_FIELDS:
+        model = apps.get_model('accounts', model_name)
+        model.objects.update(**{field: F(f'{field}_cents') * Decimal('0.01')})
+
+
+def money_operations():
+    add, relax, remove, rename, alter = [], [], [], [], []
+    for model_name, field, has_default in MONEY_FIELDS:
+        if has_default:
+            new_field = accounts.money.MoneyField(default=Decimal('0.00'))
+        else:
+            new_field = accounts.money.MoneyField(null=True)
+        add.append(migrations.AddField(model_name=model_name, name=f'{field}_cents', field=new_field))
+        remove.append(migrations.RemoveField(model_name=model_name, name=field))
+        rename.append(migrations.RenameField(model_name=model_name, old_name=f'{field}_cents', new_name=field))
+        if not has_default:
+            # Lets the decimal column be re-added to a non-empty table when
+            # the migration is reversed
+            relax.append(migrations.AlterField(
+                model_name=model_name,
+                name=field,
+                field=models.DecimalField(max_digits=10, decimal_places=2, null=True)
+            ))
+            alter.append(migrations.AlterField(model_name=model_name, name=field, field=accounts.money.MoneyField()))
+    return [
+        *add,
+        *relax,
+        migrations.RunPython(copy_to_cents, copy_from_cents),
+        *remove,
+        *rename,
+        *alter,
+        migrations.AlterField(
+            model_name='service',
+            name='fixed_price',
+            field=accounts.money.MoneyField(default=Decimal('0.00'), help_text='Fixed price to open an inquiry chat (0 for free)'),
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0028_uuid7_identifiers'),
+    ]
+
+    operations = money_operations()
@@ -0,0 +1,86 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:21
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_ratings(apps, schema_editor):
+    """Compute the rating aggregates of every reviewed service"""
+    Review = apps.get_model('accounts', 'Review')
+    Service = apps.get_model('accounts', 'Service')
+
+    aggregates = {}
+    rows = Review.objects.values('service_id', 'rating').annotate(count=Count('pk')).order_by()
+    for row in rows:
+        entry = aggregates.setdefault(row['service_id'], {'rating_sum': 0, 'rating_count': 0})
+        entry['rating_sum'] += row['rating'] * row['count']
+        entry['rating_count'] += row['count']
+        entry[f"rating_{row['rating']}_count"] = row['count']
+
+    for service_id, entry in aggregates.items():
+        entry['avg_rating'] = round(entry['rating_sum'] / entry['rating_count'], 2)
+        Service.objects.filter(pk=service_id).update(**entry)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0029_money_cents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='avg_rating',
+            field=models.FloatField(default=0, help_text='Average review rating (0 without reviews)'),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_0_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['avg_rating', 'rating_count'], name='service_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['rating_count'], name='service_review_count_idx'),
+        ),
+    ]
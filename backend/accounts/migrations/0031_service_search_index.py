@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:31
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """Create the full-text index used by accounts.search for this database"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(
+            "ALTER TABLE accounts_service ADD FULLTEXT INDEX service_fulltext_idx (name, description)"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE accounts_service_fts USING fts5(name, description)"
+        )
+        schema_editor.execute(
+            "INSERT INTO accounts_service_fts (rowid, name, description) "
+            "SELECT id, name, description FROM accounts_service"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute("ALTER TABLE accounts_service DROP INDEX service_fulltext_idx")
+    elif vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE accounts_service_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0030_service_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
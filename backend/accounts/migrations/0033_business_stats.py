@@ -0,0 +1,109 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def build_stats(apps, schema_editor):
+    """Count the existing services, inquiries, reviews and verifications"""
+    Service = apps.get_model('accounts', 'Service')
+    Inquiry = apps.get_model('accounts', 'Inquiry')
+    Review = apps.get_model('accounts', 'Review')
+    VerifiedServiceCustomer = apps.get_model('accounts', 'VerifiedServiceCustomer')
+    BusinessStats = apps.get_model('accounts', 'BusinessStats')
+    BusinessDailyStats = apps.get_model('accounts', 'BusinessDailyStats')
+
+    def count(model):
+        counts = model.objects.filter(service=OuterRef('pk')).order_by().values('service').annotate(
+            total=Count('pk')
+        ).values('total')
+        return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+    Service.objects.update(inquiry_count=count(Inquiry), verified_customer_count=count(VerifiedServiceCustomer))
+
+    totals = Service.objects.values('business_id').annotate(
+        active_listings=Count('pk'),
+        total_bookings=Sum('inquiry_count'),
+        total_reviews=Sum('rating_count'),
+        rating_sum=Sum('rating_sum'),
+        verified_customers=Sum('verified_customer_count')
+    ).order_by()
+    BusinessStats.objects.bulk_create([BusinessStats(**row) for row in totals], batch_size=1000)
+
+    daily = {}
+    sources = [
+        (Inquiry, 'created_at', {'bookings': Count('pk')}),
+        (Review, 'created_at', {'reviews': Count('pk'), 'rating_sum': Sum('rating')}),
+        (VerifiedServiceCustomer, 'verified_at', {'verified_customers': Count('pk')}),
+    ]
+    for model, field, aggregates in sources:
+        rows = model.objects.annotate(day=TruncDate(field)).values('service__business_id', 'day').annotate(
+            **aggregates
+        ).order_by()
+        for row in rows:
+            daily.setdefault((row['service__business_id'], row['day']), {}).update(
+                {name: row[name] for name in aggregates}
+            )
+    BusinessDailyStats.objects.bulk_create(
+        [
+            BusinessDailyStats(business_id=business_id, day=day, **values)
+            for (business_id, day), values in daily.items()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0032_catalogchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusinessStats',
+            fields=[
+                ('business', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='business_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('active_listings', models.PositiveIntegerField(default=0)),
+                ('total_bookings', models.PositiveIntegerField(default=0)),
+                ('total_reviews', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('verified_customers', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Business stats',
+            },
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='inquiry_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='verified_customer_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='BusinessDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('reviews', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('verified_customers', models.PositiveIntegerField(default=0)),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Business daily stats',
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('business', 'day'), name='unique_business_day')],
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0033_business_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField(help_text="Cosine similarity of the services' customers")),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='accounts.service')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.service')),
+            ],
+            options={
+                'verbose_name_plural': 'Service similarities',
+                'ordering': ['service', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('service', 'rank'), name='unique_service_rank')],
+            },
+        ),
+    ]
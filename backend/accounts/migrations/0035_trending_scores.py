@@ -0,0 +1,56 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_trends(apps, schema_editor):
+    """Give every existing service and blog post its score row"""
+    Service = apps.get_model('accounts', 'Service')
+    ServiceTrend = apps.get_model('accounts', 'ServiceTrend')
+    BlogPost = apps.get_model('accounts', 'BlogPost')
+    BlogPostTrend = apps.get_model('accounts', 'BlogPostTrend')
+
+    ServiceTrend.objects.bulk_create(
+        [ServiceTrend(service_id=pk) for pk in Service.objects.values_list('pk', flat=True)],
+        batch_size=1000
+    )
+    # Past views have no timestamps, so they do not count as recent
+    BlogPostTrend.objects.bulk_create(
+        [BlogPostTrend(post_id=pk, views_seen=views) for pk, views in BlogPost.objects.values_list('pk', 'views')],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0034_servicesimilarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlogPostTrend',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trend', serialize=False, to='accounts.blogpost')),
+                ('score', models.FloatField(default=0)),
+                ('views_seen', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField(blank=True, help_text='Last refresh that scored this row', null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-score'], name='blog_trend_score_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ServiceTrend',
+            fields=[
+                ('service', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trend', serialize=False, to='accounts.service')),
+                ('score', models.FloatField(default=0)),
+                ('computed_at', models.DateTimeField(blank=True, help_text='Last refresh that scored this row', null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-score'], name='service_trend_score_idx')],
+            },
+        ),
+        migrations.RunPython(create_trends, migrations.RunPython.noop),
+    ]
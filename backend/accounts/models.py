@@ -4,61 +4,16 @@ from django.db import models, transaction
 from decimal import Decimal
 from django.contrib.auth.models import AbstractUser, UserManager as DjangoUserManager
 from django.contrib.auth.hashers import make_password
-from django.db.models import DO_NOTHING
+from django.db.models import DO_NOTHING, F
+from django.db.models.functions import Cast, Round
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
-from PIL import Image
-from io import BytesIO
-from django.core.files.uploadedfile import InMemoryUploadedFile
-import uuid
-import sys
-import os
-
-def resize_image(image_field, size=(512, 512)):
-    """
-    Resizes an image to the specified size and standardizes the format.
-    Used for profile images and service logos.
-    
-    Args:
-        image_field: The image field to resize
-        size: Tuple of (width, height) for the output image
-        
-    Returns:
-        The resized image as an InMemoryUploadedFile
-    """
-    if not image_field:
-        return None
-        
-    img = Image.open(image_field)
-    
-    # Convert to RGB if image is RGBA (has transparency)
-    if img.mode == 'RGBA':
-        img = img.convert('RGB')
-    
-    # Resize the image while maintaining aspect ratio
-    img.thumbnail(size, Image.LANCZOS)
-    
-    # If the image is not square, create a square image with white background
-    if img.size[0] != img.size[1]:
-        background = Image.new('RGB', size, (255, 255, 255))
-        offset = ((size[0] - img.size[0]) // 2, (size[1] - img.size[1]) // 2)
-        background.paste(img, offset)
-        img = background
-    
-    # Save the image to a BytesIO object
-    output = BytesIO()
-    img.save(output, format='JPEG', quality=90)
-    output.seek(0)
-    
-    # Create a new Django image object
-    return InMemoryUploadedFile(
-        output,
-        'ImageField',
-        f"{os.path.splitext(image_field.name)[0]}.jpg",
-        'image/jpeg',
-        sys.getsizeof(output),
-        None
-    )
+from .identifiers import uuid7
+from .money import MoneyField
+from .tracking import TrackedFieldsMixin
 
 class UserManager(DjangoUserManager):
     """Custom user manager that handles wallet creation"""
@@ -107,7 +62,7 @@ class UserManager(DjangoUserManager):
         return self._create_user(username, email, password, **extra_fields)
 
 
-class User(AbstractUser):
+class User(TrackedFieldsMixin, AbstractUser):
     """
     Custom User model that uses email for authentication
     """
@@ -136,7 +91,13 @@ class User(AbstractUser):
         upload_to='profile_images/',
         null=True,
         blank=True,
-        help_text="User's profile avatar (512x512)"
+        help_text="User's profile avatar, as uploaded"
+    )
+    profile_image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Resized copies of the profile image by width (see accounts.images)"
     )
     
     # Optional biography
@@ -161,6 +122,10 @@ class User(AbstractUser):
     # Use our custom manager that handles wallet creation
     objects = UserManager()
     
+    # (width, height) boxes rendered by accounts.images for each image field
+    IMAGE_VARIANTS = {'profile_image': [(48, 48), (96, 96), (256, 256), (512, 512)]}
+    TRACKED_FIELDS = ['profile_image']
+    
     # Make email the username field for authentication
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']  # Still required for admin creation
@@ -177,13 +142,30 @@ class User(AbstractUser):
         return self.role == self.Role.MODERATOR
         
     def save(self, *args, **kwargs):
-        """Override save method to resize profile image"""
-        if self.profile_image:
-            # Check if this is a new image or it has been changed
-            if not self.pk or User.objects.get(pk=self.pk).profile_image != self.profile_image:
-                self.profile_image = resize_image(self.profile_image)
+        """Override save method to queue the variants of a new profile image"""
+        from .images import changed_images, queue_variants
+        changed = changed_images(self, self.stored_values(), kwargs)
         
         super().save(*args, **kwargs)
+        queue_variants(self, changed)
+        
+        # Business usernames are suggested by the service search box, and
+        # names and images are shown on every cached service response
+        update_fields = kwargs.get('update_fields')
+        if self.role == self.Role.BUSINESS:
+            from .response_cache import invalidate_labels
+            if update_fields is None or 'username' in update_fields:
+                CatalogChange.record(CatalogChange.Kind.BUSINESS, self.pk)
+            if update_fields is None or {'username', 'profile_image'} & set(update_fields):
+                invalidate_labels()
+    
+    def delete(self, *args, **kwargs):
+        from .response_cache import invalidate_labels
+        result = super().delete(*args, **kwargs)
+        if self.role == self.Role.BUSINESS:
+            # Their services were deleted by cascade, without Service.delete
+            invalidate_labels()
+        return result
 
 
 class Wallet(models.Model):
@@ -194,97 +176,96 @@ class Wallet(models.Model):
         on_delete=models.CASCADE,
         related_name='wallet'
     )
-    balance = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    balance = MoneyField(default=Decimal('0.00'))
+    shard_count = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Number of credit shards for high-volume recipients (0 = not sharded)"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.user.email}'s wallet - {self.balance}"
     
+    @property
+    def is_sharded(self):
+        return self.shard_count > 0
+    
+    @property
+    def total_balance(self):
+        """
+        Spendable balance: the wallet row plus any credits still sitting in
+        its shards. Equal to balance for wallets that are not sharded.
+        """
+        if not self.is_sharded:
+            return self.balance
+        shard_total = self.shards.aggregate(total=models.Sum('balance'))['total']
+        return self.balance + (shard_total or Decimal('0.00'))
+    
     def deposit(self, amount):
         """Add funds to wallet and create transaction record"""
-        if amount <= 0:
-            raise ValueError("Amount must be positive")
-        
-        # Use atomic transaction to ensure both updates happen or none
-        with transaction.atomic():
-            # Get a lock on this wallet row
-            wallet = Wallet.objects.select_for_update().get(pk=self.pk)
-            wallet.balance += amount
-            wallet.save(update_fields=['balance', 'updated_at'])
-            
-            # Create transaction record
-            tx = Transaction.objects.create(
-                to_wallet=wallet,
-                amount=amount,
-                transaction_type=Transaction.TransactionType.DEPOSIT
-            )
-            
-            # Update the instance
-            self.balance = wallet.balance
-            self.updated_at = wallet.updated_at
-            
-            return tx
+        from .ledger import deposit
+        return deposit(self, amount)
         
     def withdraw(self, amount):
         """Withdraw funds from wallet and create transaction record"""
-        if amount <= 0:
-            raise ValueError("Amount must be positive")
-        
-        # Use atomic transaction to ensure both updates happen or none
-        with transaction.atomic():
-            # Get a lock on this wallet row
-            wallet = Wallet.objects.select_for_update().get(pk=self.pk)
-            
-            if wallet.balance < amount:
-                raise ValueError("Insufficient funds")
-                
-            wallet.balance -= amount
-            wallet.save(update_fields=['balance', 'updated_at'])
-            
-            # Create transaction record
-            tx = Transaction.objects.create(
-                from_wallet=wallet,
-                amount=amount,
-                transaction_type=Transaction.TransactionType.WITHDRAWAL
-            )
-            
-            # Update the instance
-            self.balance = wallet.balance
-            self.updated_at = wallet.updated_at
-            
-            return tx
+        from .ledger import withdraw
+        return withdraw(self, amount)
         
     def transfer(self, recipient_wallet, amount):
-        """Transfer funds to another wallet and create transaction record"""
-        # Convert amount to Decimal if it's not already
-        if not isinstance(amount, Decimal):
-            amount = Decimal(str(amount))
-            
-        if amount <= Decimal('0'):
-            raise ValueError("Amount must be positive")
-            
-        if self.balance < amount:
-            raise ValueError("Insufficient funds")
-            
-        if self == recipient_wallet:
-            raise ValueError("Cannot transfer to the same wallet")
-        
-        # Use transaction.atomic to ensure both wallets are updated or neither
-        with transaction.atomic():
-            # Update balances
-            self.balance -= amount
-            recipient_wallet.balance += amount
-            self.save(update_fields=['balance', 'updated_at'])
-            recipient_wallet.save(update_fields=['balance', 'updated_at'])
-            
-            # Create transaction record
-            return Transaction.objects.create(
-                from_wallet=self,
-                to_wallet=recipient_wallet,
-                amount=amount,
-                transaction_type=Transaction.TransactionType.TRANSFER
+        """
+        Transfer funds to another wallet and create transaction record.
+        The balance check happens in the database, so a stale in-memory
+        balance can never overdraw the wallet.
+        """
+        from .ledger import transfer
+        return transfer(self, recipient_wallet, amount)
+
+    def set_shard_count(self, shard_count):
+        """
+        Spread incoming credits over shard_count shard rows, or stop
+        sharding with 0. Shard balances are consolidated first.
+        """
+        from .ledger import set_shard_count
+        return set_shard_count(self, shard_count)
+
+    def batch_transfer(self, payouts):
+        """
+        Transfer funds to many wallets in one atomic operation.
+        payouts is a list of (wallet_id, amount) pairs; returns the
+        created Transaction records in the same order.
+        """
+        from .ledger import batch_transfer
+        return batch_transfer(self, payouts)
+
+
+class WalletShard(models.Model):
+    """
+    Sub-balance of a sharded wallet.
+
+    Credits to a sharded wallet are added to a random shard instead of the
+    wallet row, so concurrent payments to one popular recipient do not queue
+    on a single row lock. Debits move the shard balances back into the
+    wallet row first (see ledger.consolidate).
+    """
+    wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.CASCADE,
+        related_name='shards'
+    )
+    index = models.PositiveSmallIntegerField()
+    balance = MoneyField(default=Decimal('0.00'))
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['wallet', 'index'],
+                name='unique_wallet_shard_index'
             )
+        ]
+    
+    def __str__(self):
+        return f"{self.wallet_id} shard {self.index} - {self.balance}"
 
 
 class Transaction(models.Model):
@@ -295,7 +276,7 @@ class Transaction(models.Model):
         WITHDRAWAL = 'WITHDRAWAL', _('Withdrawal')
         TRANSFER = 'TRANSFER', _('Transfer')
     
-    transaction_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    transaction_id = models.UUIDField(default=uuid7, editable=False, unique=True)
     from_wallet = models.ForeignKey(
         Wallet, 
         on_delete=models.CASCADE,
@@ -310,13 +291,21 @@ class Transaction(models.Model):
         null=True,
         blank=True
     )
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = MoneyField()
     transaction_type = models.CharField(
         max_length=10,
         choices=TransactionType.choices,
     )
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            # Back the keyset pagination of a wallet's history, one range
+            # scan per side of the transaction
+            models.Index(fields=['from_wallet', 'created_at'], name='tx_from_wallet_created_idx'),
+            models.Index(fields=['to_wallet', 'created_at'], name='tx_to_wallet_created_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.transaction_id} - {self.amount} - {self.transaction_type}"
     
@@ -331,8 +320,203 @@ class Transaction(models.Model):
         if self.transaction_type == self.TransactionType.TRANSFER:
             if self.from_wallet is None or self.to_wallet is None:
                 raise ValueError("Transfer transactions must have both source and destination wallets")
-                
-        super().save(*args, **kwargs)
+
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            # Keep the monthly statement aggregates in the same DB transaction
+            if adding:
+                from .summaries import record_transactions
+                record_transactions([self])
+
+
+class WalletMonthlySummary(models.Model):
+    """
+    Per-wallet monthly totals for one transaction type.
+
+    Maintained incrementally whenever a Transaction is created, so statements
+    and dashboard charts read these rows instead of aggregating the ledger.
+    Rebuild with the rebuild_wallet_summaries management command.
+    """
+    wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.CASCADE,
+        related_name='monthly_summaries'
+    )
+    month = models.DateField(help_text="First day of the month")
+    transaction_type = models.CharField(
+        max_length=10,
+        choices=Transaction.TransactionType.choices,
+    )
+    count = models.PositiveIntegerField(default=0)
+    inflow = MoneyField(default=Decimal('0.00'))
+    outflow = MoneyField(default=Decimal('0.00'))
+
+    class Meta:
+        ordering = ['-month', 'transaction_type']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['wallet', 'month', 'transaction_type'],
+                name='unique_wallet_month_type'
+            )
+        ]
+        indexes = [
+            # Dashboard charts aggregate across wallets by month
+            models.Index(fields=['month', 'transaction_type'], name='summary_month_type_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet_id} - {self.month:%Y-%m} - {self.transaction_type}"
+
+
+class BalanceCheckpoint(models.Model):
+    """
+    A wallet's balance as of a given Transaction primary key.
+
+    Written by the reconcile_wallets command after a wallet's ledger has been
+    verified, so the next run only has to replay the transactions with a
+    higher id than last_transaction_pk.
+    """
+    wallet = models.OneToOneField(
+        Wallet,
+        on_delete=models.CASCADE,
+        related_name='balance_checkpoint'
+    )
+    last_transaction_pk = models.BigIntegerField(
+        default=0,
+        help_text="Highest Transaction id included in the balance"
+    )
+    balance = MoneyField(default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.wallet_id} - {self.balance} as of {self.last_transaction_pk}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Stored outcome of a money-moving request sent with an Idempotency-Key header.
+
+    The row is inserted in the same database transaction as the operation it
+    guards, so a retry either replays the committed response or, if the first
+    attempt rolled back, runs the operation again. Keys are replayed for at
+    least settings.IDEMPOTENCY_KEY_TTL seconds; purge_expired() then deletes
+    them, every PURGE_EVERY inserts and from the purge_idempotency_keys
+    command.
+    """
+
+    PURGE_EVERY = 1000
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys'
+    )
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'key'],
+                name='unique_idempotency_key'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} - {self.key}"
+
+    @classmethod
+    def expired(cls, now=None):
+        """Keys older than IDEMPOTENCY_KEY_TTL, whose replay window has passed"""
+        ttl = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+        return cls.objects.filter(created_at__lt=(now or timezone.now()) - ttl)
+
+    @classmethod
+    def purge_expired(cls, chunk_size=5000):
+        """Delete expired keys in chunks of chunk_size rows; returns how many"""
+        cutoff = timezone.now()
+        purged = 0
+        while True:
+            ids = list(cls.expired(cutoff).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+            if not ids:
+                return purged
+            purged += cls.objects.filter(pk__in=ids).delete()[0]
+
+
+class CatalogChange(models.Model):
+    """
+    Change log for the in-memory suggestion index (accounts.suggest).
+
+    The auto-increment id is the catalog's change-version counter: every
+    Service, Category or business username write appends a row, and each
+    worker applies the rows after the last version it has seen. Old rows
+    are pruned; a worker that falls further behind rebuilds its index.
+    """
+
+    class Kind(models.TextChoices):
+        SERVICE = 'SERVICE', _('Service')
+        CATEGORY = 'CATEGORY', _('Category')
+        BUSINESS = 'BUSINESS', _('Business')
+
+    KEEP_CHANGES = 10000
+    PRUNE_EVERY = 1000
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    object_id = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} {self.object_id}"
+
+    @classmethod
+    def record(cls, kind, object_id):
+        """Bump the catalog version for one changed object"""
+        change = cls.objects.create(kind=kind, object_id=object_id)
+        if change.pk % cls.PRUNE_EVERY == 0:
+            cls.objects.filter(pk__lte=change.pk - cls.KEEP_CHANGES).delete()
+        return change
+
+
+class ImageJob(models.Model):
+    """
+    Queued rendering of an uploaded image's variants (see accounts.images).
+
+    Rows are created when an image is saved and deleted once the
+    process_images command has stored the variants. Renders that keep
+    failing stay behind as FAILED with their last error.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        RUNNING = 'RUNNING', _('Running')
+        FAILED = 'FAILED', _('Failed')
+
+    model = models.CharField(max_length=100, help_text="Label of the model, e.g. accounts.user")
+    object_id = models.PositiveBigIntegerField()
+    field = models.CharField(max_length=100)
+    source = models.CharField(max_length=255, help_text="Stored name of the uploaded image")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='image_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} {self.field} ({self.status})"
 
 
 class Category(models.Model):
@@ -348,21 +532,46 @@ class Category(models.Model):
     def __str__(self):
         return self.name
     
+    def save(self, *args, **kwargs):
+        from .response_cache import invalidate_labels
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            CatalogChange.record(CatalogChange.Kind.CATEGORY, self.pk)
+            invalidate_labels()
+    
+    def delete(self, *args, **kwargs):
+        from .response_cache import invalidate_labels
+        category_id = self.pk
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            CatalogChange.record(CatalogChange.Kind.CATEGORY, category_id)
+            invalidate_labels()
+        return result
+    
     class Meta:
         verbose_name_plural = "Categories"
         ordering = ['name']
 
 
-class Service(models.Model):
+class Service(TrackedFieldsMixin, models.Model):
     """Model for business services that can be offered to customers"""
     
+    RATING_VALUES = range(6)
+    RATING_FIELDS = ['rating_sum', 'rating_count', 'avg_rating', *[f'rating_{rating}_count' for rating in RATING_VALUES]]
+    
     name = models.CharField(max_length=100)
     description = models.TextField()
     logo = models.ImageField(
         upload_to='service_logos/', 
         null=True, 
         blank=True,
-        help_text="Service logo image (512x512)"
+        help_text="Service logo image, as uploaded"
+    )
+    logo_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Resized copies of the logo by width (see accounts.images)"
     )
     category = models.ForeignKey(
         Category,
@@ -371,9 +580,7 @@ class Service(models.Model):
         null=True,
         blank=True
     )
-    fixed_price = models.DecimalField(
-        max_digits=10, 
-        decimal_places=2, 
+    fixed_price = MoneyField(
         default=Decimal('0.00'),
         help_text="Fixed price to open an inquiry chat (0 for free)"
     )
@@ -393,22 +600,143 @@ class Service(models.Model):
         blank=True,
         help_text='Customers who are verified to review this service'
     )
+    # Review aggregates, maintained by Review.save/delete (see apply_rating_changes)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    avg_rating = models.FloatField(default=0, help_text="Average review rating (0 without reviews)")
+    rating_0_count = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    # Dashboard counters, maintained by Inquiry and VerifiedServiceCustomer
+    # writes (see accounts.business_stats)
+    inquiry_count = models.PositiveIntegerField(default=0)
+    verified_customer_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['avg_rating', 'rating_count'], name='service_rating_idx'),
+            models.Index(fields=['rating_count'], name='service_review_count_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} by {self.business.username}"
     
+    @property
+    def review_count(self):
+        return self.rating_count
+    
+    @property
+    def rating_histogram(self):
+        """Number of reviews per star rating"""
+        return {rating: getattr(self, f'rating_{rating}_count') for rating in self.RATING_VALUES}
+    
+    @classmethod
+    def apply_rating_changes(cls, changes):
+        """
+        Apply added and removed reviews to the rating aggregates.
+        
+        Counters are moved with F() expressions, so concurrent review writes
+        never overwrite each other, and avg_rating is then recomputed from the
+        updated columns. Must be called inside transaction.atomic().
+        
+        Args:
+            changes: Iterable of (service_id, rating, delta), delta being 1
+                for an added review and -1 for a removed one
+        """
+        per_service = defaultdict(Counter)
+        for service_id, rating, delta in changes:
+            per_service[service_id][rating] += delta
+        
+        touched = {}
+        now = timezone.now()
+        # Ascending id order, like the wallet ledger, so writers never deadlock
+        for service_id in sorted(per_service):
+            stars = {rating: delta for rating, delta in per_service[service_id].items() if delta}
+            if not stars:
+                continue
+            touched[service_id] = (sum(stars.values()), sum(rating * delta for rating, delta in stars.items()))
+            cls.objects.filter(pk=service_id).update(
+                # Reviews change the service's representation, so its
+                # conditional GET validator too
+                updated_at=now,
+                rating_sum=F('rating_sum') + touched[service_id][1],
+                rating_count=F('rating_count') + touched[service_id][0],
+                **{
+                    f'rating_{rating}_count': F(f'rating_{rating}_count') + delta
+                    for rating, delta in stars.items()
+                }
+            )
+        
+        if touched:
+            from .business_stats import record_ratings
+            from .response_cache import invalidate_services
+            cls.objects.filter(pk__in=touched).update(avg_rating=cls.average_rating_expression())
+            record_ratings(touched)
+            invalidate_services(touched, set(cls.objects.filter(pk__in=touched).values_list('category_id', flat=True)))
+    
+    @staticmethod
+    def average_rating_expression():
+        """rating_sum / rating_count rounded to two places, 0 without reviews"""
+        return models.Case(
+            models.When(rating_count=0, then=models.Value(0.0)),
+            default=Round(Cast('rating_sum', models.FloatField()) / F('rating_count'), 2),
+            output_field=models.FloatField()
+        )
+    
+    COUNTER_FIELDS = ['inquiry_count', 'rating_count', 'rating_sum', 'verified_customer_count']
+    IMAGE_VARIANTS = {'logo': [(48, 48), (96, 96), (256, 256), (512, 512)]}
+    TRACKED_FIELDS = ['logo', 'category_id', 'business_id']
+    
     def save(self, *args, **kwargs):
         # Ensure only business users can create services
         if not self.business.is_business:
             raise ValueError("Only business users can create services")
             
-        # Resize logo if it exists and has changed
-        if self.logo:
-            if not self.pk or (Service.objects.filter(pk=self.pk).exists() and 
-                              Service.objects.get(pk=self.pk).logo != self.logo):
-                self.logo = resize_image(self.logo)
+        previous = self.stored_values()
+        
+        from .images import changed_images, queue_variants
+        changed = changed_images(self, previous, kwargs)
                 
-        super().save(*args, **kwargs)
+        from .business_stats import record_listing
+        from .response_cache import invalidate_services
+        from .search import get_search_backend
+        with transaction.atomic():
+            moved = previous is not None and previous['business_id'] != self.business_id
+            if moved:
+                # Counters move with F() updates, so read them under the row lock
+                counters = Service.objects.select_for_update().filter(pk=self.pk).values(*self.COUNTER_FIELDS).get()
+            super().save(*args, **kwargs)
+            if previous is None:
+                record_listing(self.business_id, dict.fromkeys(self.COUNTER_FIELDS, 0), 1)
+                ServiceTrend.objects.create(service=self)
+            elif moved:
+                # The listing and everything counted for it change owner
+                record_listing(previous['business_id'], counters, -1)
+                record_listing(self.business_id, counters, 1)
+            queue_variants(self, changed)
+            get_search_backend().index(self)
+            CatalogChange.record(CatalogChange.Kind.SERVICE, self.pk)
+            # A service moved to another category leaves both category lists
+            invalidate_services([self.pk], {self.category_id, previous and previous['category_id']})
+    
+    def delete(self, *args, **kwargs):
+        from .business_stats import record_listing
+        from .response_cache import invalidate_services
+        from .search import get_search_backend
+        service_id = self.pk
+        with transaction.atomic():
+            # Inquiries, reviews and verifications go with it by cascade
+            counters = Service.objects.filter(pk=service_id).values('business_id', *self.COUNTER_FIELDS).first()
+            result = super().delete(*args, **kwargs)
+            if counters:
+                record_listing(counters['business_id'], counters, -1)
+            get_search_backend().remove(service_id)
+            CatalogChange.record(CatalogChange.Kind.SERVICE, service_id)
+            invalidate_services([service_id], [self.category_id])
+        return result
 
 
 class Inquiry(models.Model):
@@ -452,6 +780,14 @@ class Inquiry(models.Model):
     def __str__(self):
         return f"Inquiry about {self.service.name} by {self.customer.username}"
     
+    def save(self, *args, **kwargs):
+        from .business_stats import record_booking
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                record_booking(self.service, 1, self.created_at)
+    
     def close(self, moderator):
         """
         Close an inquiry - only moderators can do this
@@ -535,12 +871,23 @@ class InquiryMessage(models.Model):
     class Meta:
         ordering = ['created_at']
 
+class ReviewQuerySet(models.QuerySet):
+    def delete(self):
+        """Bulk delete that keeps the services' rating aggregates in sync"""
+        with transaction.atomic():
+            removed = self.select_for_update().values_list('service_id', 'rating')
+            Service.apply_rating_changes((service_id, rating, -1) for service_id, rating in removed)
+            return super().delete()
+
+
 class Review(models.Model):
     """
     Model for service reviews by customers.
     
     Reviews can only be created by customers who have a closed inquiry for the service.
     Each customer can only leave one review per service. Rating must be between 0-5.
+    Every write is applied to the service's rating aggregates in the same
+    database transaction.
     """
     review_id = models.AutoField(primary_key=True)
     service = models.ForeignKey(
@@ -569,6 +916,8 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ReviewQuerySet.as_manager()
+
     def __str__(self):
         return f"Review for {self.service.name} by {self.user.username}"
 
@@ -608,7 +957,33 @@ class Review(models.Model):
         if not self.pk and Review.objects.filter(user=self.user, service=self.service).exists():
             raise ValueError("You have already reviewed this service.")
 
-        super().save(*args, **kwargs)
+        from .business_stats import record_day
+        adding = self._state.adding
+        with transaction.atomic():
+            changes = [(self.service_id, self.rating, 1)]
+            if not adding:
+                previous = Review.objects.select_for_update().filter(pk=self.pk).values_list('service_id', 'rating').first()
+                if previous:
+                    changes.append((*previous, -1))
+            super().save(*args, **kwargs)
+            Service.apply_rating_changes(changes)
+            if adding:
+                record_day(self.service.business_id, self.created_at, reviews=1, rating_sum=self.rating)
+        self.refresh_service_ratings()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            removed = Review.objects.select_for_update().filter(pk=self.pk).values_list('service_id', 'rating').first()
+            result = super().delete(*args, **kwargs)
+            if removed:
+                Service.apply_rating_changes([(*removed, -1)])
+        self.refresh_service_ratings()
+        return result
+
+    def refresh_service_ratings(self):
+        """Reload the aggregates of the service instance this review holds"""
+        if Review.service.is_cached(self):
+            self.service.refresh_from_db(fields=Service.RATING_FIELDS)
     
     class Meta:
         ordering = ['-created_at']
@@ -642,12 +1017,141 @@ class VerifiedServiceCustomer(models.Model):
     def __str__(self):
         return f"{self.customer.username} verified for {self.service.name}"
     
+    def save(self, *args, **kwargs):
+        from .business_stats import record_verification
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                record_verification(self.service, 1, self.verified_at)
+    
     class Meta:
         verbose_name = "Verified Service Customer"
         verbose_name_plural = "Verified Service Customers"
         unique_together = ('service', 'customer')
 
 
+class BusinessStats(models.Model):
+    """
+    Dashboard totals of one business.
+
+    Maintained incrementally by Service, Inquiry, Review and
+    VerifiedServiceCustomer writes (see accounts.business_stats), so the
+    statistics endpoint reads one row by primary key. Rebuild with the
+    rebuild_business_stats management command.
+    """
+    business = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='business_stats'
+    )
+    active_listings = models.PositiveIntegerField(default=0)
+    total_bookings = models.PositiveIntegerField(default=0)
+    total_reviews = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    verified_customers = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Business stats"
+
+    def __str__(self):
+        return f"Stats of business {self.business_id}"
+
+    @property
+    def avg_rating(self):
+        """Average review rating over all services, 0 without reviews"""
+        return round(self.rating_sum / self.total_reviews, 1) if self.total_reviews else 0
+
+
+class BusinessDailyStats(models.Model):
+    """
+    New bookings, reviews and verifications of one business on one day.
+
+    Feeds the time series of the statistics endpoint; maintained like
+    BusinessStats.
+    """
+    business = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='daily_stats'
+    )
+    day = models.DateField()
+    bookings = models.PositiveIntegerField(default=0)
+    reviews = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    verified_customers = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['day']
+        verbose_name_plural = "Business daily stats"
+        constraints = [
+            models.UniqueConstraint(fields=['business', 'day'], name='unique_business_day')
+        ]
+
+    def __str__(self):
+        return f"Stats of business {self.business_id} on {self.day}"
+
+
+class ServiceSimilarity(models.Model):
+    """
+    One neighbour of a service for item-to-item recommendations.
+
+    The table is rebuilt by the build_recommendations command (see
+    accounts.recommendations); rank 0 is the most similar service.
+    """
+    service = models.ForeignKey(
+        Service,
+        on_delete=models.CASCADE,
+        related_name='similarities'
+    )
+    similar = models.ForeignKey(
+        Service,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField(help_text="Cosine similarity of the services' customers")
+
+    class Meta:
+        ordering = ['service', 'rank']
+        verbose_name_plural = "Service similarities"
+        constraints = [
+            # Also the index /api/services/{id}/similar/ reads
+            models.UniqueConstraint(fields=['service', 'rank'], name='unique_service_rank')
+        ]
+
+    def __str__(self):
+        return f"{self.similar_id} is #{self.rank} like {self.service_id}"
+
+
+class ServiceTrend(models.Model):
+    """
+    Time-decayed trending score of a service.
+
+    Every service has one, created along with it, so ?ordering=trending can
+    join the services to this table and read them in score index order.
+    The refresh_trending command updates the scores (see accounts.trending).
+    """
+    service = models.OneToOneField(
+        Service,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trend'
+    )
+    score = models.FloatField(default=0)
+    computed_at = models.DateTimeField(null=True, blank=True, help_text="Last refresh that scored this row")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='service_trend_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"Service {self.service_id}: {self.score:.3f}"
+
+
 class ServiceReport(models.Model):
     """Model for reporting services that violate platform rules"""
     
@@ -715,7 +1219,7 @@ class SupportTicket(models.Model):
         OPEN = 'OPEN', _('Open')
         CLOSED = 'CLOSED', _('Closed')
     
-    ticket_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    ticket_id = models.UUIDField(default=uuid7, editable=False, unique=True)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -849,7 +1353,7 @@ class BlogCategory(models.Model):
         ordering = ['name']
 
 
-class BlogPost(models.Model):
+class BlogPost(TrackedFieldsMixin, models.Model):
     """
     Blog posts for educational content and information sharing.
     Can be created by any user.
@@ -876,11 +1380,20 @@ class BlogPost(models.Model):
         blank=True,
         help_text="Featured image for the blog post"
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Resized copies of the featured image by width (see accounts.images)"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_published = models.BooleanField(default=True)
     views = models.PositiveIntegerField(default=0)
     
+    IMAGE_VARIANTS = {'image': [(256, 171), (512, 341), (1200, 800)]}
+    TRACKED_FIELDS = ['image']
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -894,14 +1407,17 @@ class BlogPost(models.Model):
     
     def save(self, *args, **kwargs):
         """
-        Resize the blog image on save if present and changed
+        Queue the variants of the blog image on save if present and changed
         """
-        if self.image:
-            if not self.pk or (BlogPost.objects.filter(pk=self.pk).exists() and 
-                               BlogPost.objects.get(pk=self.pk).image != self.image):
-                self.image = resize_image(self.image, size=(1200, 800))
+        from .images import changed_images, queue_variants
+        changed = changed_images(self, self.stored_values(), kwargs)
         
-        super().save(*args, **kwargs)
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                BlogPostTrend.objects.create(post=self)
+            queue_variants(self, changed)
         
     def increment_views(self):
         """
@@ -936,13 +1452,39 @@ class BlogComment(models.Model):
         return f"Comment on '{self.blog_post.title}' by {self.author.username}"
 
 
+class BlogPostTrend(models.Model):
+    """
+    Time-decayed trending score of a blog post, kept like ServiceTrend.
+
+    Views are a counter without timestamps, so views_seen remembers the
+    count already scored and each refresh adds the views since.
+    """
+    post = models.OneToOneField(
+        BlogPost,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trend'
+    )
+    score = models.FloatField(default=0)
+    views_seen = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField(null=True, blank=True, help_text="Last refresh that scored this row")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='blog_trend_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"Blog post {self.post_id}: {self.score:.3f}"
+
+
 class Conversation(models.Model):
     """
     Model for peer-to-peer conversations between users.
     Each conversation has a unique ID and tracks the 
     sender and recipient users.
     """
-    conversation_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    conversation_id = models.UUIDField(default=uuid7, editable=False, unique=True)
     sender = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -966,6 +1508,17 @@ class Conversation(models.Model):
             raise ValueError("Conversation is already accepted")
             
         with transaction.atomic():
+            # Claim the conversation with a conditional UPDATE so that two
+            # concurrent accepts cannot both charge the sender
+            now = timezone.now()
+            claimed = Conversation.objects.filter(
+                pk=self.pk,
+                is_accepted=False
+            ).update(is_accepted=True, updated_at=now)
+            
+            if not claimed:
+                raise ValueError("Conversation is already accepted")
+            
             # Transfer funds (5€) from sender to recipient
             fee_amount = Decimal('5.00')  # 5€ fixed fee
             sender_wallet = self.sender.wallet
@@ -976,7 +1529,7 @@ class Conversation(models.Model):
             
             # Mark conversation as accepted
             self.is_accepted = True
-            self.save(update_fields=['is_accepted', 'updated_at'])
+            self.updated_at = now
             
             return transaction_record
     
@@ -1012,7 +1565,7 @@ class ConversationMessage(models.Model):
     """
     Model for messages within a P2P conversation.
     """
-    message_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    message_id = models.UUIDField(default=uuid7, editable=False, unique=True)
     conversation = models.ForeignKey(
         Conversation,
         on_delete=models.CASCADE,
@@ -1052,7 +1605,7 @@ class PaymentRequest(models.Model):
         ACCEPTED = 'ACCEPTED', _('Accepted')
         DECLINED = 'DECLINED', _('Declined')
         
-    request_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    request_id = models.UUIDField(default=uuid7, editable=False, unique=True)
     inquiry = models.ForeignKey(
         Inquiry,
         on_delete=models.CASCADE,
@@ -1070,7 +1623,7 @@ class PaymentRequest(models.Model):
         related_name='received_payment_requests',
         limit_choices_to={'role': User.Role.CUSTOMER}
     )
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = MoneyField()
     description = models.TextField(blank=True, help_text="Description of what this payment is for")
     status = models.CharField(
         max_length=10,
@@ -1119,19 +1672,33 @@ class PaymentRequest(models.Model):
         recipient_wallet = self.recipient.wallet
         creator_wallet = self.creator.wallet
         
-        try:
-            # Transfer the funds
-            transaction = recipient_wallet.transfer(creator_wallet, self.amount)
+        with transaction.atomic():
+            # Claim the request with a conditional UPDATE so that a retried or
+            # concurrent accept cannot transfer the funds twice
+            now = timezone.now()
+            claimed = PaymentRequest.objects.filter(
+                pk=self.pk,
+                status=self.Status.PENDING
+            ).update(status=self.Status.ACCEPTED, updated_at=now)
+            
+            if not claimed:
+                raise ValueError("Only pending payment requests can be accepted")
+            
+            try:
+                # Transfer the funds
+                transaction_record = recipient_wallet.transfer(creator_wallet, self.amount)
+            except ValueError as e:
+                # Re-raise the error with a more descriptive message
+                raise ValueError(f"Payment failed: {str(e)}")
+            
+            # Link the transaction to the payment request
+            PaymentRequest.objects.filter(pk=self.pk).update(transaction=transaction_record)
             
-            # Update payment request
             self.status = self.Status.ACCEPTED
-            self.transaction = transaction
-            self.save(update_fields=['status', 'transaction', 'updated_at'])
+            self.transaction = transaction_record
+            self.updated_at = now
             
-            return transaction
-        except ValueError as e:
-            # Re-raise the error with a more descriptive message
-            raise ValueError(f"Payment failed: {str(e)}")
+            return transaction_record
     
     def decline(self):
         """
@@ -1139,11 +1706,20 @@ class PaymentRequest(models.Model):
         """
         if self.status != self.Status.PENDING:
             raise ValueError("Only pending payment requests can be declined")
+        
+        # Conditional UPDATE so a decline can never overwrite an accepted request
+        now = timezone.now()
+        declined = PaymentRequest.objects.filter(
+            pk=self.pk,
+            status=self.Status.PENDING
+        ).update(status=self.Status.DECLINED, updated_at=now)
+        
+        if not declined:
+            raise ValueError("Only pending payment requests can be declined")
             
         self.status = self.Status.DECLINED
-        self.save(update_fields=['status', 'updated_at'])
+        self.updated_at = now
         
         # No need to keep declined requests for long, they can be deleted after a certain period
         # For now, we just mark them as declined
         return True
-
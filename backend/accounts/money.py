@@ -0,0 +1,137 @@
+"""
+Money stored as integer cents.
+
+MoneyField keeps amounts in a BIGINT column of minor units (cents) while
+model instances, forms and the API keep working with two-place Decimals:
+12.34 is stored as 1234 and read back as Decimal('12.34'). MoneySerializerField
+emits the same "12.34" strings the DecimalFields did; serializers that
+should map MoneyField to it automatically extend MoneyModelSerializer in
+accounts.serializers.
+
+Reporting code can skip Decimal entirely: Cents() and SumCents() read the raw
+integers from the database, and cents_array() packs them into a NumPy int64
+array (or a plain array('q') when NumPy is not installed) for vectorized
+totals. Convert back with from_cents() only at the edge.
+
+F() expressions are not converted: add and subtract to_cents(amount), not
+the Decimal, e.g. update(balance=F('balance') + to_cents(amount)).
+"""
+from array import array
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+
+from django import forms
+from django.core import exceptions, validators
+from django.db import connection, models
+from rest_framework import serializers
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - optional
+    numpy = None
+
+CENT = Decimal('0.01')
+
+
+def to_cents(value):
+    """Convert an amount (Decimal, int, float or string) to integer cents"""
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value * 100
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return int(value.quantize(CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def from_cents(cents):
+    """Convert integer cents to a two-place Decimal"""
+    if cents is None:
+        return None
+    return Decimal(int(cents)).scaleb(-2)
+
+
+class MoneyField(models.BigIntegerField):
+    """Amount stored as integer cents, exposed as a two-place Decimal"""
+
+    description = "Amount of money stored as integer cents"
+
+    @property
+    def validators(self):
+        # The backend's integer range applies to the stored cents, so bound
+        # the Decimal value the model validators see by it in whole units
+        min_value, max_value = connection.ops.integer_field_range(self.get_internal_type())
+        range_validators = []
+        if min_value is not None:
+            range_validators.append(validators.MinValueValidator(from_cents(min_value)))
+        if max_value is not None:
+            range_validators.append(validators.MaxValueValidator(from_cents(max_value)))
+        return [*self.default_validators, *self._validators, *range_validators]
+
+    def from_db_value(self, value, expression, connection):
+        return from_cents(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Decimal):
+            return value
+        try:
+            return Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+        except InvalidOperation:
+            raise exceptions.ValidationError(
+                self.error_messages['invalid'],
+                code='invalid',
+                params={'value': value},
+            )
+
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        if value is None or hasattr(value, 'resolve_expression'):
+            return value
+        return to_cents(value)
+
+    def formfield(self, **kwargs):
+        return super(models.IntegerField, self).formfield(**{
+            'form_class': forms.DecimalField,
+            'decimal_places': 2,
+            **kwargs,
+        })
+
+
+class MoneySerializerField(serializers.DecimalField):
+    """Serializer field for MoneyField, rendered as a "12.34" string"""
+
+    # Up to 9,999,999,999.99, well inside a BIGINT of cents
+    MAX_DIGITS = 12
+
+    def __init__(self, max_digits=MAX_DIGITS, decimal_places=2, **kwargs):
+        super().__init__(max_digits, decimal_places, **kwargs)
+
+
+class Cents(models.ExpressionWrapper):
+    """The raw integer cents of a money field or expression"""
+
+    def __init__(self, expression):
+        if isinstance(expression, str):
+            expression = models.F(expression)
+        super().__init__(expression, output_field=models.BigIntegerField())
+
+
+class SumCents(models.Sum):
+    """Sum of a money field as integer cents (0 for no rows)"""
+
+    def __init__(self, expression, **extra):
+        extra.setdefault('default', 0)
+        super().__init__(expression, output_field=models.BigIntegerField(), **extra)
+
+
+def cents_array(values):
+    """Pack an iterable of cents into an int64 array for vectorized analytics"""
+    if numpy is not None:
+        return numpy.fromiter(values, dtype=numpy.int64)
+    return array('q', values)
+
+
+def sum_cents(values):
+    """Total of an iterable or array of cents as a Python int"""
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return int(values.sum())
+    return sum(values)
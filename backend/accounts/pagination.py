@@ -0,0 +1,211 @@
+"""
+Pagination classes for the accounts API.
+
+StandardPagination (page numbers, settings.REST_FRAMEWORK['PAGE_SIZE'] per
+page) is the default for every list view. Append-heavy lists such as
+messages, comments and reviews use StandardCursorPagination instead, whose
+pages stay cheap however deep the client scrolls. Views cap ?page_size=
+with a max_page_size attribute (DEFAULT_MAX_PAGE_SIZE otherwise).
+
+While settings.PAGINATION_TRANSITION is on, requests that send no page
+parameter at all still get the old unpaginated list, so existing clients
+keep working until they move to the paginated format.
+"""
+import base64
+import heapq
+from datetime import datetime
+from urllib import parse
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .models import Transaction
+
+DEFAULT_MAX_PAGE_SIZE = 100
+
+
+class TransitionalPaginationMixin:
+    """Per-view page size ceiling and the unpaginated transition period"""
+    page_size_query_param = 'page_size'
+    max_page_size = DEFAULT_MAX_PAGE_SIZE
+
+    # Attributes of DRF's paginators naming the parameters that select a page
+    PAGE_PARAM_ATTRIBUTES = [
+        'page_query_param', 'cursor_query_param', 'limit_query_param', 'offset_query_param',
+        'page_size_query_param',
+    ]
+
+    def get_page_params(self):
+        """Query parameters that ask for a page; sending any of them opts into pagination"""
+        return [
+            getattr(self, name) for name in self.PAGE_PARAM_ATTRIBUTES
+            if getattr(self, name, None)
+        ]
+
+    def is_unpaginated(self, request):
+        """Whether request gets the old unpaginated list during the transition"""
+        return getattr(settings, 'PAGINATION_TRANSITION', False) and not any(
+            param in request.query_params for param in self.get_page_params()
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.is_unpaginated(request):
+            return None
+        self.max_page_size = getattr(view, 'max_page_size', self.max_page_size)
+        return super().paginate_queryset(queryset, request, view)
+
+
+class StandardPagination(TransitionalPaginationMixin, PageNumberPagination):
+    """Page-number pagination: ?page=&page_size="""
+
+
+class StandardCursorPagination(TransitionalPaginationMixin, CursorPagination):
+    """
+    Cursor pagination for append-heavy lists: ?cursor=&page_size=
+
+    Views set cursor_ordering to the field new rows are appended on;
+    views with an OrderingFilter are ordered by it instead.
+    """
+    ordering = '-created_at'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering:
+            return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+        return super().get_ordering(request, queryset, view)
+
+
+def history_range_scan(field, wallet, position=None):
+    """
+    Transactions on one side of a wallet's history, newest first.
+    
+    Args:
+        field: 'from_wallet' or 'to_wallet'
+        wallet: The wallet whose history is scanned
+        position: Optional (created_at, id) of the last row already seen
+    """
+    queryset = Transaction.objects.filter(**{field: wallet})
+    if position is not None:
+        created_at, pk = position
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+        )
+    return queryset.order_by('-created_at', '-pk')
+
+
+class WalletTransactionPagination(TransitionalPaginationMixin):
+    """
+    Keyset (cursor) pagination for a wallet's transaction history.
+
+    Pages are ordered newest first on (created_at, id) and the cursor encodes
+    the position of the last row returned, so fetching page N costs the same
+    as fetching page 1 regardless of how long the history is.
+
+    A wallet's history is the union of two index-backed range scans, one on
+    (from_wallet, created_at) and one on (to_wallet, created_at), instead of an
+    OR across both columns which cannot use either index for the ordering.
+
+    Like the other paginators it returns None during the transition when
+    the request sends neither ?cursor= nor ?page_size=.
+    """
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_wallet(self, request, wallet):
+        """Return the page of transactions for the wallet selected by the request, or None"""
+        if self.is_unpaginated(request):
+            return None
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        rows = self.fetch_rows(wallet, position, self.page_size + 1)
+
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def fetch_rows(self, wallet, position, limit):
+        """Fetch up to limit transactions after position, newest first"""
+        sent = history_range_scan('from_wallet', wallet, position)
+        received = history_range_scan('to_wallet', wallet, position)
+
+        if connection.features.supports_slicing_ordering_in_compound:
+            # A transaction never has the same source and destination wallet,
+            # so UNION ALL is safe and skips the de-duplication step
+            page_ids = [
+                pk for pk, created_at in
+                sent.values_list('pk', 'created_at')[:limit].union(
+                    received.values_list('pk', 'created_at')[:limit], all=True
+                ).order_by('-created_at', '-pk')[:limit]
+            ]
+            transactions = self.with_related(Transaction.objects.filter(pk__in=page_ids))
+            return sorted(transactions, key=self.sort_key, reverse=True)
+
+        # Backends that cannot slice inside a compound statement (SQLite) run
+        # the two range scans separately and merge the sorted results
+        merged = heapq.merge(
+            self.with_related(sent)[:limit],
+            self.with_related(received)[:limit],
+            key=self.sort_key,
+            reverse=True
+        )
+        return [tx for _, tx in zip(range(limit), merged)]
+
+    def with_related(self, queryset):
+        return queryset.select_related('from_wallet__user', 'to_wallet__user')
+
+    @staticmethod
+    def sort_key(tx):
+        return (tx.created_at, tx.pk)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        """Return the (created_at, id) position from the request, or None"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            querystring = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            created_at = datetime.fromisoformat(tokens['t'][0])
+            pk = int(tokens['i'][0])
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return created_at, pk
+
+    def encode_cursor(self, tx):
+        querystring = parse.urlencode({'t': tx.created_at.isoformat(), 'i': tx.pk})
+        encoded = base64.urlsafe_b64encode(querystring.encode('ascii')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
@@ -0,0 +1,221 @@
+"""
+select_related / prefetch_related derived from serializers.
+
+Serializers reach related rows through dotted sources
+('service.business.username') and nested serializers (comments with
+many=True). Serializing a list without joining or prefetching those
+relations costs one query per row and relation. related_lookups() walks a
+serializer's fields against its model's relations and returns:
+
+    select_related    forward foreign keys and one-to-ones on a source path
+    prefetch_related  reverse foreign keys and many-to-manys, as Prefetch
+                      objects whose querysets are optimized in turn for
+                      the nested serializer
+
+Relations a serializer only reads inside SerializerMethodFields cannot be
+seen from the field declarations, so serializers name them in Meta:
+
+    select_related    = [...]  extra select_related paths
+    prefetch_related  = [...]  extra lookups or Prefetch objects
+    annotations       = {...}  annotate() expressions, e.g. related_count()
+
+OptimizedQuerysetMixin applies the lookups for the view's serializer class
+to the view's querysets. When the request selects a sparse fieldset (see
+accounts.fieldsets), the lookups are derived from the selected fields only,
+and the columns are limited with only() as well. The Meta hints serve
+method fields, so they are dropped when no method field is selected.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+
+from .fieldsets import SparseFieldsetMixin, sparse_fieldset
+from .images import VariantImageField, variants_field
+
+
+def related_count(queryset, field):
+    """
+    Annotation counting the rows of queryset whose field points at the outer row.
+
+    A correlated subquery rather than Count() over a join, so several counts
+    do not multiply each other and aggregates over the annotated queryset
+    (list validators, pagination counts) need no GROUP BY.
+    """
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+        total=Count('pk')
+    ).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def join(path, lookup):
+    return '__'.join([*path, lookup])
+
+
+def prefixed(path, lookup):
+    """A prefetch lookup made relative to the model at the end of path"""
+    if not path:
+        return lookup
+    if isinstance(lookup, Prefetch):
+        return Prefetch(join(path, lookup.prefetch_through), queryset=lookup.queryset, to_attr=lookup.to_attr)
+    return join(path, lookup)
+
+
+def nested_serializer(field):
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+def field_lookups(field, model, select, prefetch):
+    """Add the lookups needed to read one serializer field from model instances"""
+    nested = nested_serializer(field)
+    parts = field.source.split('.')
+    current, path = model, []
+    for position, part in enumerate(parts):
+        try:
+            relation = current._meta.get_field(part)
+        except FieldDoesNotExist:
+            break
+        if not relation.is_relation:
+            break
+        last = position == len(parts) - 1
+
+        if relation.many_to_one or relation.one_to_one:
+            if last and nested is None and isinstance(field, serializers.RelatedField) and field.use_pk_only_optimization():
+                # PrimaryKeyRelatedField reads the local <name>_id column
+                break
+            path.append(part)
+            current = relation.related_model
+            if last and nested is not None:
+                nested_select, nested_prefetch, _, _ = serializer_lookups(nested, current)
+                select.update(join(path, lookup) for lookup in nested_select)
+                prefetch.extend(prefixed(path, lookup) for lookup in nested_prefetch)
+        else:
+            queryset = relation.related_model._default_manager.all()
+            if last and nested is not None:
+                queryset = optimize_queryset(queryset, nested)
+            prefetch.append(Prefetch(join(path, part), queryset=queryset))
+            break
+
+    if path:
+        select.add('__'.join(path))
+
+
+def field_columns(field, model):
+    """Names to pass to only() for reading field from model rows, or None if unknown"""
+    if field.source == '*':
+        return None
+    try:
+        model_field = model._meta.get_field(field.source.split('.')[0])
+    except FieldDoesNotExist:
+        # A property or method, which may read any column
+        return None
+    if model_field.one_to_many or model_field.many_to_many:
+        # Prefetched by primary key
+        return set()
+    if not model_field.concrete:
+        return None
+    if isinstance(field, VariantImageField):
+        return {model_field.name, variants_field(model_field.name)}
+    return {model_field.name}
+
+
+def serializer_lookups(serializer, model, names=None):
+    """
+    (select_related paths, prefetch_related lookups, annotations, only()
+    columns or None) for a serializer instance, or for its fields in names.
+    """
+    select, prefetch, columns = set(), [], set()
+    for name, field in serializer.fields.items():
+        if field.write_only or (names is not None and name not in names):
+            continue
+        if columns is not None:
+            needed = field_columns(field, model)
+            columns = None if needed is None else columns | needed
+        if field.source != '*':
+            field_lookups(field, model, select, prefetch)
+
+    meta = getattr(serializer, 'Meta', None)
+    annotations = {}
+    # Only method fields need the Meta hints, and only they leave columns unknown
+    if names is None or columns is None:
+        select.update(getattr(meta, 'select_related', ()))
+        prefetch.extend(getattr(meta, 'prefetch_related', ()))
+        annotations = dict(getattr(meta, 'annotations', {}))
+
+    # Later lookups for the same relation win, so Meta hints can replace
+    # what the field walk found
+    unique = {}
+    for lookup in prefetch:
+        unique[lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup] = lookup
+    if names is None:
+        columns = None
+    return select, list(unique.values()), annotations, columns
+
+
+@lru_cache(maxsize=None)
+def related_lookups(serializer_class, names=None):
+    """
+    Lookups for serializing serializer_class.Meta.model instances, computed
+    once per class and fieldset.
+    """
+    return serializer_lookups(serializer_class(), serializer_class.Meta.model, names)
+
+
+@lru_cache(maxsize=None)
+def field_names(serializer_class):
+    return tuple(serializer_class().fields)
+
+
+def apply_lookups(queryset, lookups):
+    select, prefetch, annotations, columns = lookups
+    if columns is not None:
+        # Known columns mean a sparse fieldset without method fields: the
+        # view's own joins are not needed either. A joined relation's
+        # columns are all loaded.
+        columns = columns | {path.split('__')[0] for path in select}
+        queryset = queryset.select_related(None).only(*sorted(columns | {'pk'}))
+    if select:
+        queryset = queryset.select_related(*sorted(select))
+    if prefetch:
+        # Fresh Prefetch objects, so cached querysets are never shared
+        queryset = queryset.prefetch_related(*(
+            Prefetch(lookup.prefetch_through, queryset=lookup.queryset.all(), to_attr=lookup.to_attr)
+            if isinstance(lookup, Prefetch) and lookup.queryset is not None else lookup
+            for lookup in prefetch
+        ))
+    if annotations:
+        queryset = queryset.annotate(**annotations)
+    return queryset
+
+
+def optimize_queryset(queryset, serializer, names=None):
+    """Apply the lookups a serializer class or instance needs to queryset"""
+    if isinstance(serializer, type):
+        return apply_lookups(queryset, related_lookups(serializer, names))
+    return apply_lookups(queryset, serializer_lookups(serializer, queryset.model, names))
+
+
+class OptimizedQuerysetMixin:
+    """
+    Joins and prefetches what get_serializer_class() reads.
+
+    Applied in filter_queryset(), which list and get_object() both call,
+    so views keep their own get_queryset(). Serializers with
+    SparseFieldsetMixin are optimized for the fields the request selects.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if getattr(getattr(serializer_class, 'Meta', None), 'model', None) is not queryset.model:
+            return queryset
+        names = None
+        if issubclass(serializer_class, SparseFieldsetMixin):
+            names = sparse_fieldset(self.request, field_names(serializer_class))
+        return optimize_queryset(queryset, serializer_class, names)
@@ -0,0 +1,226 @@
+"""
+Item-to-item service recommendations.
+
+Customers who inquired about or reviewed the same services make those
+services similar. The build_recommendations command reads the sparse
+customer x service matrix X from Inquiry and Review rows (INQUIRY_WEIGHT
+per inquiry, REVIEW_WEIGHT per review), computes the cosine similarity of
+every pair of services sharing a customer,
+
+    sim(i, j) = X[:, i] . X[:, j] / (|X[:, i]| |X[:, j]|)
+
+and stores the top_k neighbours of each service as ServiceSimilarity rows,
+which /api/services/{id}/similar/ reads with one indexed query.
+
+Only services sharing a customer have a nonzero dot product, so the work
+grows with the number of co-occurring pairs rather than services squared:
+each customer contributes every pair of the services they touched.
+Customers who touched more than MAX_CUSTOMER_SERVICES services (test
+accounts, scrapers) would dominate that count while saying little about
+similarity, and are left out.
+
+With NumPy installed the pairs are generated and reduced in vectorized
+batches of customers; without it the same computation runs in pure Python.
+"""
+import heapq
+import math
+from array import array
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.db import transaction
+
+from .models import Inquiry, Review, Service, ServiceSimilarity
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - optional
+    numpy = None
+
+TOP_K = 20
+MIN_SUPPORT = 1
+MAX_CUSTOMER_SERVICES = 500
+INQUIRY_WEIGHT = 1.0
+REVIEW_WEIGHT = 1.0
+# Service pairs generated per NumPy batch, bounding its memory use
+BATCH_PAIRS = 5_000_000
+
+
+def load_interactions(chunk_size=10000):
+    """(customer ids, service ids, weights) of every inquiry and review"""
+    customers, services, weights = array('q'), array('q'), array('d')
+    sources = [
+        (Inquiry.objects.values_list('customer_id', 'service_id'), INQUIRY_WEIGHT),
+        (Review.objects.values_list('user_id', 'service_id'), REVIEW_WEIGHT),
+    ]
+    for rows, weight in sources:
+        for customer_id, service_id in rows.order_by().iterator(chunk_size=chunk_size):
+            customers.append(customer_id)
+            services.append(service_id)
+            weights.append(weight)
+    return customers, services, weights
+
+
+def python_neighbours(customers, services, weights, top_k=TOP_K, min_support=MIN_SUPPORT):
+    """
+    Top-k cosine neighbours of every service, in pure Python.
+
+    Args:
+        customers, services, weights: Parallel sequences of interactions;
+            repeated (customer, service) pairs are summed
+        top_k: Neighbours kept per service
+        min_support: Customers two services must share to be neighbours
+
+    Returns:
+        Dict mapping service id to [(neighbour id, score), ...], best first
+    """
+    vectors = defaultdict(dict)
+    for customer, service, weight in zip(customers, services, weights):
+        vector = vectors[customer]
+        vector[service] = vector.get(service, 0) + weight
+
+    squares = defaultdict(float)
+    dots = defaultdict(float)
+    support = Counter()
+    for vector in vectors.values():
+        if len(vector) > MAX_CUSTOMER_SERVICES:
+            continue
+        items = sorted(vector.items())
+        for index, (left, left_weight) in enumerate(items):
+            squares[left] += left_weight * left_weight
+            for right, right_weight in items[index + 1:]:
+                dots[(left, right)] += left_weight * right_weight
+                support[(left, right)] += 1
+
+    candidates = defaultdict(list)
+    for (left, right), dot in dots.items():
+        if support[(left, right)] < min_support:
+            continue
+        score = dot / math.sqrt(squares[left] * squares[right])
+        candidates[left].append((score, -right))
+        candidates[right].append((score, -left))
+
+    # Ties go to the lower service id
+    return {
+        service: [(-negated, score) for score, negated in heapq.nlargest(top_k, pairs)]
+        for service, pairs in candidates.items()
+    }
+
+
+def reduce_pairs(keys, dots, support):
+    """Sum the dots and support of equal pair keys"""
+    if not len(keys):
+        return keys, dots, support
+    order = numpy.argsort(keys, kind='stable')
+    keys, dots, support = keys[order], dots[order], support[order]
+    starts = numpy.flatnonzero(numpy.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], numpy.add.reduceat(dots, starts), numpy.add.reduceat(support, starts)
+
+
+def numpy_neighbours(customers, services, weights, top_k=TOP_K, min_support=MIN_SUPPORT, batch_pairs=BATCH_PAIRS):
+    """Vectorized python_neighbours(), processing customers in batches of about batch_pairs pairs"""
+    customers = numpy.asarray(customers, dtype=numpy.int64)
+    services = numpy.asarray(services, dtype=numpy.int64)
+    weights = numpy.asarray(weights, dtype=numpy.float64)
+    if not len(customers):
+        return {}
+
+    # Sum repeated (customer, service) cells, sorted by customer
+    order = numpy.lexsort((services, customers))
+    customers, services, weights = customers[order], services[order], weights[order]
+    starts = numpy.flatnonzero(numpy.r_[True, (customers[1:] != customers[:-1]) | (services[1:] != services[:-1])])
+    customers, services, weights = customers[starts], services[starts], numpy.add.reduceat(weights, starts)
+
+    bounds = numpy.flatnonzero(numpy.r_[True, customers[1:] != customers[:-1], True])
+    counts = numpy.diff(bounds)
+    keep = numpy.repeat(counts <= MAX_CUSTOMER_SERVICES, counts)
+    services, weights = services[keep], weights[keep]
+    counts = counts[counts <= MAX_CUSTOMER_SERVICES]
+    bounds = numpy.r_[0, numpy.cumsum(counts)]
+
+    # Dense column numbers for the services
+    ids, columns = numpy.unique(services, return_inverse=True)
+    squares = numpy.bincount(columns, weights=weights * weights, minlength=len(ids))
+
+    pair_totals = numpy.cumsum(counts * counts)
+    parts = []
+    start = 0
+    while start < len(counts):
+        done = pair_totals[start - 1] if start else 0
+        end = max(int(numpy.searchsorted(pair_totals, done + batch_pairs, side='right')), start + 1)
+        batch = counts[start:end]
+
+        # Every (left, right) entry pair within each customer's segment
+        entry_counts = numpy.repeat(batch, batch)
+        total = int(entry_counts.sum())
+        left = numpy.repeat(numpy.arange(bounds[start], bounds[end]), entry_counts)
+        block_starts = numpy.cumsum(entry_counts) - entry_counts
+        within = numpy.arange(total) - numpy.repeat(block_starts, entry_counts)
+        right = numpy.repeat(numpy.repeat(bounds[start:end], batch), entry_counts) + within
+
+        left_columns, right_columns = columns[left], columns[right]
+        upper = left_columns < right_columns
+        parts.append(reduce_pairs(
+            left_columns[upper] * len(ids) + right_columns[upper],
+            (weights[left] * weights[right])[upper],
+            numpy.ones(int(upper.sum()), dtype=numpy.int64)
+        ))
+        if len(parts) > 8:
+            parts = [reduce_pairs(*map(numpy.concatenate, zip(*parts)))]
+        start = end
+
+    keys, dots, support = reduce_pairs(*map(numpy.concatenate, zip(*parts)))
+    strong = support >= min_support
+    keys, dots = keys[strong], dots[strong]
+    left, right = keys // len(ids), keys % len(ids)
+    scores = dots / numpy.sqrt(squares[left] * squares[right])
+
+    # Both directions, best first per service, ties to the lower id
+    sources = numpy.concatenate([left, right])
+    targets = numpy.concatenate([right, left])
+    scores = numpy.concatenate([scores, scores])
+    order = numpy.lexsort((targets, -scores, sources))
+    sources, targets, scores = sources[order], targets[order], scores[order]
+    group_starts = numpy.flatnonzero(numpy.r_[True, sources[1:] != sources[:-1]])
+    group_sizes = numpy.diff(numpy.r_[group_starts, len(sources)])
+    ranks = numpy.arange(len(sources)) - numpy.repeat(group_starts, group_sizes)
+    top = ranks < top_k
+
+    neighbours = defaultdict(list)
+    for source, target, score in zip(ids[sources[top]].tolist(), ids[targets[top]].tolist(), scores[top].tolist()):
+        neighbours[source].append((target, score))
+    return dict(neighbours)
+
+
+def neighbours(customers, services, weights, top_k=TOP_K, min_support=MIN_SUPPORT):
+    """Top-k neighbours of every service, with NumPy when it is installed"""
+    if numpy is not None:
+        return numpy_neighbours(customers, services, weights, top_k, min_support)
+    return python_neighbours(customers, services, weights, top_k, min_support)
+
+
+def store_neighbours(neighbours, batch_size=1000):
+    """
+    Replace the ServiceSimilarity table with neighbours.
+
+    Services deleted since the interactions were read are skipped. Readers
+    see the old or the new table, never a mix.
+
+    Returns:
+        Number of rows written
+    """
+    with transaction.atomic():
+        existing = set(Service.objects.values_list('pk', flat=True))
+        rows = (
+            ServiceSimilarity(service_id=service_id, similar_id=similar_id, rank=rank, score=score)
+            for service_id, similar in neighbours.items() if service_id in existing
+            for rank, (similar_id, score) in enumerate(
+                (similar_id, score) for similar_id, score in similar if similar_id in existing
+            )
+        )
+        ServiceSimilarity.objects.all().delete()
+        written = 0
+        while batch := list(islice(rows, batch_size)):
+            ServiceSimilarity.objects.bulk_create(batch)
+            written += len(batch)
+    return written
@@ -0,0 +1,133 @@
+"""
+Incremental reconciliation of wallet balances against the Transaction ledger.
+
+Each wallet's balance is checked as
+
+    checkpoint balance + inflows - outflows of transactions after the checkpoint
+
+The sums and the stored balance are read in a single statement, so they come
+from one consistent snapshot even while payments are being made: a ledger
+write updates the wallet row and inserts its Transaction in one database
+transaction, so both are either visible or not.
+
+A wallet that reconciles gets a new checkpoint at the settled high-water
+mark: the highest Transaction id created before the settle window. Ids are
+assigned before commit, so a transaction with a lower id than one already
+visible may still be in flight; waiting out the settle window makes sure
+no transaction below the new checkpoint can appear later.
+
+All sums are read and compared as integer cents.
+"""
+from datetime import timedelta
+
+from django.db.models import BigIntegerField, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Wallet, WalletShard, Transaction, BalanceCheckpoint
+from .money import Cents, SumCents, from_cents
+
+CENTS = BigIntegerField()
+
+
+def settled_high_water_mark(settle_seconds=60):
+    """Highest Transaction id created at least settle_seconds ago, or 0"""
+    cutoff = timezone.now() - timedelta(seconds=settle_seconds)
+    # Walks the primary key backwards and stops at the first settled row
+    pk = Transaction.objects.filter(created_at__lte=cutoff).order_by('-pk').values_list('pk', flat=True).first()
+    return pk or 0
+
+
+def wallet_id_ranges(chunk_size):
+    """Split the wallet id space into [low, high) ranges of chunk_size ids"""
+    ids = Wallet.objects.order_by('pk').values_list('pk', flat=True)
+    first, last = ids.first(), ids.last()
+    if first is None:
+        return []
+    return [(low, min(low + chunk_size, last + 1)) for low in range(first, last + 1, chunk_size)]
+
+
+def side_total(field, after, through=None):
+    """Sum of one side of a wallet's transactions in an id range, as a subquery"""
+    transactions = Transaction.objects.filter(**{field: OuterRef('pk')}, pk__gt=OuterRef(after))
+    if through is not None:
+        transactions = transactions.filter(pk__lte=OuterRef(through))
+    total = transactions.order_by().values(field).annotate(total=SumCents('amount')).values('total')
+    return Coalesce(Subquery(total, output_field=CENTS), Value(0), output_field=CENTS)
+
+
+def reconcile_range(low, high, high_water, full=False):
+    """
+    Reconcile the wallets with low <= id < high.
+
+    Args:
+        low, high: Wallet id range
+        high_water: Settled high-water mark from settled_high_water_mark()
+        full: Ignore checkpoints and replay each wallet's whole history
+
+    Returns:
+        (discrepancies, checkpoints): discrepancies is a list of dicts for
+        the wallets that do not reconcile, checkpoints a list of
+        (wallet_id, last_transaction_pk, balance) for the ones that do
+    """
+    wallets = Wallet.objects.filter(pk__gte=low, pk__lt=high)
+    if full:
+        wallets = wallets.annotate(since=Value(0), opening=Value(0, output_field=CENTS))
+    else:
+        wallets = wallets.annotate(
+            since=Coalesce(F('balance_checkpoint__last_transaction_pk'), Value(0)),
+            opening=Coalesce(Cents('balance_checkpoint__balance'), Value(0), output_field=CENTS),
+        )
+
+    shard_total = WalletShard.objects.filter(
+        wallet=OuterRef('pk')
+    ).order_by().values('wallet').annotate(total=SumCents('balance')).values('total')
+
+    rows = wallets.annotate(
+        # Credits still held on the shards of a sharded wallet
+        stored=Cents('balance') + Coalesce(Subquery(shard_total, output_field=CENTS), Value(0), output_field=CENTS),
+        # A checkpoint taken with a shorter settle window may be ahead of
+        # this run's high-water mark
+        through=Greatest(F('since'), Value(high_water)),
+    ).annotate(
+        settled_in=side_total('to_wallet', 'since', 'through'),
+        settled_out=side_total('from_wallet', 'since', 'through'),
+        recent_in=side_total('to_wallet', 'through'),
+        recent_out=side_total('from_wallet', 'through'),
+    ).values_list(
+        'pk', 'stored', 'since', 'through', 'opening',
+        'settled_in', 'settled_out', 'recent_in', 'recent_out'
+    )
+
+    discrepancies = []
+    checkpoints = []
+    for wallet_id, balance, since, through, opening, settled_in, settled_out, recent_in, recent_out in rows:
+        settled = opening + settled_in - settled_out
+        expected = settled + recent_in - recent_out
+
+        if balance != expected:
+            discrepancies.append({
+                'wallet_id': wallet_id,
+                'balance': from_cents(balance),
+                'expected': from_cents(expected),
+                'difference': from_cents(balance - expected),
+                'checkpoint_pk': since,
+            })
+        elif through > since or full:
+            checkpoints.append((wallet_id, through, from_cents(settled)))
+
+    return discrepancies, checkpoints
+
+
+def save_checkpoints(checkpoints):
+    """Create or move forward the checkpoints of reconciled wallets"""
+    BalanceCheckpoint.objects.bulk_create(
+        [
+            BalanceCheckpoint(wallet_id=wallet_id, last_transaction_pk=last_pk, balance=balance)
+            for wallet_id, last_pk, balance in checkpoints
+        ],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['wallet'],
+        update_fields=['last_transaction_pk', 'balance', 'updated_at']
+    )
@@ -0,0 +1,204 @@
+"""
+Versioned response cache for the service catalog.
+
+ServiceViewSet.list and retrieve are most of the read traffic and the
+catalog changes rarely, so their response data is kept in the Django cache
+under keys that embed generation counters:
+
+    labels          category names and business names/images, shown on
+                    every service; bumped by Category and business writes
+    all             bumped by every service write; unfiltered lists
+    category:<id>   bumped by writes to services in that category
+    service:<id>    bumped by writes to that service; detail responses
+    trending        bumped by each refresh of the trending scores; lists
+                    ordered by them
+
+Invalidation is an O(1) counter increment: entries keyed on an old
+generation are never read again and expire after SERVICE_CACHE_TIMEOUT.
+Generations are bumped when the write happens and again once its
+transaction commits, so a request that reads the old rows while the write
+is in flight cannot cache them under the new generation.
+
+Generation counters must be shared by every worker, so production needs a
+shared cache backend (see CACHES in core.settings). Without CACHE_URL the
+cache is off by default, and check_shared_cache warns at startup when it
+is enabled on a per-process cache.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.checks import Tags, Warning, register
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+GENERATION_PREFIX = 'services:generation:'
+RESPONSE_PREFIX = 'services:response:'
+HITS_KEY = 'services:cache:hits'
+MISSES_KEY = 'services:cache:misses'
+
+
+def new_generation():
+    # Counters that were evicted restart from the clock, never from a value
+    # an old entry may still be keyed on
+    return time.time_ns()
+
+
+def increment(key, initial):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, initial, timeout=None)
+        return cache.incr(key)
+
+
+def bump(*scopes):
+    """Invalidate every cached response depending on any of scopes"""
+    keys = {GENERATION_PREFIX + scope for scope in scopes}
+
+    def bump_now():
+        for key in keys:
+            increment(key, new_generation())
+
+    bump_now()
+    transaction.on_commit(bump_now)
+
+
+def invalidate_services(service_ids=(), category_ids=()):
+    """Invalidate lists and details showing the given services"""
+    bump(
+        'all',
+        *(f'service:{service_id}' for service_id in service_ids),
+        *(f'category:{category_id}' for category_id in category_ids if category_id is not None)
+    )
+
+
+def invalidate_labels():
+    """Invalidate every cached service response"""
+    bump('labels')
+
+
+def generations(scopes):
+    """Current generation of each scope, starting any that are missing"""
+    keys = [GENERATION_PREFIX + scope for scope in scopes]
+    current = cache.get_many(keys)
+    for key in keys:
+        if key not in current:
+            cache.add(key, new_generation(), timeout=None)
+            current[key] = cache.get(key)
+    return [current[key] for key in keys]
+
+
+# Backends whose entries live in one process
+PROCESS_LOCAL_CACHES = [
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+]
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Warn when the response cache is on but its generations are per process"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if not getattr(settings, 'SERVICE_CACHE_TIMEOUT', 300) or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        "SERVICE_CACHE_TIMEOUT is set but the default cache is not shared between processes.",
+        hint="Set CACHE_URL to a shared cache, or SERVICE_CACHE_TIMEOUT=0 when running several "
+             "workers: invalidations made in one worker are not seen by the others.",
+        obj=backend,
+        id='accounts.W001',
+    )]
+
+
+def cache_stats():
+    """Hit and miss counts of the service response cache"""
+    counts = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counts.get(HITS_KEY, 0), counts.get(MISSES_KEY, 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+    }
+
+
+class VersionedCacheMixin:
+    """
+    Caches list and retrieve response data for ServiceViewSet.
+
+    The key covers the action, the normalized query parameters, the URL
+    base (serialized image URLs are absolute), the requesting business for
+    ?my_services, and the generations of the scopes the response depends
+    on. A SERVICE_CACHE_TIMEOUT of 0 disables caching.
+
+    The key also serves as the ETag validator of ConditionalGetMixin, so
+    conditional requests are answered from the cache counters alone.
+    """
+
+    def get_version_validators(self):
+        if not getattr(settings, 'SERVICE_CACHE_TIMEOUT', 300):
+            return None
+        return {'cache_key': self.get_cache_key()}
+
+    def get_cache_scopes(self):
+        from .trending import TRENDING, orders_by_trending
+        if self.action == 'retrieve':
+            return ['labels', f'service:{self.kwargs[self.lookup_url_kwarg or self.lookup_field]}']
+        category_id = self.request.query_params.get('category', '')
+        scopes = ['labels', f'category:{int(category_id)}' if category_id.isdigit() else 'all']
+        if orders_by_trending(self.request):
+            # Bumped by each refresh of the scores
+            scopes.append(TRENDING)
+        return scopes
+
+    def get_cache_key(self):
+        # Read once per request, so the ETag and the cached data agree
+        if hasattr(self, '_cache_key'):
+            return self._cache_key
+        request = self.request
+        params = sorted(
+            (name, sorted(value for value in values if value))
+            for name, values in request.query_params.lists()
+        )
+        params = [(name, values) for name, values in params if values]
+        if request.query_params.get('my_services') and request.user.is_business:
+            params.append(('business', [str(request.user.pk)]))
+        scopes = self.get_cache_scopes()
+        parts = [
+            self.action,
+            request.build_absolute_uri('/'),
+            repr(params),
+            repr(self.kwargs),
+            repr(list(zip(scopes, generations(scopes)))),
+        ]
+        digest = hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+        self._cache_key = RESPONSE_PREFIX + digest
+        return self._cache_key
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        timeout = getattr(settings, 'SERVICE_CACHE_TIMEOUT', 300)
+        if not timeout:
+            return handler(request, *args, **kwargs)
+
+        key = self.get_cache_key()
+        data = cache.get(key)
+        if data is not None:
+            increment(HITS_KEY, 0)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        increment(MISSES_KEY, 0)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,192 @@
+"""
+Full-text search for services.
+
+DRF's SearchFilter compiles to ``LIKE '%term%'`` on every searched column,
+which cannot use an index. The backends here keep a full-text index over
+Service.name and Service.description instead:
+
+    MySQLFullTextBackend   FULLTEXT index, MATCH ... AGAINST in boolean mode
+    SQLiteFTS5Backend      FTS5 virtual table keyed by the service id
+    IContainsBackend       the old icontains scan, for any other database
+
+search() filters a Service queryset and annotates it with search_rank
+(higher is more relevant), so it combines with any other filter and
+ordering. Service.save and Service.delete call index() and remove();
+rebuild() reindexes everything, e.g. after bulk_create or
+QuerySet.update, which bypass save.
+
+Every word of the query must match, and the last word also matches as a
+prefix, like a search box being typed into.
+"""
+import re
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework.filters import BaseFilterBackend
+
+from .trending import TrendingOrderingFilter
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+SERVICE_TABLE = 'accounts_service'
+FTS_TABLE = 'accounts_service_fts'
+
+
+def search_terms(query):
+    """Split a search query into words, dropping operators and punctuation"""
+    return WORD_RE.findall(query or '')
+
+
+class SearchBackend(ABC):
+    """Base class for service search backends; subclasses implement search()"""
+
+    @abstractmethod
+    def search(self, queryset, query):
+        """Filter queryset to services matching query, annotated with search_rank"""
+
+    def index(self, service):
+        """Add or refresh one service in the index"""
+
+    def remove(self, service_id):
+        """Drop one service from the index"""
+
+    def rebuild(self):
+        """Reindex every service"""
+
+
+class IContainsBackend(SearchBackend):
+    """Unindexed fallback matching SearchFilter's behaviour"""
+
+    def search(self, queryset, query):
+        for term in search_terms(query):
+            queryset = queryset.filter(Q(name__icontains=term) | Q(description__icontains=term))
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class MySQLFullTextBackend(SearchBackend):
+    """
+    InnoDB FULLTEXT index on (name, description).
+
+    InnoDB maintains the index itself, so index() and remove() have nothing
+    to do. Words shorter than innodb_ft_min_token_size (3 by default) and
+    stopwords are not indexed and are left out of the query.
+    """
+
+    min_token_size = 3
+
+    def boolean_query(self, query):
+        terms = [term for term in search_terms(query) if len(term) >= self.min_token_size]
+        if not terms:
+            return ''
+        return ' '.join([*(f'+{term}' for term in terms[:-1]), f'+{terms[-1]}*'])
+
+    def search(self, queryset, query):
+        against = self.boolean_query(query)
+        if not against:
+            return IContainsBackend().search(queryset, query)
+        match = f"MATCH ({SERVICE_TABLE}.name, {SERVICE_TABLE}.description) AGAINST (%s IN BOOLEAN MODE)"
+        # A bare MATCH in the WHERE clause is what lets InnoDB use the index
+        return queryset.filter(
+            RawSQL(match, [against], output_field=BooleanField())
+        ).annotate(search_rank=RawSQL(match, [against], output_field=FloatField()))
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"OPTIMIZE TABLE {SERVICE_TABLE}")
+            cursor.fetchall()
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    """
+    FTS5 table holding a copy of each service's name and description, with
+    the service id as its rowid.
+    """
+
+    def match_query(self, query):
+        terms = search_terms(query)
+        if not terms:
+            return ''
+        return ' '.join([*(f'"{term}"' for term in terms[:-1]), f'"{terms[-1]}"*'])
+
+    def search(self, queryset, query):
+        match = self.match_query(query)
+        if not match:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+        # The uncorrelated id subquery lets the FTS5 table drive the query;
+        # rank (bm25, lower is better) is then looked up by rowid per match
+        matches = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        rank = RawSQL(
+            f"SELECT -rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = {SERVICE_TABLE}.id",
+            [match],
+            output_field=FloatField()
+        )
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank)
+
+    def index(self, service):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, name, description) VALUES (%s, %s, %s)",
+                [service.pk, service.name, service.description]
+            )
+
+    def remove(self, service_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [service_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description) "
+                f"SELECT id, name, description FROM {SERVICE_TABLE}"
+            )
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+
+VENDOR_BACKENDS = {
+    'mysql': MySQLFullTextBackend,
+    'sqlite': SQLiteFTS5Backend,
+}
+
+_backend = None
+
+
+def get_search_backend():
+    """
+    The configured search backend.
+
+    settings.SERVICE_SEARCH_BACKEND may name a SearchBackend class by dotted
+    path; by default the backend is picked for the database vendor.
+    """
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'SERVICE_SEARCH_BACKEND', None)
+        backend_class = import_string(path) if path else VENDOR_BACKENDS.get(connection.vendor, IContainsBackend)
+        _backend = backend_class()
+    return _backend
+
+
+class ServiceSearchFilter(BaseFilterBackend):
+    """Drop-in replacement for SearchFilter using the search backend"""
+
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return get_search_backend().search(queryset, query)
+
+
+class RankedOrderingFilter(TrendingOrderingFilter):
+    """OrderingFilter that orders search results by relevance unless ?ordering is given"""
+
+    def get_default_ordering(self, view):
+        ordering = super().get_default_ordering(view)
+        if view.request.query_params.get(ServiceSearchFilter.search_param, '').strip():
+            return ['-search_rank', *(ordering or [])]
+        return ordering
@@ -6,15 +6,30 @@ from django.utils.text import slugify
 from django.db import models
 from decimal import Decimal
 from .models import (
-    Wallet, Transaction, Service, Inquiry, InquiryMessage,
+    Wallet, Transaction, WalletMonthlySummary, Service, Inquiry, InquiryMessage,
     Review, ReviewComment, Category, BlogCategory, BlogPost, BlogComment,
     PaymentRequest, Conversation, ConversationMessage, SupportTicket, SupportMessage,
     ServiceReport
 )
+from .fieldsets import SparseFieldsetMixin
+from .images import VariantImageField
+from .money import MoneyField, MoneySerializerField
+from .prefetch import related_count
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 User = get_user_model()
 
+# Image fields take a width in extra_kwargs to be served as a resized variant
+serializers.ModelSerializer.serializer_field_mapping[models.ImageField] = VariantImageField
+
+
+class MoneyModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer rendering amounts stored as integer cents as "12.34" strings"""
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        MoneyField: MoneySerializerField,
+    }
+
 
 class UserSerializer(serializers.ModelSerializer):
     role_display = serializers.CharField(source='get_role_display', read_only=True)
@@ -37,7 +52,7 @@ class UserSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             "password": {"write_only": True},
             "username": {"required": False},
-            "profile_image": {"required": False},
+            "profile_image": {"required": False, "width": 512},
             "bio": {"required": False},
             "expertise": {"required": False},
         }
@@ -75,6 +90,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "email", "date_joined", "last_login", "is_business", "is_moderator"]
         extra_kwargs = {
+            "profile_image": {"width": 512},
             "username": {"required": True},
             "first_name": {"required": True},
             "last_name": {"required": True},
@@ -141,6 +157,8 @@ class UserProfileSerializer(serializers.ModelSerializer):
 class WalletSerializer(serializers.ModelSerializer):
     user_email = serializers.EmailField(source="user.email", read_only=True)
     username = serializers.CharField(source="user.username", read_only=True)
+    # Includes credits still held on the shards of a sharded wallet
+    balance = MoneySerializerField(source="total_balance", read_only=True)
 
     class Meta:
         model = Wallet
@@ -155,7 +173,7 @@ class WalletSerializer(serializers.ModelSerializer):
         ]
 
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(MoneyModelSerializer):
     from_email = serializers.EmailField(
         source="from_wallet.user.email", read_only=True, allow_null=True
     )
@@ -191,6 +209,15 @@ class TransactionSerializer(serializers.ModelSerializer):
         ]
 
 
+class WalletMonthlySummarySerializer(MoneyModelSerializer):
+    month = serializers.DateField(format="%Y-%m", read_only=True)
+
+    class Meta:
+        model = WalletMonthlySummary
+        fields = ["month", "transaction_type", "count", "inflow", "outflow"]
+        read_only_fields = fields
+
+
 class DepositSerializer(serializers.Serializer):
     amount = serializers.DecimalField(max_digits=10, decimal_places=2)
 
@@ -219,6 +246,17 @@ class TransferSerializer(serializers.Serializer):
         return value
 
 
+class BatchTransferSerializer(serializers.Serializer):
+    """Validates a list of (recipient_email, amount) payouts"""
+    MAX_TRANSFERS = 1000
+
+    transfers = serializers.ListField(
+        child=TransferSerializer(),
+        allow_empty=False,
+        max_length=MAX_TRANSFERS
+    )
+
+
 # for login process, replaces the default username field with email
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     username_field = "email"
@@ -239,10 +277,12 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ["created_at", "updated_at"]
 
 
-class ServiceSerializer(serializers.ModelSerializer):
+class ServiceSerializer(SparseFieldsetMixin, MoneyModelSerializer):
     business_name = serializers.CharField(source='business.username', read_only=True)
-    business_image = serializers.ImageField(source='business.profile_image', read_only=True)
+    business_image = VariantImageField(source='business.profile_image', width=96, read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
+    review_count = serializers.IntegerField(source='rating_count', read_only=True)
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
     
     class Meta:
         model = Service
@@ -254,13 +294,17 @@ class ServiceSerializer(serializers.ModelSerializer):
             "category",
             "category_name",
             "fixed_price",
+            "avg_rating",
+            "review_count",
+            "rating_histogram",
             "business",
             "business_name",
             "business_image",
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["business", "created_at", "updated_at"]
+        read_only_fields = ["business", "avg_rating", "created_at", "updated_at"]
+        extra_kwargs = {"logo": {"width": 512}}
         
     def validate_fixed_price(self, value):
         """Validate that the fixed price is not negative"""
@@ -380,9 +424,9 @@ class InquiryCreateSerializer(serializers.ModelSerializer):
             price = service.fixed_price
             
             # Check if customer has enough funds
-            if customer_wallet.balance < price:
+            if customer_wallet.total_balance < price:
                 raise serializers.ValidationError(
-                    f"Insufficient funds. This service requires {price} to open an inquiry. Your balance is {customer_wallet.balance}."
+                    f"Insufficient funds. This service requires {price} to open an inquiry. Your balance is {customer_wallet.total_balance}."
                 )
             
             # Use a transaction to ensure both the payment and inquiry creation are atomic
@@ -391,11 +435,15 @@ class InquiryCreateSerializer(serializers.ModelSerializer):
                 # Create the inquiry first
                 inquiry = Inquiry.objects.create(**validated_data)
                 
-                # Process the payment
-                transaction_record = customer_wallet.transfer(
-                    business_wallet, 
-                    price
-                )
+                # Process the payment. The balance check above can be stale
+                # under concurrent payments, the ledger re-checks it atomically
+                try:
+                    transaction_record = customer_wallet.transfer(
+                        business_wallet,
+                        price
+                    )
+                except ValueError as e:
+                    raise serializers.ValidationError(f"Payment failed: {str(e)}")
                 
                 # First create a message informing about the payment
                 InquiryMessage.objects.create(
@@ -546,9 +594,14 @@ class BlogCategorySerializer(serializers.ModelSerializer):
         model = BlogCategory
         fields = ['id', 'name', 'description', 'created_at', 'updated_at', 'post_count']
         read_only_fields = ['created_at', 'updated_at', 'post_count']
+        annotations = {
+            'published_post_count': related_count(BlogPost.objects.filter(is_published=True), 'category')
+        }
     
     def get_post_count(self, obj):
         """Return count of published posts in this category"""
+        if hasattr(obj, 'published_post_count'):
+            return obj.published_post_count
         return obj.blog_posts.filter(is_published=True).count()
 
 
@@ -556,7 +609,7 @@ class BlogCommentSerializer(serializers.ModelSerializer):
     """Serializer for blog comments"""
     author_name = serializers.CharField(source='author.username', read_only=True)
     author_role = serializers.CharField(source='author.get_role_display', read_only=True)
-    author_image = serializers.ImageField(source='author.profile_image', read_only=True)
+    author_image = VariantImageField(source='author.profile_image', width=48, read_only=True)
     
     class Meta:
         model = BlogComment
@@ -570,10 +623,10 @@ class BlogCommentSerializer(serializers.ModelSerializer):
         return BlogComment.objects.create(**validated_data)
 
 
-class BlogPostListSerializer(serializers.ModelSerializer):
+class BlogPostListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for listing blog posts with limited fields"""
     author_name = serializers.CharField(source='author.username', read_only=True)
-    author_image = serializers.ImageField(source='author.profile_image', read_only=True)
+    author_image = VariantImageField(source='author.profile_image', width=48, read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
     comment_count = serializers.SerializerMethodField()
     
@@ -583,16 +636,20 @@ class BlogPostListSerializer(serializers.ModelSerializer):
                  'author_image', 'category', 'category_name', 'created_at', 
                  'updated_at', 'views', 'comment_count', 'is_published']
         read_only_fields = ['slug', 'views', 'created_at', 'updated_at', 'comment_count', 'author']
+        extra_kwargs = {'image': {'width': 512}}
+        annotations = {'comments_total': related_count(BlogComment.objects.all(), 'blog_post')}
     
     def get_comment_count(self, obj):
         """Return count of comments on this post"""
+        if hasattr(obj, 'comments_total'):
+            return obj.comments_total
         return obj.comments.count()
 
 
 class BlogPostDetailSerializer(serializers.ModelSerializer):
     """Serializer for detailed blog post view including comments"""
     author_name = serializers.CharField(source='author.username', read_only=True)
-    author_image = serializers.ImageField(source='author.profile_image', read_only=True)
+    author_image = VariantImageField(source='author.profile_image', width=512, read_only=True)
     author_bio = serializers.CharField(source='author.bio', read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
     comments = BlogCommentSerializer(many=True, read_only=True)
@@ -604,6 +661,7 @@ class BlogPostDetailSerializer(serializers.ModelSerializer):
                  'category', 'category_name', 'created_at', 'updated_at', 
                  'is_published', 'views', 'comments']
         read_only_fields = ['slug', 'views', 'created_at', 'updated_at']
+        extra_kwargs = {'image': {'width': 1200}}
     
     def validate(self, data):
         """Ensure only authors and moderators can change publish status"""
@@ -666,9 +724,15 @@ class ModeratorSerializer(serializers.ModelSerializer):
             'profile_image',
             'active_inquiry_count',
         ]
+        extra_kwargs = {'profile_image': {'width': 256}}
+        annotations = {
+            'open_inquiry_count': related_count(Inquiry.objects.filter(status=Inquiry.Status.OPEN), 'moderator')
+        }
         
     def get_active_inquiry_count(self, obj):
         """Return the count of active (open) inquiries assigned to this moderator"""
+        if hasattr(obj, 'open_inquiry_count'):
+            return obj.open_inquiry_count
         return Inquiry.objects.filter(
             moderator=obj,
             status=Inquiry.Status.OPEN
@@ -720,7 +784,7 @@ class ModeratorRequestSerializer(serializers.Serializer):
         return inquiry
 
 
-class PaymentRequestSerializer(serializers.ModelSerializer):
+class PaymentRequestSerializer(MoneyModelSerializer):
     """Serializer for payment requests"""
     creator_name = serializers.CharField(source='creator.username', read_only=True)
     recipient_name = serializers.CharField(source='recipient.username', read_only=True)
@@ -905,12 +969,12 @@ class ConversationMessageSerializer(serializers.ModelSerializer):
         return ConversationMessage.objects.create(**validated_data)
 
 
-class ConversationSerializer(serializers.ModelSerializer):
+class ConversationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for conversations"""
     sender_name = serializers.CharField(source='sender.username', read_only=True)
     recipient_name = serializers.CharField(source='recipient.username', read_only=True)
-    sender_image = serializers.ImageField(source='sender.profile_image', read_only=True)
-    recipient_image = serializers.ImageField(source='recipient.profile_image', read_only=True)
+    sender_image = VariantImageField(source='sender.profile_image', width=48, read_only=True)
+    recipient_image = VariantImageField(source='recipient.profile_image', width=48, read_only=True)
     last_message = serializers.SerializerMethodField()
     unread_count = serializers.SerializerMethodField()
     
@@ -936,10 +1000,21 @@ class ConversationSerializer(serializers.ModelSerializer):
             'created_at', 
             'updated_at'
         ]
+        # unread_count depends on the user, so views annotate unread_for_user
+        prefetch_related = [
+            models.Prefetch(
+                'messages',
+                queryset=ConversationMessage.objects.select_related('sender').order_by('-created_at')[:1],
+                to_attr='latest_messages'
+            )
+        ]
     
     def get_last_message(self, obj):
         """Get the last message in the conversation"""
-        last_message = obj.messages.order_by('-created_at').first()
+        if hasattr(obj, 'latest_messages'):
+            last_message = obj.latest_messages[0] if obj.latest_messages else None
+        else:
+            last_message = obj.messages.order_by('-created_at').first()
         if last_message:
             return {
                 'id': last_message.message_id,
@@ -952,6 +1027,8 @@ class ConversationSerializer(serializers.ModelSerializer):
     def get_unread_count(self, obj):
         """Get the count of unread messages for the current user"""
         request = self.context.get('request')
+        if hasattr(obj, 'unread_for_user'):
+            return obj.unread_for_user
         if request and hasattr(request, 'user'):
             user = request.user
             return obj.messages.filter(is_read=False).exclude(sender=user).count()
@@ -1107,7 +1184,7 @@ class ConversationActionSerializer(serializers.Serializer):
             sender_wallet = conversation.sender.wallet
             fee_amount = Decimal('5.00')  # 5€ fixed fee
             
-            if sender_wallet.balance < fee_amount:
+            if sender_wallet.total_balance < fee_amount:
                 raise serializers.ValidationError("The sender does not have sufficient funds for this conversation")
                 
         return data
@@ -1140,12 +1217,25 @@ class SupportTicketSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'messages_count', 'last_message'
         ]
         read_only_fields = ['user', 'status', 'moderator', 'ticket_id']
+        annotations = {'messages_total': related_count(SupportMessage.objects.all(), 'ticket')}
+        prefetch_related = [
+            models.Prefetch(
+                'messages',
+                queryset=SupportMessage.objects.select_related('sender').order_by('-created_at')[:1],
+                to_attr='latest_messages'
+            )
+        ]
     
     def get_messages_count(self, obj):
+        if hasattr(obj, 'messages_total'):
+            return obj.messages_total
         return obj.messages.count()
     
     def get_last_message(self, obj):
-        last_message = obj.messages.order_by('-created_at').first()
+        if hasattr(obj, 'latest_messages'):
+            last_message = obj.latest_messages[0] if obj.latest_messages else None
+        else:
+            last_message = obj.messages.order_by('-created_at').first()
         if last_message:
             return {
                 'content': last_message.content[:100] + ('...' if len(last_message.content) > 100 else ''),
@@ -1227,6 +1317,7 @@ class ServiceReportSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['reporter', 'reviewer', 'status']
+        select_related = ['service', 'reporter', 'reviewer']
     
     def get_reporter_name(self, obj):
         return obj.reporter.username if obj.reporter else None
@@ -9,8 +9,9 @@ from django.shortcuts import get_object_or_404
 
 from .models import ServiceReport, Service, SupportTicket, SupportMessage, User
 from .serializers import ServiceReportSerializer, ServiceReportReviewSerializer
+from .prefetch import OptimizedQuerysetMixin
 
-class ServiceReportListView(generics.ListAPIView):
+class ServiceReportListView(OptimizedQuerysetMixin, generics.ListAPIView):
     """
     API endpoint for listing all service reports
     Only moderators can see all reports
@@ -38,7 +39,7 @@ class ServiceReportCreateView(generics.CreateAPIView):
         # Set the reporter to the current user
         serializer.save(reporter=self.request.user)
 
-class ServiceReportDetailView(generics.RetrieveAPIView):
+class ServiceReportDetailView(OptimizedQuerysetMixin, generics.RetrieveAPIView):
     """
     API endpoint for retrieving a specific service report
     Moderators can see any report, users can only see their own
@@ -0,0 +1,88 @@
+"""
+Content-addressed media storage.
+
+ContentAddressedStorage names every saved file by the SHA-256 of its bytes,
+inside the directory its upload_to chose:
+
+    service_logos/photo.png  ->  service_logos/3f/3f9a...c2.png
+
+Identical uploads, and the identical variants accounts.images renders from
+them, are stored once and shared by every row naming them. A name never
+changes content, so serve_media sends such files with a far-future
+immutable Cache-Control header.
+
+Because blobs are shared, delete() leaves the file in place; the
+collect_media command removes blobs no row references any more. Saving
+bytes that are already stored touches the blob, so a reused file counts as
+recent to the collector's grace period. Files
+saved before this storage keep their names and ordinary caching.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+
+# One year, the longest max-age caches are expected to honour
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+HASHED_NAME = re.compile(r'(^|/)([0-9a-f]{2})/\2[0-9a-f]{62}(\.[0-9a-z]+)?$')
+TEMPORARY_NAME = re.compile(r'(^|/)\.[0-9a-f]{32}\.tmp$')
+
+
+def is_content_addressed(name):
+    return HASHED_NAME.search(name) is not None
+
+
+def is_temporary(name):
+    """Whether name is a partial write of ContentAddressedStorage"""
+    return TEMPORARY_NAME.search(name) is not None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that stores each distinct file once, under its hash"""
+
+    def get_available_name(self, name, max_length=None):
+        # _save picks the final name, which is free unless it holds the same bytes
+        return name
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        directory, filename = posixpath.split(name.replace('\\', '/'))
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(directory, digest[:2], f'{digest}{extension}')
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Refresh the blob's age so collect_media's grace period covers
+            # the row about to reference it
+            os.utime(self.path(name))
+            return name
+        # Written under a unique name and renamed, so a concurrent save of
+        # the same bytes replaces it with an identical file
+        directory = posixpath.dirname(name)
+        temporary = super()._save(posixpath.join(directory, f'.{uuid.uuid4().hex}.tmp'), content)
+        os.replace(self.path(temporary), self.path(name))
+        return name
+
+    def delete(self, name):
+        """Keep the blob: other rows may name it (see collect_media)"""
+
+    def purge(self, name):
+        """Remove the file for good"""
+        super().delete(name)
+
+
+def serve_media(request, path, document_root=None):
+    """django.views.static.serve, caching content-addressed files forever"""
+    response = serve(request, path, document_root=document_root)
+    if response.status_code == 200 and is_content_addressed(path):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    return response
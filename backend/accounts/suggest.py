@@ -0,0 +1,354 @@
+"""
+In-memory autocomplete index for the service search box.
+
+Each worker keeps its own index of service names, category names and
+business usernames, and answers lookups without touching the database.
+Labels are split into words, and the index is kept over the word
+vocabulary, which is far smaller than the catalog:
+
+- each query word is matched against the vocabulary exactly, as a prefix
+  for the last word ("clea" finds "cleaning"), and by trigram similarity
+  for typos ("plumbng" finds "plumbing")
+- each vocabulary word has a postings list of the labels using it, kept
+  sorted by suggestion order so the best candidates are read first
+
+A label matches when every query word matches one of its words; labels
+score by the mean similarity of those matches, plus bonuses for starting
+with the first query word and for having few other words. At most
+MAX_CANDIDATES labels per source are scored, so lookups stay well under a
+millisecond however common the query words are.
+
+The index is built once (at worker startup from core.wsgi, or on the first
+lookup) and then kept current from CatalogChange: refresh() applies the
+changes after the last version it has seen, reloading just the objects
+they name. start_refresher() runs refresh() every
+SUGGEST_REFRESH_SECONDS on a daemon thread.
+
+CatalogChange ids are assigned before commit, so a change with a lower id
+than one already visible may still be in flight. As in
+accounts.reconciliation, the version only advances to the highest change
+created at least SUGGEST_SETTLE_SECONDS ago; newer changes are applied
+as soon as they are seen and remembered, so each is applied once, and
+late commits below them are picked up by the next refresh.
+"""
+import heapq
+import logging
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+from .models import CatalogChange, Category, Service, User
+
+logger = logging.getLogger(__name__)
+
+KIND_ORDER = {
+    CatalogChange.Kind.SERVICE: 0,
+    CatalogChange.Kind.CATEGORY: 1,
+    CatalogChange.Kind.BUSINESS: 2,
+}
+WORD_RE = re.compile(r'[^\W_]+')
+MIN_SIMILARITY = 0.3
+# Bounds on the work per lookup, so one-letter queries stay cheap
+MAX_PREFIX_WORDS = 200
+MAX_CANDIDATES = 200
+MAX_CHANGES_PER_REFRESH = 5000
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse whitespace"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.lower().split())
+
+
+def tokenize(text):
+    """Normalized words of a label, splitting usernames on underscores"""
+    return tuple(WORD_RE.findall(normalize(text)))
+
+
+def trigrams(text):
+    """Trigrams of each word padded like pg_trgm: '  w', ' wo', 'wor', 'ord', 'rd '"""
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def settled_version():
+    """Highest CatalogChange id created at least SUGGEST_SETTLE_SECONDS ago, or 0"""
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'SUGGEST_SETTLE_SECONDS', 60))
+    pk = CatalogChange.objects.filter(created_at__lte=cutoff).order_by('-pk').values_list('pk', flat=True).first()
+    return pk or 0
+
+
+def load_labels(kind, ids=None):
+    """(id, label) pairs for one kind of suggestion, optionally limited to ids"""
+    if kind == CatalogChange.Kind.SERVICE:
+        rows = Service.objects.values_list('pk', 'name')
+    elif kind == CatalogChange.Kind.CATEGORY:
+        rows = Category.objects.values_list('pk', 'name')
+    else:
+        rows = User.objects.filter(role=User.Role.BUSINESS).values_list('pk', 'username')
+    if ids is not None:
+        rows = rows.filter(pk__in=ids)
+    return rows.order_by().iterator(chunk_size=5000)
+
+
+class SuggestIndex:
+    """Word vocabulary index over (kind, id) -> label"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        # Ids above version that have been applied but may still have
+        # unsettled ids below them
+        self.applied = set()
+        self.labels = {}
+        self.words = {}
+        self.order = {}
+        self.postings = {}
+        self.leading = defaultdict(list)
+        self.vocabulary = []
+        self.word_grams = defaultdict(set)
+
+    @property
+    def is_built(self):
+        return self.version is not None
+
+    def add(self, key, label, presorted=True):
+        """Index one label; with presorted=False the caller must call sort()"""
+        self.remove(key)
+        words = tokenize(label)
+        if not words:
+            return
+        order = (label.lower(), KIND_ORDER[key[0]], key)
+        self.labels[key] = label
+        self.words[key] = words
+        self.order[key] = order
+        for word in set(words):
+            if word not in self.postings:
+                self.postings[word] = []
+                for gram in trigrams(word):
+                    self.word_grams[gram].add(word)
+                self.insert(self.vocabulary, word, presorted)
+            self.insert(self.postings[word], order, presorted)
+        self.insert(self.leading[words[0]], order, presorted)
+
+    @staticmethod
+    def insert(entries, entry, presorted):
+        if presorted:
+            insort(entries, entry)
+        else:
+            entries.append(entry)
+
+    @staticmethod
+    def discard(entries, entry):
+        position = bisect_left(entries, entry)
+        if position < len(entries) and entries[position] == entry:
+            del entries[position]
+
+    def remove(self, key):
+        words = self.words.pop(key, None)
+        if words is None:
+            return
+        del self.labels[key]
+        order = self.order.pop(key)
+        self.discard(self.leading[words[0]], order)
+        if not self.leading[words[0]]:
+            del self.leading[words[0]]
+        for word in set(words):
+            self.discard(self.postings[word], order)
+            if not self.postings[word]:
+                del self.postings[word]
+                self.discard(self.vocabulary, word)
+                for gram in trigrams(word):
+                    self.word_grams[gram].discard(word)
+                    if not self.word_grams[gram]:
+                        del self.word_grams[gram]
+
+    def sort(self):
+        self.vocabulary.sort()
+        for entries in (*self.postings.values(), *self.leading.values()):
+            entries.sort()
+
+    def build(self):
+        """Load every label from the database"""
+        # Read the version first: changes after it, including ones made while
+        # loading, are applied again by the next refresh, which is harmless
+        version = settled_version()
+        index = SuggestIndex()
+        for kind in KIND_ORDER:
+            for object_id, label in load_labels(kind):
+                index.add((kind, object_id), label, presorted=False)
+        index.sort()
+        with self.lock:
+            self.labels, self.words, self.order = index.labels, index.words, index.order
+            self.postings, self.leading = index.postings, index.leading
+            self.vocabulary, self.word_grams = index.vocabulary, index.word_grams
+            self.version = version
+            self.applied = set()
+
+    def refresh(self):
+        """Apply the catalog changes made since the last build or refresh"""
+        if not self.is_built:
+            self.build()
+            return
+
+        # Read before the changes, so every change at or below it is seen
+        settled = settled_version()
+        changes = list(
+            CatalogChange.objects.filter(pk__gt=self.version)
+            .order_by('pk')
+            .values_list('pk', 'kind', 'object_id')[:MAX_CHANGES_PER_REFRESH]
+        )
+        if not changes:
+            return
+        if (
+            self.version and changes[0][0] > self.version + 1
+            and not CatalogChange.objects.filter(pk__lte=self.version).exists()
+        ):
+            # The changes right after our version may have been pruned
+            self.build()
+            return
+
+        changed = defaultdict(set)
+        for pk, kind, object_id in changes:
+            if pk not in self.applied:
+                changed[kind].add(object_id)
+        current = {
+            (kind, object_id): label
+            for kind, ids in changed.items()
+            for object_id, label in load_labels(kind, ids)
+        }
+
+        with self.lock:
+            for kind, ids in changed.items():
+                for object_id in ids:
+                    key = (kind, object_id)
+                    if key in current:
+                        self.add(key, current[key])
+                    else:
+                        self.remove(key)
+            # Only move past changes no earlier id can still commit behind
+            self.version = max(self.version, min(settled, changes[-1][0]))
+            self.applied = {pk for pk in self.applied | {pk for pk, *_ in changes} if pk > self.version}
+
+    def match_words(self, word, prefix):
+        """Vocabulary words matching one query word, mapped to their similarity"""
+        matches = {}
+        if prefix:
+            start = bisect_left(self.vocabulary, word)
+            for candidate in self.vocabulary[start:start + MAX_PREFIX_WORDS]:
+                if not candidate.startswith(word):
+                    break
+                matches[candidate] = 1.0
+        elif word in self.postings:
+            matches[word] = 1.0
+
+        if len(word) >= 3:
+            grams = trigrams(word)
+            shared = Counter()
+            for gram in grams:
+                shared.update(self.word_grams.get(gram, ()))
+            for candidate, count in shared.items():
+                if candidate in matches:
+                    continue
+                # Each padded word has one trigram per character plus one
+                similarity = count / (len(grams) + len(candidate) + 1 - count)
+                if similarity >= MIN_SIMILARITY:
+                    matches[candidate] = similarity
+        return matches
+
+    def suggest(self, query, limit=10):
+        """
+        Top suggestions for a partial query.
+
+        Returns:
+            List of {'type', 'id', 'label'} dicts, best match first
+        """
+        query_words = tokenize(query)
+        if not query_words:
+            return []
+        if not self.is_built:
+            self.build()
+
+        with self.lock:
+            matches = [
+                self.match_words(word, prefix=position == len(query_words) - 1)
+                for position, word in enumerate(query_words)
+            ]
+            if not all(matches):
+                return []
+
+            # Candidates are read best matching words first: labels starting
+            # with the first query word, then labels using the most
+            # selective query word anywhere
+            candidates = set()
+            driver = min(matches, key=lambda words: sum(len(self.postings[word]) for word in words))
+            for words, postings in ((matches[0], self.leading), (driver, self.postings)):
+                found = 0
+                for word in sorted(words, key=words.get, reverse=True):
+                    entries = postings.get(word, ())[:MAX_CANDIDATES - found]
+                    candidates.update(order[2] for order in entries)
+                    found += len(entries)
+                    if found >= MAX_CANDIDATES:
+                        break
+
+            scored = []
+            for key in candidates:
+                label_words = self.words[key]
+                total = 0
+                for words in matches:
+                    best = 0
+                    for word in label_words:
+                        similarity = words.get(word, 0)
+                        if similarity > best:
+                            best = similarity
+                    if not best:
+                        break
+                    total += best
+                else:
+                    # Favour labels that start with the query and have few
+                    # unmatched words
+                    score = total / len(matches) + 0.25 * len(matches) / len(label_words)
+                    if matches[0].get(label_words[0]) == 1.0:
+                        score += 0.5
+                    label, kind_order, _ = self.order[key]
+                    scored.append((-score, kind_order, label, key))
+
+            return [
+                {'type': kind.lower(), 'id': object_id, 'label': self.labels[(kind, object_id)]}
+                for *_, (kind, object_id) in heapq.nsmallest(limit, scored)
+            ]
+
+
+suggest_index = SuggestIndex()
+
+
+def start_refresher(index=suggest_index):
+    """Build the index and keep it refreshed on a daemon thread"""
+    interval = getattr(settings, 'SUGGEST_REFRESH_SECONDS', 2)
+    stop = threading.Event()
+
+    def run():
+        while True:
+            try:
+                index.refresh()
+            except DatabaseError:
+                logger.exception("Could not refresh the suggestion index")
+            finally:
+                connections.close_all()
+            if stop.wait(interval):
+                return
+
+    thread = threading.Thread(target=run, name='suggest-refresher', daemon=True)
+    thread.start()
+    return stop
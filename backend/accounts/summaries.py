@@ -0,0 +1,144 @@
+"""
+Incremental maintenance of WalletMonthlySummary rows.
+
+Every new Transaction adds to one summary row per wallet it touches:
+the destination wallet's inflow and the source wallet's outflow, in the
+(month, transaction type) bucket of its created_at. Callers must already be
+inside the database transaction that created the Transaction rows.
+
+Deltas and totals are kept in integer cents, see accounts.money.
+"""
+from collections import defaultdict
+
+from django.db.models import BigIntegerField, Case, Count, DateField, F, IntegerField, Value, When
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Transaction, WalletMonthlySummary
+from .money import Cents, SumCents, to_cents
+
+CHUNK_SIZE = 500
+
+
+def month_of(moment):
+    """First day of the month containing moment, in the current timezone"""
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def summary_deltas(transactions):
+    """
+    Group transactions into summary deltas.
+
+    Returns:
+        Dict mapping (wallet_id, month, transaction_type) to
+        [count, inflow cents, outflow cents]
+    """
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for tx in transactions:
+        month = month_of(tx.created_at)
+        cents = to_cents(tx.amount)
+        if tx.to_wallet_id is not None:
+            delta = deltas[(tx.to_wallet_id, month, tx.transaction_type)]
+            delta[0] += 1
+            delta[1] += cents
+        if tx.from_wallet_id is not None:
+            delta = deltas[(tx.from_wallet_id, month, tx.transaction_type)]
+            delta[0] += 1
+            delta[2] += cents
+    return deltas
+
+
+def record_transactions(transactions):
+    """
+    Add newly created transactions to the monthly summaries.
+
+    Existing rows are incremented with F() expressions, so concurrent writers
+    never overwrite each other. Missing rows are first inserted empty with
+    ignore_conflicts, which is safe when two writers create the same row.
+    The common case (all rows exist) costs one SELECT and one UPDATE per
+    chunk of summary rows.
+    """
+    deltas = summary_deltas(transactions)
+    keys = sorted(deltas)
+
+    for start in range(0, len(keys), CHUNK_SIZE):
+        chunk = keys[start:start + CHUNK_SIZE]
+        ids = summary_ids(chunk)
+
+        missing = [key for key in chunk if key not in ids]
+        if missing:
+            WalletMonthlySummary.objects.bulk_create(
+                [
+                    WalletMonthlySummary(wallet_id=wallet_id, month=month, transaction_type=tx_type)
+                    for wallet_id, month, tx_type in missing
+                ],
+                ignore_conflicts=True
+            )
+            ids.update(summary_ids(missing))
+
+        def increments(index, output_field):
+            return Case(
+                *[When(pk=ids[key], then=Value(deltas[key][index])) for key in chunk],
+                output_field=output_field
+            )
+
+        WalletMonthlySummary.objects.filter(pk__in=[ids[key] for key in chunk]).update(
+            count=F('count') + increments(0, IntegerField()),
+            inflow=F('inflow') + increments(1, BigIntegerField()),
+            outflow=F('outflow') + increments(2, BigIntegerField()),
+        )
+
+
+def summary_ids(keys):
+    """Map (wallet_id, month, transaction_type) keys to existing summary row ids"""
+    rows = WalletMonthlySummary.objects.filter(
+        wallet_id__in={key[0] for key in keys},
+        month__in={key[1] for key in keys}
+    ).values_list('pk', 'wallet_id', 'month', 'transaction_type')
+
+    wanted = set(keys)
+    return {
+        (wallet_id, month, tx_type): pk
+        for pk, wallet_id, month, tx_type in rows
+        if (wallet_id, month, tx_type) in wanted
+    }
+
+
+def aggregate_ledger():
+    """
+    Compute every summary row from the Transaction table.
+
+    Returns:
+        Dict mapping (wallet_id, month, transaction_type) to
+        [count, inflow cents, outflow cents]
+    """
+    totals = defaultdict(lambda: [0, 0, 0])
+    for field, index in (('to_wallet', 1), ('from_wallet', 2)):
+        rows = Transaction.objects.filter(
+            **{f'{field}__isnull': False}
+        ).annotate(
+            month=TruncMonth('created_at', output_field=DateField())
+        ).values(field, 'month', 'transaction_type').annotate(
+            count=Count('id'),
+            total=SumCents('amount')
+        ).order_by()
+
+        for row in rows:
+            entry = totals[(row[field], row['month'], row['transaction_type'])]
+            entry[0] += row['count']
+            entry[index] += row['total']
+    return totals
+
+
+def current_summaries():
+    """Return the stored summary rows keyed like aggregate_ledger()"""
+    return {
+        (wallet_id, month, tx_type): [count, inflow, outflow]
+        for wallet_id, month, tx_type, count, inflow, outflow in
+        WalletMonthlySummary.objects.annotate(
+            inflow_cents=Cents('inflow'),
+            outflow_cents=Cents('outflow'),
+        ).values_list(
+            'wallet_id', 'month', 'transaction_type', 'count', 'inflow_cents', 'outflow_cents'
+        )
+    }
@@ -6,8 +6,9 @@ from django.contrib.auth import get_user_model
 from decimal import Decimal
 from django.utils.text import slugify
 from .models import (
-    User, BlogCategory, BlogPost, BlogComment
+    User, BlogCategory, BlogPost, BlogComment, BlogPostTrend
 )
+from .trending import refresh
 
 User = get_user_model()
 
@@ -569,4 +570,90 @@ class BlogAPITestCase(APITestCase):
         # Get customer's posts - as moderator (should see all)
         response = self.moderator_client.get(self.user_posts_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)  # Both posts
\ No newline at end of file
+        self.assertEqual(len(response.data), 2)  # Both posts
+
+class BlogConditionalGetTestCase(APITestCase):
+    """Test case for ETag support on blog posts"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+        self.reader = User.objects.create_user(
+            username="reader",
+            email="reader@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+        self.post = BlogPost.objects.create(
+            title="Choosing a plumber",
+            content="Ask for a fixed price.",
+            author=self.author
+        )
+        self.client.force_authenticate(user=self.reader)
+        self.url = reverse('accounts:blog-post-detail', args=[self.post.id])
+
+    def test_not_modified_still_counts_views(self):
+        """Test that a 304 detail response still records the view"""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 2)
+
+    def test_comment_changes_etag(self):
+        """Test that a new comment invalidates the post's ETag"""
+        etag = self.client.get(self.url)['ETag']
+        BlogComment.objects.create(blog_post=self.post, author=self.reader, content="Good tip")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['comments']), 1)
+
+
+class BlogTrendingTestCase(APITestCase):
+    """Test case for trending blog posts"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+        self.reader = User.objects.create_user(
+            username="reader",
+            email="reader@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+        self.posts = [
+            BlogPost.objects.create(
+                title=f"Post {i}", slug=f"post-{i}", content="Content", author=self.author, is_published=True
+            )
+            for i in range(3)
+        ]
+        self.client.force_authenticate(user=self.reader)
+        self.url = reverse('accounts:blog-post-list')
+
+    def test_views_and_comments_trend(self):
+        """Test that new views and comments since the last refresh rank posts"""
+        refresh()
+        for _ in range(30):
+            self.posts[2].increment_views()
+        BlogComment.objects.create(blog_post=self.posts[1], author=self.reader, content="Useful")
+        etag = self.client.get(self.url, {'ordering': 'trending'})['ETag']
+        refresh()
+
+        response = self.client.get(self.url, {'ordering': 'trending'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([post['id'] for post in response.data], [post.id for post in reversed(self.posts)])
+        trend = BlogPostTrend.objects.get(post=self.posts[2])
+        self.assertEqual(trend.views_seen, 30)
+
+        # Views already scored do not count again
+        refresh()
+        trend.refresh_from_db()
+        self.assertLess(trend.score, 3)
@@ -1,12 +1,18 @@
-from django.test import TestCase
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from io import BytesIO
+from io import BytesIO, StringIO
+from unittest import mock
 from PIL import Image
-from .models import Service, Category
+from . import images
+from .models import (
+    Service, Category, ImageJob, BlogCategory, BlogPost, BlogComment, Conversation
+)
 import os
 import tempfile
 
@@ -21,10 +27,24 @@ def create_test_image(width=512, height=512, color='blue', format='JPEG'):
     file.seek(0)
     return file
 
-class UserProfileImageTests(APITestCase):
+
+class TemporaryMediaMixin:
+    """Stores uploads in a temporary MEDIA_ROOT, removed after each test"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        super().setUp()
+
+
+class UserProfileImageTests(TemporaryMediaMixin, APITestCase):
     """Test case for user profile image functionality"""
     
     def setUp(self):
+        super().setUp()
         # Create users with different roles
         self.customer = User.objects.create_user(
             username="customer",
@@ -86,10 +106,11 @@ class UserProfileImageTests(APITestCase):
         self.assertFalse(self.customer.profile_image)
 
 
-class ServiceImageTests(APITestCase):
+class ServiceImageTests(TemporaryMediaMixin, APITestCase):
     """Test case for service image functionality"""
     
     def setUp(self):
+        super().setUp()
         # Create a business user
         self.business = User.objects.create_user(
             username="business",
@@ -179,12 +200,6 @@ class ServiceImageTests(APITestCase):
         )
         
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
-        
-    def tearDown(self):
-        # Clean up test image files
-        if self.service.logo:
-            if os.path.exists(self.service.logo.path):
-                os.remove(self.service.logo.path)
 
 
 class CategoryTests(APITestCase):
@@ -275,4 +290,169 @@ class CategoryTests(APITestCase):
         self.assertEqual(len(response.data), 2)
         
         response = self.client.get(f"{url}?category={category2.id}")
-        self.assertEqual(len(response.data), 1)
\ No newline at end of file
+        self.assertEqual(len(response.data), 1)
+
+class ImageVariantTests(TemporaryMediaMixin, APITestCase):
+    """Uploads are stored as they come and resized by the process_images command"""
+
+    def setUp(self):
+        super().setUp()
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+        self.service = Service.objects.create(
+            name="Test Service",
+            description="A service for testing",
+            business=self.business
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.business)
+
+    def upload(self, width=800, height=600):
+        file = BytesIO()
+        Image.new('RGBA', (width, height), color=(255, 0, 0, 128)).save(file, format='PNG')
+        response = self.client.patch(
+            reverse('accounts:profile'),
+            {'profile_image': SimpleUploadedFile('photo.png', file.getvalue(), content_type='image/png')},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.business.refresh_from_db()
+        return response
+
+    def process(self, *args):
+        call_command('process_images', '--once', *args, stdout=StringIO(), stderr=StringIO())
+
+    def test_upload_queues_variants(self):
+        """Test that an upload stores the original and queues a job"""
+        response = self.upload()
+
+        self.assertEqual(self.business.profile_image_variants, {})
+        with Image.open(self.business.profile_image.path) as img:
+            self.assertEqual(img.size, (800, 600))
+        self.assertTrue(response.data['profile_image'].endswith(self.business.profile_image.name))
+        job = ImageJob.objects.get()
+        self.assertEqual(
+            (job.model, job.object_id, job.field, job.source, job.status),
+            ('accounts.user', self.business.pk, 'profile_image', self.business.profile_image.name, ImageJob.Status.PENDING)
+        )
+
+    def test_oversized_upload_rejected(self):
+        """Test that originals larger than MAX_ORIGINAL_SIZE are rejected"""
+        file = BytesIO()
+        Image.new('RGB', (800, 600)).save(file, format='PNG')
+        with mock.patch.object(images, 'MAX_ORIGINAL_SIZE', 400):
+            response = self.client.patch(
+                reverse('accounts:profile'),
+                {'profile_image': SimpleUploadedFile('photo.png', file.getvalue(), content_type='image/png')},
+                format='multipart'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('profile_image', response.data)
+        self.business.refresh_from_db()
+        self.assertFalse(self.business.profile_image)
+        self.assertFalse(ImageJob.objects.exists())
+
+    def test_process_stores_variants(self):
+        """Test that processing renders every box and serializers switch to the variants"""
+        self.upload()
+        self.process('--workers', '0')
+
+        self.business.refresh_from_db()
+        variants = self.business.profile_image_variants
+        self.assertEqual(set(variants), {'48', '96', '256', '512'})
+        for width, name in variants.items():
+            with Image.open(os.path.join(settings.MEDIA_ROOT, name)) as img:
+                self.assertEqual(img.size, (int(width), int(width)))
+                self.assertEqual(img.format, 'JPEG')
+        self.assertFalse(ImageJob.objects.exists())
+
+        profile = self.client.get(reverse('accounts:profile')).data
+        self.assertTrue(profile['profile_image'].endswith(variants['512']))
+        service = self.client.get(reverse('accounts:service-detail', kwargs={'pk': self.service.id})).data
+        self.assertTrue(service['business_image'].endswith(variants['96']))
+
+    def test_process_pool(self):
+        """Test rendering in worker processes"""
+        self.upload()
+        self.process('--workers', '2')
+        self.business.refresh_from_db()
+        self.assertEqual(set(self.business.profile_image_variants), {'48', '96', '256', '512'})
+
+    def test_replaced_image(self):
+        """Test that a newer upload replaces the queued job and stale renders are not stored"""
+        self.upload()
+        stale = ImageJob.objects.get()
+        self.upload(width=300, height=300)
+        job = ImageJob.objects.get()
+        self.assertEqual(job.source, self.business.profile_image.name)
+
+        variants = images.render_variants(stale.source, User.IMAGE_VARIANTS['profile_image'])
+        self.assertFalse(images.store_variants(stale, variants))
+        self.business.refresh_from_db()
+        self.assertEqual(self.business.profile_image_variants, {})
+
+    def test_failed_render(self):
+        """Test that a render that keeps failing is retried, then left as FAILED"""
+        self.upload()
+        job = ImageJob.objects.get()
+        with open(os.path.join(settings.MEDIA_ROOT, job.source), 'wb') as file:
+            file.write(b'not an image')
+
+        for _ in range(images.MAX_ATTEMPTS):
+            self.process('--workers', '0')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (ImageJob.Status.FAILED, images.MAX_ATTEMPTS))
+        self.assertTrue(job.error)
+        self.business.refresh_from_db()
+        self.assertEqual(self.business.profile_image_variants, {})
+
+    def test_backfill(self):
+        """Test that --backfill queues images missing a variant, e.g. a new thumbnail size"""
+        self.upload()
+        self.process('--workers', '0')
+        self.service.logo = SimpleUploadedFile('logo.jpg', create_test_image().getvalue(), content_type='image/jpeg')
+        self.service.save()
+        ImageJob.objects.all().delete()
+        self.business.refresh_from_db()
+        full = {width: name for width, name in self.business.profile_image_variants.items() if width in ('256', '512')}
+        User.objects.filter(pk=self.business.pk).update(profile_image_variants=full)
+
+        self.process('--workers', '2', '--backfill')
+        self.business.refresh_from_db()
+        self.service.refresh_from_db()
+        self.assertEqual(set(self.business.profile_image_variants), {'48', '96', '256', '512'})
+        self.assertEqual(set(self.service.logo_variants), {'48', '96', '256', '512'})
+
+        self.process('--workers', '0', '--backfill')
+        self.assertFalse(ImageJob.objects.exists())
+
+    def test_list_thumbnails(self):
+        """Test that list serializers emit thumbnails and details the full image"""
+        self.upload()
+        self.process('--workers', '0')
+        self.business.refresh_from_db()
+        variants = self.business.profile_image_variants
+        category = BlogCategory.objects.create(name="Tips", description="")
+        post = BlogPost.objects.create(
+            title="Post", slug="post", content="Content", author=self.business, category=category
+        )
+        BlogComment.objects.create(blog_post=post, author=self.business, content="Comment")
+        Conversation.objects.create(sender=self.business, recipient=User.objects.create_user(
+            username="customer", email="customer@example.com", password="password123"
+        ))
+
+        services = self.client.get(reverse('accounts:service-list')).json()
+        self.assertTrue(services[0]['business_image'].endswith(variants['96']))
+        posts = self.client.get('/api/blog/posts/').json()
+        self.assertTrue(posts[0]['author_image'].endswith(variants['48']))
+        detail = self.client.get(f'/api/blog/posts/{post.id}/').json()
+        self.assertTrue(detail['author_image'].endswith(variants['512']))
+        self.assertTrue(detail['comments'][0]['author_image'].endswith(variants['48']))
+        conversation = self.client.get('/api/conversations/').json()[0]
+        self.assertTrue(conversation['sender_image'].endswith(variants['48']))
+        self.assertIsNone(conversation['recipient_image'])
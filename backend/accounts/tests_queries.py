@@ -0,0 +1,219 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from .models import (
+    User, Category, Service, Inquiry, InquiryMessage, Review, ReviewComment,
+    VerifiedServiceCustomer, BlogCategory, BlogPost, BlogComment, PaymentRequest,
+    Conversation, ConversationMessage, SupportTicket, SupportMessage
+)
+
+
+class ListQueryTestCase(APITestCase):
+    """Users and related rows for every list endpoint"""
+
+    def setUp(self):
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+        self.moderator = User.objects.create_user(
+            username="moderator",
+            email="moderator@example.com",
+            password="password123",
+            role=User.Role.MODERATOR
+        )
+        self.customer = User.objects.create_user(
+            username="customer",
+            email="customer@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+        self.category = Category.objects.create(name="Cleaning", description="Cleaning services")
+        self.blog_category = BlogCategory.objects.create(name="Tips", description="")
+        self.service = Service.objects.create(
+            name="Service", description="", business=self.business, category=self.category
+        )
+        self.clients = {}
+        for name in ('business', 'customer'):
+            self.clients[name] = APIClient()
+            self.clients[name].force_authenticate(user=getattr(self, name))
+        self.rows = 0
+
+    def add_rows(self, count):
+        """Add count rows to every listed resource, each with related rows"""
+        for _ in range(count):
+            self.rows += 1
+            i = self.rows
+            service = Service.objects.create(
+                name=f"Service {i}", description="", business=self.business, category=self.category
+            )
+            inquiry = Inquiry.objects.create(
+                service=service, customer=self.customer, moderator=self.moderator, subject=f"Inquiry {i}"
+            )
+            InquiryMessage.objects.create(inquiry=inquiry, sender=self.customer, content="Hello")
+            PaymentRequest.objects.create(
+                inquiry=inquiry, creator=self.business, recipient=self.customer, amount=Decimal('10.00')
+            )
+            post = BlogPost.objects.create(
+                title=f"Post {i}", slug=f"post-{i}", content="", author=self.business, category=self.blog_category
+            )
+            BlogComment.objects.create(blog_post=post, author=self.customer, content="Nice")
+            BlogCategory.objects.create(name=f"Blog category {i}", description="")
+
+            other = User.objects.create_user(
+                username=f"peer{i}",
+                email=f"peer{i}@example.com",
+                password="password123",
+                role=User.Role.CUSTOMER
+            )
+            conversation = Conversation.objects.create(sender=self.customer, recipient=other, is_accepted=True)
+            ConversationMessage.objects.create(conversation=conversation, sender=other, content="Hi")
+            ticket = SupportTicket.objects.create(user=self.customer, title=f"Ticket {i}")
+            SupportMessage.objects.create(ticket=ticket, sender=self.customer, content="Help")
+
+            VerifiedServiceCustomer.objects.create(service=self.service, customer=other)
+            review = Review.objects.create(service=self.service, user=other, rating=4)
+            ReviewComment.objects.create(review=review, author=self.business, content="Thanks")
+
+    def count_queries(self, client, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+        return len(queries), [query['sql'] for query in queries]
+
+    def assertBudgets(self, budgets):
+        self.add_rows(2)
+        before = {url: self.count_queries(self.clients[name], url)[0] for url, (name, _) in budgets.items()}
+        self.add_rows(3)
+        for url, (name, budget) in budgets.items():
+            count, queries = self.count_queries(self.clients[name], url)
+            with self.subTest(url=url):
+                self.assertLessEqual(count, budget, '\n'.join(queries))
+                self.assertEqual(count, before[url], f"{url} grows with the number of rows")
+
+
+
+class QueryBudgetTestCase(ListQueryTestCase):
+    """
+    Query-count budgets for the list endpoints.
+
+    Each endpoint is fetched with a few rows per customer, then again after
+    more rows are added: the count must stay within its budget and must not
+    grow with the number of rows (no N+1 queries).
+    """
+
+    # Endpoint -> (client, budget). Budgets include the validator queries
+    # of ConditionalGetMixin, which run before the page is serialized; the
+    # service list validates from its response cache when that is enabled
+    # (see test_cached_service_budget).
+    BUDGETS = {
+        '/api/services/': ('business', 2),
+        '/api/inquiries/': ('customer', 4),
+        '/api/payment-requests/': ('customer', 2),
+        '/api/blog/posts/': ('customer', 3),
+        '/api/blog/categories/': ('customer', 3),
+        '/api/conversations/': ('customer', 4),
+        '/api/support/tickets/': ('customer', 4),
+        '/api/moderators/': ('customer', 1),
+    }
+
+    def test_list_budgets(self):
+        """Test that list endpoints stay within their query budgets"""
+        self.assertBudgets(self.BUDGETS)
+
+    @override_settings(SERVICE_CACHE_TIMEOUT=60)
+    def test_cached_service_budget(self):
+        """Test that the cached service list only queries for the page on a miss"""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.add_rows(2)
+        client = self.clients['business']
+        self.assertEqual(self.count_queries(client, '/api/services/')[0], 1)
+        self.assertEqual(self.count_queries(client, '/api/services/')[0], 0)
+
+    def test_nested_list_budgets(self):
+        """Test list endpoints with nested serializers and dotted sources"""
+        self.assertBudgets({
+            f'/api/services/{self.service.id}/reviews/': ('customer', 4),
+            f'/api/users/{self.business.id}/blog-posts/': ('customer', 5),
+        })
+
+
+class SparseFieldsetTestCase(ListQueryTestCase):
+    """?fields= and ?omit= trim the response and the query behind it"""
+
+    def list_sql(self, client, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+        # The last query reads the page, the others are validators
+        return response.json(), queries[-1]['sql']
+
+    def test_fields_prunes_joins_and_columns(self):
+        """Test that ?fields= drops unselected relations and columns"""
+        self.add_rows(2)
+        data, sql = self.list_sql(self.clients['business'], '/api/services/?fields=id,name,fixed_price')
+        self.assertTrue(data)
+        for row in data:
+            self.assertEqual(set(row), {'id', 'name', 'fixed_price'})
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('"description"', sql)
+
+        data, sql = self.list_sql(self.clients['business'], '/api/services/')
+        self.assertIn('JOIN', sql)
+        self.assertIn('business_image', data[0])
+
+    def test_fields_keeps_needed_joins(self):
+        """Test that a selected dotted source keeps its join"""
+        self.add_rows(2)
+        data, sql = self.list_sql(self.clients['business'], '/api/services/?fields=id,business_name')
+        self.assertEqual(set(data[0]), {'id', 'business_name'})
+        self.assertEqual(data[0]['business_name'], self.business.username)
+        self.assertIn('"accounts_user"', sql)
+        self.assertNotIn('"accounts_category"', sql)
+
+    def test_omit(self):
+        """Test that ?omit= drops fields from every row"""
+        self.add_rows(2)
+        response = self.clients['customer'].get('/api/blog/posts/?omit=content,author_image')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for row in response.json():
+            self.assertNotIn('content', row)
+            self.assertNotIn('author_image', row)
+            self.assertIn('title', row)
+
+    def test_conversations(self):
+        """Test sparse fieldsets with annotations and prefetched messages"""
+        self.add_rows(2)
+        client = self.clients['customer']
+        data = client.get('/api/conversations/?fields=conversation_id,unread_count').json()
+        self.assertTrue(data)
+        for row in data:
+            self.assertEqual(set(row), {'conversation_id', 'unread_count'})
+            self.assertEqual(row['unread_count'], 1)
+        data = client.get('/api/conversations/?fields=conversation_id,last_message').json()
+        self.assertEqual(data[0]['last_message']['content'], "Hi")
+
+    def test_writes_ignore_fieldsets(self):
+        """Test that a write validates and returns every field"""
+        response = self.clients['business'].post('/api/services/?fields=id', {
+            'name': "New", 'description': "New service", 'category': self.category.id
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        self.assertIn('description', response.json())
+
+    def test_fieldset_budgets(self):
+        """Test that sparse lists stay within the full lists' budgets"""
+        self.assertBudgets({
+            '/api/services/?fields=id,name': ('business', 2),
+            '/api/blog/posts/?fields=id,title,comments_count': ('customer', 3),
+            '/api/conversations/?fields=conversation_id,sender_name,last_message': ('customer', 4),
+        })
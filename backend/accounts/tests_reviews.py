@@ -3,7 +3,7 @@ from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from .models import Service, Inquiry, Review, ReviewComment
+from .models import Service, Inquiry, Review, ReviewComment, VerifiedServiceCustomer
 
 User = get_user_model()
 
@@ -710,4 +710,95 @@ class ReviewCommentAPITestCase(APITestCase):
         
         # Test deleting a comment
         response = self.unauthenticated_client.delete(url)
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class ServiceRatingAggregateTestCase(APITestCase):
+    """Test case for the rating aggregates stored on Service"""
+
+    def setUp(self):
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+        self.service = Service.objects.create(
+            name="Test Service",
+            description="A service for testing",
+            business=self.business
+        )
+        self.other_service = Service.objects.create(
+            name="Other Service",
+            description="Another service",
+            business=self.business
+        )
+
+        self.customers = []
+        for i in range(3):
+            customer = User.objects.create_user(
+                username=f"customer{i}",
+                email=f"customer{i}@example.com",
+                password="password123",
+                role=User.Role.CUSTOMER
+            )
+            for service in (self.service, self.other_service):
+                VerifiedServiceCustomer.objects.create(service=service, customer=customer)
+            self.customers.append(customer)
+
+        self.reviews = [
+            Review.objects.create(service=self.service, user=customer, rating=rating)
+            for customer, rating in zip(self.customers, (5, 4, 4))
+        ]
+        Review.objects.create(service=self.other_service, user=self.customers[0], rating=5)
+
+    def assertAggregates(self, service, rating_sum, histogram):
+        service.refresh_from_db()
+        count = sum(histogram.values())
+        self.assertEqual(service.rating_sum, rating_sum)
+        self.assertEqual(service.rating_count, count)
+        self.assertEqual(service.avg_rating, round(rating_sum / count, 2) if count else 0)
+        self.assertEqual(service.rating_histogram, {rating: histogram.get(rating, 0) for rating in range(6)})
+
+    def test_create_update_delete(self):
+        """Test that review writes keep the aggregates in sync"""
+        self.assertAggregates(self.service, 13, {5: 1, 4: 2})
+
+        review = self.reviews[1]
+        review.rating = 1
+        review.save()
+        self.assertAggregates(self.service, 10, {5: 1, 4: 1, 1: 1})
+
+        review.comment = "Edited"
+        review.save()
+        self.assertAggregates(self.service, 10, {5: 1, 4: 1, 1: 1})
+
+        self.reviews[0].delete()
+        self.assertAggregates(self.service, 5, {4: 1, 1: 1})
+
+        Review.objects.filter(service=self.service).delete()
+        self.assertAggregates(self.service, 0, {})
+        self.assertAggregates(self.other_service, 5, {5: 1})
+
+    def test_api_exposes_and_sorts_by_rating(self):
+        """Test the serializer fields and rating ordering"""
+        self.client.force_authenticate(user=self.customers[0])
+
+        response = self.client.get('/api/services/?ordering=-avg_rating')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([service['id'] for service in response.data], [self.other_service.id, self.service.id])
+        self.assertEqual(response.data[1]['avg_rating'], 4.33)
+        self.assertEqual(response.data[1]['review_count'], 3)
+        self.assertEqual(response.data[1]['rating_histogram'], {'0': 0, '1': 0, '2': 0, '3': 0, '4': 2, '5': 1})
+
+        response = self.client.get('/api/services/?ordering=-rating_count')
+        self.assertEqual([service['id'] for service in response.data], [self.service.id, self.other_service.id])
+
+    def test_statistics_use_aggregates(self):
+        """Test that the business statistics read the stored aggregates"""
+        self.client.force_authenticate(user=self.business)
+
+        response = self.client.get('/api/services/statistics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['active_listings'], 2)
+        self.assertEqual(response.data['total_reviews'], 4)
+        self.assertEqual(response.data['avg_rating'], 4.5)
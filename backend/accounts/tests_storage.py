@@ -0,0 +1,150 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+
+from .management.commands import collect_media
+from .models import User, Service
+from .storage import is_content_addressed, serve_media
+from .tests_images import create_test_image
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Uploads are stored once per content and collected when unreferenced"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+
+    def upload(self, content, name='logo.jpg'):
+        return SimpleUploadedFile(name, content, content_type='image/jpeg')
+
+    def collect(self, *args):
+        output = StringIO()
+        call_command('collect_media', '--grace-hours', '0', *args, stdout=output)
+        return output.getvalue()
+
+    def test_identical_uploads_share_a_file(self):
+        """Test that equal bytes get one hashed name and one file"""
+        content = create_test_image().getvalue()
+        first = Service.objects.create(name="One", description="", business=self.business, logo=self.upload(content))
+        second = Service.objects.create(
+            name="Two", description="", business=self.business, logo=self.upload(content, 'other.JPG')
+        )
+        other = Service.objects.create(
+            name="Three", description="", business=self.business,
+            logo=self.upload(create_test_image(color='red').getvalue())
+        )
+
+        self.assertEqual(first.logo.name, second.logo.name)
+        self.assertNotEqual(first.logo.name, other.logo.name)
+        self.assertTrue(first.logo.name.startswith('service_logos/'))
+        self.assertTrue(is_content_addressed(first.logo.name))
+        with first.logo.open('rb') as file:
+            self.assertEqual(file.read(), content)
+        directory = os.path.dirname(first.logo.path)
+        self.assertEqual(os.listdir(directory), [os.path.basename(first.logo.name)])
+
+        # Deleting through one row keeps the blob for the other
+        first.logo.delete(save=True)
+        self.assertTrue(default_storage.exists(second.logo.name))
+
+    def test_serve_immutable(self):
+        """Test that hashed names are served with far-future immutable caching"""
+        name = default_storage.save('blog_images/post.jpg', ContentFile(b'image bytes'))
+        response = serve_media(RequestFactory().get(f'/media/{name}'), name, document_root=self.media_root)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+        with open(os.path.join(self.media_root, 'legacy.jpg'), 'wb') as file:
+            file.write(b'old upload')
+        response = serve_media(RequestFactory().get('/media/legacy.jpg'), 'legacy.jpg', document_root=self.media_root)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Cache-Control', response)
+
+    def test_collect_media(self):
+        """Test that only unreferenced blobs are removed"""
+        self.business.profile_image = self.upload(create_test_image().getvalue())
+        self.business.save()
+        old = self.business.profile_image.name
+        call_command('process_images', '--once', '--workers', '0', stdout=StringIO())
+        self.business.refresh_from_db()
+        variants = list(self.business.profile_image_variants.values())
+
+        self.business.profile_image = self.upload(create_test_image(color='red').getvalue())
+        self.business.save()
+        call_command('process_images', '--once', '--workers', '0', stdout=StringIO())
+        self.business.refresh_from_db()
+        current = [self.business.profile_image.name, *self.business.profile_image_variants.values()]
+        with open(os.path.join(self.media_root, 'legacy.jpg'), 'wb') as file:
+            file.write(b'old upload')
+
+        output = self.collect('--dry-run')
+        self.assertIn(old, output)
+        self.assertTrue(default_storage.exists(old))
+
+        self.collect()
+        for name in [old, *variants]:
+            self.assertFalse(default_storage.exists(name), name)
+        for name in current:
+            self.assertTrue(default_storage.exists(name), name)
+        self.assertTrue(default_storage.exists('legacy.jpg'))
+
+        self.collect('--legacy')
+        self.assertFalse(default_storage.exists('legacy.jpg'))
+        self.assertTrue(default_storage.exists(self.business.profile_image.name))
+
+    def test_grace_period(self):
+        """Test that recent unreferenced files are kept"""
+        name = default_storage.save('service_logos/new.jpg', ContentFile(b'not committed yet'))
+        call_command('collect_media', stdout=StringIO())
+        self.assertTrue(default_storage.exists(name))
+
+    def test_reused_blob_survives_collection(self):
+        """Test that saving bytes of an old orphaned blob keeps it from the collector"""
+        content = create_test_image().getvalue()
+        name = default_storage.save('service_logos/orphan.jpg', ContentFile(content))
+        day_ago = os.path.getmtime(default_storage.path(name)) - 2 * 24 * 60 * 60
+        os.utime(default_storage.path(name), (day_ago, day_ago))
+
+        # The upload's row is not committed when the collector runs
+        self.assertEqual(default_storage.save('service_logos/logo.jpg', self.upload(content)), name)
+        call_command('collect_media', stdout=StringIO())
+        self.assertTrue(default_storage.exists(name))
+
+    def test_collect_rechecks_references(self):
+        """Test that a candidate referenced after the scan is kept"""
+        content = create_test_image().getvalue()
+        name = default_storage.save('service_logos/orphan.jpg', ContentFile(content))
+        scanned = collect_media.referenced_names()
+        rescan = collect_media.referenced_names
+
+        def referenced_names():
+            # A row naming the blob commits after the first scan
+            if not Service.objects.filter(logo=name).exists():
+                Service.objects.create(name="Late", description="", business=self.business, logo=name)
+                return scanned
+            return rescan()
+
+        with mock.patch.object(collect_media, 'referenced_names', side_effect=referenced_names) as scan:
+            self.collect()
+        self.assertEqual(scan.call_count, 2)
+        self.assertTrue(default_storage.exists(name))
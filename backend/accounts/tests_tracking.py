@@ -0,0 +1,90 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .models import User, Category, Service, BlogPost, BusinessStats, ImageJob
+from .tests_images import TemporaryMediaMixin, create_test_image
+
+
+class TrackedFieldsTests(TemporaryMediaMixin, TestCase):
+    """Saves compare against the values loaded with the row instead of reloading it"""
+
+    def setUp(self):
+        super().setUp()
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+        self.category = Category.objects.create(name="Cleaning", description="")
+        self.service = Service.objects.create(
+            name="Service", description="", business=self.business, category=self.category
+        )
+
+    def reads(self, table, action):
+        """SELECTs on table issued by action"""
+        with CaptureQueriesContext(connection) as queries:
+            action()
+        return [query['sql'] for query in queries if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']]
+
+    def test_loaded_rows_are_not_reloaded(self):
+        """Test that saving loaded rows reads nothing back"""
+        user = User.objects.get(pk=self.business.pk)
+        user.bio = "Updated"
+        self.assertEqual(self.reads('accounts_user', user.save), [])
+
+        service = Service.objects.select_related('business').get(pk=self.service.pk)
+        service.name = "Renamed"
+        self.assertEqual(self.reads('accounts_service', service.save), [])
+
+        post = BlogPost.objects.create(title="Post", slug="post", content="", author=self.business)
+        post = BlogPost.objects.get(pk=post.pk)
+        self.assertEqual(self.reads('accounts_blogpost', post.increment_views), [])
+
+    def test_changes(self):
+        """Test has_changed() and stored_values() across saves"""
+        self.assertIsNone(Service(name="New", business=self.business).stored_values())
+        # Instances built by hand fall back to the database
+        self.assertEqual(Service(pk=self.service.pk).stored_values()['category_id'], self.category.pk)
+
+        service = Service.objects.get(pk=self.service.pk)
+        self.assertFalse(service.has_changed('category_id'))
+        service.category = None
+        self.assertTrue(service.has_changed('category_id'))
+        self.assertEqual(service.stored_values()['category_id'], self.category.pk)
+        service.save()
+        self.assertFalse(service.has_changed('category_id'))
+
+    def test_image_change_detected(self):
+        """Test that a new upload on a loaded row is queued once"""
+        user = User.objects.get(pk=self.business.pk)
+        user.profile_image = SimpleUploadedFile('photo.jpg', create_test_image().getvalue(), content_type='image/jpeg')
+        user.save()
+        self.assertEqual(ImageJob.objects.count(), 1)
+
+        user.bio = "Unchanged image"
+        user.save()
+        User.objects.get(pk=user.pk).save()
+        self.assertEqual(ImageJob.objects.count(), 1)
+
+    def test_moved_service(self):
+        """Test that a service moving between businesses still moves its counters"""
+        other = User.objects.create_user(
+            username="other",
+            email="other@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+        Service.objects.filter(pk=self.service.pk).update(inquiry_count=3)
+        service = Service.objects.get(pk=self.service.pk)
+        # Counters changed after the row was loaded are still moved
+        Service.objects.filter(pk=self.service.pk).update(inquiry_count=4)
+        BusinessStats.objects.filter(business=self.business).update(total_bookings=4)
+        service.business = other
+        service.save()
+        self.assertEqual(BusinessStats.objects.get(business=other).active_listings, 1)
+        self.assertEqual(BusinessStats.objects.get(business=other).total_bookings, 4)
+        stats = BusinessStats.objects.get(business=self.business)
+        self.assertEqual((stats.active_listings, stats.total_bookings), (0, 0))
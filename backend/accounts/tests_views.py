@@ -1,13 +1,28 @@
-from django.test import TestCase
+import random
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from decimal import Decimal
+from unittest import mock
 from .models import (
     User, Wallet, Transaction, Category, Service, 
-    Inquiry, InquiryMessage, Review, ReviewComment
+    Inquiry, InquiryMessage, Review, ReviewComment, VerifiedServiceCustomer, BusinessStats,
+    ServiceTrend, CatalogChange
 )
+from . import recommendations, trending
+from .recommendations import python_neighbours
+from .response_cache import cache_stats, check_shared_cache
+from .suggest import suggest_index
+from .views import ServiceViewSet
 
 User = get_user_model()
 
@@ -310,6 +325,13 @@ class ViewsTestCase(APITestCase):
         response = self.business_client.post(services_url, new_service_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.data['name'], 'Window Cleaning')
+
+        # Prices too large for the cents column are rejected
+        response = self.business_client.post(
+            services_url, {**new_service_data, 'fixed_price': '99999999999999999999999.00'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fixed_price', response.data)
         
         # Get my services (filter for business)
         my_services_url = '/api/services/?my_services=true'
@@ -544,6 +566,13 @@ class ViewsTestCase(APITestCase):
         response = self.customer_client.post(payment_requests_url, payment_data, format='json')
         self.assertIn(response.status_code, [status.HTTP_403_FORBIDDEN, status.HTTP_400_BAD_REQUEST])
         
+        # Amounts too large for the cents column are rejected
+        response = self.business_client.post(
+            payment_requests_url, {**payment_data, 'amount': '99999999999999999999999.00'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('amount', response.data)
+
         # Business should be able to create payment requests
         response = self.business_client.post(payment_requests_url, payment_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
@@ -648,4 +677,691 @@ class ViewsTestCase(APITestCase):
         # Verify balance is unchanged after decline
         response = self.customer_client.get(wallet_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(Decimal(response.data['balance']), Decimal('400.00'))
\ No newline at end of file
+        self.assertEqual(Decimal(response.data['balance']), Decimal('400.00'))
+
+class ServiceSearchTestCase(APITestCase):
+    """Test case for full-text service search"""
+
+    def setUp(self):
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+        self.client.force_authenticate(user=self.business)
+
+        self.cleaning = Category.objects.create(name="Cleaning", description="Cleaning services")
+        self.repairs = Category.objects.create(name="Repairs", description="Repair services")
+
+        self.home_cleaning = Service.objects.create(
+            name="Home Cleaning",
+            description="Professional home cleaning, windows included",
+            business=self.business,
+            category=self.cleaning
+        )
+        self.window_cleaning = Service.objects.create(
+            name="Window Cleaning",
+            description="Windows and windows only: window frames, window sills",
+            business=self.business,
+            category=self.cleaning
+        )
+        self.plumbing = Service.objects.create(
+            name="Plumbing",
+            description="Pipe and window seal repairs",
+            business=self.business,
+            category=self.repairs
+        )
+
+    def search(self, query):
+        response = self.client.get('/api/services/', {'search': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [service['id'] for service in response.data]
+
+    def test_ranked_by_relevance(self):
+        """Test that results are ranked, with the best match first"""
+        ids = self.search('window')
+        self.assertEqual(ids[0], self.window_cleaning.id)
+        self.assertCountEqual(ids, [self.window_cleaning.id, self.home_cleaning.id, self.plumbing.id])
+
+    def test_all_words_and_prefix(self):
+        """Test that every word must match and the last one may be a prefix"""
+        self.assertEqual(self.search('home clean'), [self.home_cleaning.id])
+        self.assertEqual(self.search('plumb'), [self.plumbing.id])
+        self.assertEqual(self.search('"home" -*'), [self.home_cleaning.id])
+        self.assertEqual(self.search('gardening'), [])
+
+    def test_combines_with_category_and_ordering(self):
+        """Test that search works with the category filter and explicit ordering"""
+        response = self.client.get('/api/services/', {'search': 'window', 'category': self.cleaning.id, 'ordering': 'name'})
+        self.assertEqual([service['id'] for service in response.data], [self.home_cleaning.id, self.window_cleaning.id])
+
+    def test_index_follows_save_and_delete(self):
+        """Test that the index is updated by Service.save and delete"""
+        self.plumbing.name = "Gardening"
+        self.plumbing.description = "Lawns and hedges"
+        self.plumbing.save()
+        self.assertEqual(self.search('gardening'), [self.plumbing.id])
+        self.assertEqual(self.search('plumbing'), [])
+
+        self.plumbing.delete()
+        self.assertEqual(self.search('gardening'), [])
+
+
+class ServiceSuggestTestCase(APITestCase):
+    """Test case for search box autocomplete"""
+
+    def setUp(self):
+        self.business = User.objects.create_user(
+            username="sparkle_services",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+        self.client.force_authenticate(user=self.business)
+
+        self.cleaning = Category.objects.create(name="Cleaning", description="Cleaning services")
+        self.home_cleaning = Service.objects.create(
+            name="Home Cleaning",
+            description="Professional home cleaning",
+            business=self.business,
+            category=self.cleaning
+        )
+        self.plumbing = Service.objects.create(
+            name="Plumbing Repairs",
+            description="Pipes and taps",
+            business=self.business,
+            category=self.cleaning
+        )
+        # Test transactions roll back, so start from an empty index
+        suggest_index.version = None
+
+    def suggest(self, query, **params):
+        response = self.client.get('/api/services/suggest/', {'q': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(item['type'], item['id']) for item in response.data]
+
+    def test_prefix_matches(self):
+        """Test that any word of a name matches as a prefix, label starts first"""
+        self.assertEqual(
+            self.suggest('clean'),
+            [('category', self.cleaning.id), ('service', self.home_cleaning.id)]
+        )
+        self.assertEqual(self.suggest('spark'), [('business', self.business.id)])
+        self.assertEqual(self.suggest('Clean', limit=1), [('category', self.cleaning.id)])
+
+    def test_typo_tolerance(self):
+        """Test that misspelt queries still find the closest names"""
+        self.assertEqual(self.suggest('plumbng')[0], ('service', self.plumbing.id))
+        self.assertEqual(self.suggest('cleening')[0], ('category', self.cleaning.id))
+        self.assertEqual(self.suggest('xyzzy'), [])
+
+    def test_refresh_follows_catalog_changes(self):
+        """Test that saves and deletes reach the index on refresh"""
+        self.assertEqual(self.suggest('garden'), [])
+
+        self.plumbing.name = "Gardening"
+        self.plumbing.save()
+        garden = Category.objects.create(name="Garden Care")
+        suggest_index.refresh()
+        self.assertEqual(
+            self.suggest('garden'),
+            [('service', self.plumbing.id), ('category', garden.id)]
+        )
+
+        self.plumbing.delete()
+        suggest_index.refresh()
+        self.assertEqual(self.suggest('garden'), [('category', garden.id)])
+
+    @override_settings(SUGGEST_SETTLE_SECONDS=0)
+    def test_refresh_applies_late_commits(self):
+        """Test that a change committed behind a newer one is still applied"""
+        self.assertEqual(self.suggest('garden'), [])
+        garden = Category.objects.create(name="Garden Care")
+        late = CatalogChange.objects.filter(kind=CatalogChange.Kind.CATEGORY, object_id=garden.pk).get().pk
+        CatalogChange.objects.filter(pk=late).delete()
+
+        # A later change is visible while the one before it is in flight
+        with override_settings(SUGGEST_SETTLE_SECONDS=60):
+            self.plumbing.name = "Gardening"
+            self.plumbing.save()
+            suggest_index.refresh()
+        self.assertEqual(self.suggest('garden'), [('service', self.plumbing.id)])
+
+        CatalogChange.objects.create(pk=late, kind=CatalogChange.Kind.CATEGORY, object_id=garden.pk)
+        suggest_index.refresh()
+        self.assertEqual(
+            self.suggest('garden'),
+            [('service', self.plumbing.id), ('category', garden.id)]
+        )
+
+    def test_invalid_limit(self):
+        """Test that a bad limit is rejected"""
+        response = self.client.get('/api/services/suggest/', {'q': 'clean', 'limit': 'ten'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(SERVICE_CACHE_TIMEOUT=60)
+class ServiceResponseCacheTestCase(APITestCase):
+    """Test case for the versioned ServiceViewSet response cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+        self.client.force_authenticate(user=self.business)
+
+        self.cleaning = Category.objects.create(name="Cleaning", description="Cleaning services")
+        self.repairs = Category.objects.create(name="Repairs", description="Repair services")
+        self.home_cleaning = Service.objects.create(
+            name="Home Cleaning",
+            description="Professional home cleaning",
+            business=self.business,
+            category=self.cleaning
+        )
+        self.plumbing = Service.objects.create(
+            name="Plumbing",
+            description="Pipes and taps",
+            business=self.business,
+            category=self.repairs
+        )
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def assertCache(self, url, params, expected):
+        self.assertEqual(self.get(url, params)['X-Cache'], expected)
+
+    def test_hits_and_normalized_params(self):
+        """Test that repeated lists are served from the cache, in any param order"""
+        first = self.get('/api/services/?category=%d&ordering=name' % self.cleaning.id)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        second = self.get('/api/services/?ordering=name&category=%d&search=' % self.cleaning.id)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+        self.assertCache('/api/services/', {'category': self.cleaning.id, 'ordering': '-name'}, 'MISS')
+        self.assertEqual(cache_stats(), {'hits': 1, 'misses': 2, 'hit_rate': 0.3333})
+
+    def test_service_write_bumps_its_category(self):
+        """Test that a service write invalidates its category and unfiltered lists only"""
+        for params in ({}, {'category': self.cleaning.id}, {'category': self.repairs.id}):
+            self.get('/api/services/', params)
+
+        self.plumbing.name = "Emergency Plumbing"
+        self.plumbing.save()
+
+        self.assertCache('/api/services/', {'category': self.cleaning.id}, 'HIT')
+        response = self.get('/api/services/', {'category': self.repairs.id})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data[0]['name'], "Emergency Plumbing")
+        self.assertCache('/api/services/', {}, 'MISS')
+
+    def test_moving_category_bumps_both(self):
+        """Test that a service moved between categories leaves both lists"""
+        self.get('/api/services/', {'category': self.cleaning.id})
+        self.home_cleaning.category = self.repairs
+        self.home_cleaning.save()
+        self.assertEqual(self.get('/api/services/', {'category': self.cleaning.id}).data, [])
+
+    def test_retrieve_follows_reviews_and_labels(self):
+        """Test that review writes and category renames reach cached details"""
+        url = f'/api/services/{self.home_cleaning.id}/'
+        self.assertCache(url, None, 'MISS')
+        self.assertCache(url, None, 'HIT')
+
+        customer = User.objects.create_user(
+            username="customer",
+            email="customer@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+        VerifiedServiceCustomer.objects.create(service=self.home_cleaning, customer=customer)
+        Review.objects.create(service=self.home_cleaning, user=customer, rating=4)
+        response = self.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['review_count'], 1)
+
+        self.cleaning.name = "Home Services"
+        self.cleaning.save()
+        self.assertEqual(self.get(url).data['category_name'], "Home Services")
+
+    def test_shared_cache_check(self):
+        """Test that enabling the cache on a per-process backend is warned about"""
+        self.assertEqual([warning.id for warning in check_shared_cache(None)], ['accounts.W001'])
+        with override_settings(SERVICE_CACHE_TIMEOUT=0):
+            self.assertEqual(check_shared_cache(None), [])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_conditional_get_without_queries(self):
+        """Test that cached views validate ETags from the generations alone"""
+        paths = ['/api/services/', f'/api/services/{self.home_cleaning.id}/']
+        etags = {}
+        for path in paths:
+            etags[path] = self.get(path)['ETag']
+            with self.assertNumQueries(0):
+                response = self.client.get(path, HTTP_IF_NONE_MATCH=etags[path])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            with self.assertNumQueries(0):
+                self.assertCache(path, None, 'HIT')
+
+        self.home_cleaning.name = "Deep Cleaning"
+        self.home_cleaning.save()
+        for path in paths:
+            response = self.client.get(path, HTTP_IF_NONE_MATCH=etags[path])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ServiceConditionalGetTestCase(APITestCase):
+    """Test case for ETag / Last-Modified support on services"""
+
+    def setUp(self):
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+        self.client.force_authenticate(user=self.business)
+        self.category = Category.objects.create(name="Cleaning", description="Cleaning services")
+        self.service = Service.objects.create(
+            name="Home Cleaning",
+            description="Professional home cleaning",
+            business=self.business,
+            category=self.category
+        )
+        self.detail_url = f'/api/services/{self.service.id}/'
+
+    def test_list_not_modified(self):
+        """Test that an unchanged list is answered with 304, and changes with 200"""
+        response = self.client.get('/api/services/')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertNotIn('Last-Modified', response)
+
+        response = self.client.get('/api/services/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        Service.objects.create(name="Windows", description="", business=self.business, category=self.category)
+        response = self.client.get('/api/services/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+
+    def test_detail_validators(self):
+        """Test If-None-Match and If-Modified-Since on a service detail"""
+        response = self.client.get(self.detail_url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # A review updates the rating aggregates, so the service is modified
+        customer = User.objects.create_user(
+            username="customer",
+            email="customer@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+        VerifiedServiceCustomer.objects.create(service=self.service, customer=customer)
+        Review.objects.create(service=self.service, user=customer, rating=5)
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['review_count'], 1)
+
+    def test_etag_is_per_user(self):
+        """Test that one user's ETag does not validate another user's copy"""
+        etag = self.client.get(self.detail_url)['ETag']
+        other = User.objects.create_user(
+            username="other",
+            email="other@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class PaginationTestCase(APITestCase):
+    """Test case for default and cursor pagination"""
+
+    def setUp(self):
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+        self.client.force_authenticate(user=self.business)
+        self.category = Category.objects.create(name="Cleaning", description="Cleaning services")
+        self.services = [
+            Service.objects.create(
+                name=f"Service {i}",
+                description="",
+                business=self.business,
+                category=self.category
+            )
+            for i in range(5)
+        ]
+
+    def test_page_numbers_and_ceiling(self):
+        """Test that page params paginate and page_size is capped per view"""
+        response = self.client.get('/api/services/', {'page': 2, 'page_size': 2, 'ordering': 'name'})
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual([service['name'] for service in response.data['results']], ["Service 2", "Service 3"])
+        self.assertIsNotNone(response.data['next'])
+
+        with mock.patch.object(ServiceViewSet, 'max_page_size', 3):
+            response = self.client.get('/api/services/', {'page': 1, 'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 3)
+
+    @override_settings(PAGINATION_TRANSITION=True)
+    def test_transition_keeps_unpaginated_lists(self):
+        """Test that clients without page params get a plain list during the transition"""
+        response = self.client.get('/api/services/')
+        self.assertEqual(len(response.data), 5)
+
+    @override_settings(PAGINATION_TRANSITION=False)
+    def test_paginated_by_default_after_transition(self):
+        """Test that lists are paginated once the transition flag is off"""
+        response = self.client.get('/api/services/')
+        self.assertEqual(response.data['count'], 5)
+
+    @override_settings(PAGINATION_TRANSITION=False)
+    def test_cursor_pagination(self):
+        """Test that reviews are paged with cursors, newest first"""
+        service = self.services[0]
+        customers = []
+        for i in range(3):
+            customer = User.objects.create_user(
+                username=f"customer{i}",
+                email=f"customer{i}@example.com",
+                password="password123",
+                role=User.Role.CUSTOMER
+            )
+            VerifiedServiceCustomer.objects.create(service=service, customer=customer)
+            Review.objects.create(service=service, user=customer, rating=4)
+            customers.append(customer)
+
+        url = f'/api/services/{service.id}/reviews/'
+        response = self.client.get(url, {'page_size': 2})
+        self.assertNotIn('count', response.data)
+        first_page = [review['user'] for review in response.data['results']]
+        response = self.client.get(response.data['next'])
+        second_page = [review['user'] for review in response.data['results']]
+        self.assertEqual(first_page + second_page, [customer.id for customer in reversed(customers)])
+        self.assertIsNone(response.data['next'])
+
+
+class BusinessStatisticsTestCase(APITestCase):
+    """Test case for the incrementally maintained business statistics"""
+
+    def setUp(self):
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+        self.moderator = User.objects.create_user(
+            username="moderator",
+            email="moderator@example.com",
+            password="password123",
+            role=User.Role.MODERATOR
+        )
+        self.customers = [
+            User.objects.create_user(
+                username=f"customer{i}",
+                email=f"customer{i}@example.com",
+                password="password123",
+                role=User.Role.CUSTOMER
+            )
+            for i in range(2)
+        ]
+        self.category = Category.objects.create(name="Cleaning", description="Cleaning services")
+        self.services = [
+            Service.objects.create(name=f"Service {i}", description="", business=self.business, category=self.category)
+            for i in range(2)
+        ]
+        self.client.force_authenticate(user=self.business)
+
+        for customer in self.customers:
+            inquiry = Inquiry.objects.create(service=self.services[0], customer=customer, subject="Question")
+            inquiry.close(self.moderator)
+        Review.objects.create(service=self.services[0], user=self.customers[0], rating=5)
+        Review.objects.create(service=self.services[0], user=self.customers[1], rating=2)
+        Inquiry.objects.create(service=self.services[1], customer=self.customers[0], subject="Question")
+
+    def test_statistics_and_breakdowns(self):
+        """Test the totals, per-service counts and the daily series"""
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/services/statistics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['active_listings'], 2)
+        self.assertEqual(response.data['total_bookings'], 3)
+        self.assertEqual(response.data['total_reviews'], 2)
+        self.assertEqual(response.data['avg_rating'], 3.5)
+        self.assertEqual(response.data['verified_customers'], 2)
+
+        first, second = response.data['services']
+        self.assertEqual((first['bookings'], first['reviews'], first['verified_customers']), (2, 2, 2))
+        self.assertEqual((second['bookings'], second['reviews'], second['verified_customers']), (1, 0, 0))
+
+        daily = response.data['daily']
+        self.assertEqual(len(daily), ServiceViewSet.STATISTICS_DAYS)
+        self.assertEqual(daily[-1]['date'], timezone.localdate().isoformat())
+        self.assertEqual((daily[-1]['bookings'], daily[-1]['reviews'], daily[-1]['avg_rating']), (3, 2, 3.5))
+        self.assertEqual(daily[0]['bookings'], 0)
+
+    def test_deletions_update_totals(self):
+        """Test that removed reviews, inquiries and services leave the totals"""
+        Review.objects.get(user=self.customers[1]).delete()
+        Inquiry.objects.get(service=self.services[1]).delete()
+        response = self.client.get('/api/services/statistics/')
+        self.assertEqual(response.data['total_bookings'], 2)
+        self.assertEqual(response.data['total_reviews'], 1)
+        self.assertEqual(response.data['avg_rating'], 5)
+
+        self.services[0].delete()
+        response = self.client.get('/api/services/statistics/')
+        self.assertEqual(response.data['active_listings'], 1)
+        self.assertEqual(response.data['total_bookings'], 0)
+        self.assertEqual(response.data['total_reviews'], 0)
+        self.assertEqual(response.data['verified_customers'], 0)
+        # The series keeps the activity of the day
+        self.assertEqual(response.data['daily'][-1]['bookings'], 3)
+
+    def test_cascade_deletions_update_totals(self):
+        """Test that inquiries and verifications deleted with their customer leave the totals"""
+        customer = User.objects.create_user(
+            username="customer",
+            email="customer@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+        Inquiry.objects.create(service=self.services[1], customer=customer, subject="Question").close(self.moderator)
+        Inquiry.objects.create(service=self.services[0], customer=customer, subject="Question")
+        self.assertEqual(self.client.get('/api/services/statistics/').data['total_bookings'], 5)
+
+        customer.delete()
+        response = self.client.get('/api/services/statistics/')
+        self.assertEqual(response.data['total_bookings'], 3)
+        self.assertEqual(response.data['verified_customers'], 2)
+        first, second = response.data['services']
+        self.assertEqual((first['bookings'], first['verified_customers']), (2, 2))
+        self.assertEqual((second['bookings'], second['verified_customers']), (1, 0))
+
+        # Deleting the business takes its counters along without recreating them
+        Review.objects.all().delete()
+        self.business.delete()
+        self.assertFalse(BusinessStats.objects.exists())
+
+    def test_rebuild_command_verifies_counters(self):
+        """Test that the rebuild command restores drifted counters"""
+        BusinessStats.objects.filter(business=self.business).update(total_bookings=10)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_business_stats', '--verify', stdout=StringIO())
+
+        call_command('rebuild_business_stats', stdout=StringIO())
+        self.assertEqual(BusinessStats.objects.get(business=self.business).total_bookings, 3)
+
+
+class ServiceRecommendationsTestCase(APITestCase):
+    """Test case for item-to-item recommendations"""
+
+    # (customer, service) interactions: services 1 and 2 share two
+    # customers, 3 shares one customer with each of them
+    INTERACTIONS = [(1, 1), (1, 2), (2, 1), (2, 2), (2, 3), (3, 3)]
+
+    def setUp(self):
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+        self.customers = {
+            i: User.objects.create_user(
+                username=f"customer{i}",
+                email=f"customer{i}@example.com",
+                password="password123",
+                role=User.Role.CUSTOMER
+            )
+            for i in range(1, 4)
+        }
+        self.services = {
+            i: Service.objects.create(name=f"Service {i}", description="", business=self.business)
+            for i in range(1, 5)
+        }
+        self.client.force_authenticate(user=self.customers[1])
+
+    def test_cosine_neighbours(self):
+        """Test the similarity scores and their order"""
+        customers, services = zip(*self.INTERACTIONS)
+        result = python_neighbours(customers, services, [1.0] * len(customers))
+        self.assertEqual(result[1], [(2, 1.0), (3, 0.5)])
+        self.assertEqual(result[3], [(1, 0.5), (2, 0.5)])
+
+        result = python_neighbours(customers, services, [1.0] * len(customers), top_k=1, min_support=2)
+        self.assertEqual(result, {1: [(2, 1.0)], 2: [(1, 1.0)]})
+
+    @skipUnless(recommendations.numpy, "NumPy is not installed")
+    def test_numpy_matches_python(self):
+        """Test that the vectorized computation gives the pure Python results"""
+        rng = random.Random(7)
+        rows = [(rng.randrange(300), rng.randrange(60)) for _ in range(3000)]
+        customers, services = zip(*rows)
+        weights = [rng.choice([1.0, 2.0]) for _ in rows]
+        expected = python_neighbours(customers, services, weights, top_k=5)
+        result = recommendations.numpy_neighbours(customers, services, weights, top_k=5, batch_pairs=500)
+        self.assertEqual(result.keys(), expected.keys())
+        for service, similar in expected.items():
+            self.assertEqual([pk for pk, _ in result[service]], [pk for pk, _ in similar])
+            for (_, score), (_, expected_score) in zip(result[service], similar):
+                self.assertAlmostEqual(score, expected_score)
+
+    def test_similar_endpoint(self):
+        """Test that the command's neighbours are served in one query"""
+        for customer, service in self.INTERACTIONS:
+            Inquiry.objects.create(service=self.services[service], customer=self.customers[customer], subject="Question")
+        call_command('build_recommendations', stdout=StringIO())
+
+        url = f'/api/services/{self.services[3].id}/similar/'
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data], [self.services[1].id, self.services[2].id])
+        self.assertEqual(response.data[0]['similarity'], 0.5)
+        self.assertEqual(response.data[0]['business_name'], "business")
+
+        response = self.client.get(url, {'limit': 1})
+        self.assertEqual(len(response.data), 1)
+
+        response = self.client.get(f'/api/services/{self.services[4].id}/similar/')
+        self.assertEqual(response.data, [])
+        response = self.client.get('/api/services/999/similar/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(TRENDING_HALF_LIFE_HOURS=48)
+class TrendingTestCase(APITestCase):
+    """Test case for the time-decayed trending scores"""
+
+    def setUp(self):
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+        self.customer = User.objects.create_user(
+            username="customer",
+            email="customer@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+        self.services = [
+            Service.objects.create(name=f"Service {i}", description="", business=self.business)
+            for i in range(3)
+        ]
+        self.client.force_authenticate(user=self.customer)
+        self.now = timezone.now()
+
+    def inquire(self, service, hours_ago=0):
+        inquiry = Inquiry.objects.create(service=service, customer=self.customer, subject="Question")
+        Inquiry.objects.filter(pk=inquiry.pk).update(created_at=self.now - timedelta(hours=hours_ago))
+
+    def score(self, service):
+        return ServiceTrend.objects.get(service=service).score
+
+    def test_scores_decay_between_refreshes(self):
+        """Test that events count half per half-life, across refreshes"""
+        self.inquire(self.services[0], hours_ago=48)
+        self.inquire(self.services[1])
+        trending.refresh(self.now)
+        self.assertAlmostEqual(self.score(self.services[0]), 0.5)
+        self.assertAlmostEqual(self.score(self.services[1]), 1.0)
+        self.assertEqual(self.score(self.services[2]), 0)
+
+        self.now += timedelta(hours=48)
+        self.inquire(self.services[0])
+        trending.refresh(self.now)
+        self.assertAlmostEqual(self.score(self.services[0]), 1.25)
+        self.assertAlmostEqual(self.score(self.services[1]), 0.5)
+
+    def test_ordering_by_trending(self):
+        """Test ?ordering=trending on services, including unscored new ones"""
+        self.inquire(self.services[0], hours_ago=48)
+        self.inquire(self.services[1])
+        trending.refresh(self.now)
+        newest = Service.objects.create(name="New", description="", business=self.business)
+
+        response = self.client.get('/api/services/', {'ordering': 'trending'})
+        self.assertEqual(
+            [service['id'] for service in response.data],
+            [self.services[1].id, self.services[0].id, newest.id, self.services[2].id]
+        )
+        response = self.client.get('/api/services/', {'ordering': '-trending'})
+        self.assertEqual(response.data[-1]['id'], self.services[1].id)
+
+    @override_settings(SERVICE_CACHE_TIMEOUT=60)
+    def test_refresh_invalidates_cached_ordering(self):
+        """Test that a refresh replaces cached trending lists"""
+        cache.clear()
+        trending.refresh(self.now - timedelta(hours=1))
+        response = self.client.get('/api/services/', {'ordering': 'trending'})
+        self.assertEqual(response.data[0]['id'], self.services[2].id)
+
+        self.inquire(self.services[0])
+        call_command('refresh_trending', stdout=StringIO())
+        response = self.client.get('/api/services/', {'ordering': 'trending'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data[0]['id'], self.services[0].id)
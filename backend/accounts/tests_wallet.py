@@ -0,0 +1,950 @@
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+import uuid
+from .models import (
+    Wallet, Transaction, WalletMonthlySummary, Service, Inquiry, PaymentRequest, Conversation, IdempotencyKey
+)
+from .ledger import InsufficientFunds, apply_legs
+
+User = get_user_model()
+
+
+class LedgerTestCase(TestCase):
+    """Test case for the conditional-UPDATE wallet ledger"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            username="customer",
+            email="customer@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+
+        self.customer.wallet.deposit(Decimal('100.00'))
+
+    def test_deposit_and_withdraw_update_instance(self):
+        """Test that deposit and withdraw keep the in-memory balance current"""
+        wallet = self.customer.wallet
+
+        wallet.deposit(Decimal('25.50'))
+        self.assertEqual(wallet.balance, Decimal('125.50'))
+
+        tx = wallet.withdraw(Decimal('20.00'))
+        self.assertEqual(wallet.balance, Decimal('105.50'))
+        self.assertEqual(tx.transaction_type, Transaction.TransactionType.WITHDRAWAL)
+        self.assertIsNone(tx.to_wallet)
+
+        wallet.refresh_from_db()
+        self.assertEqual(wallet.balance, Decimal('105.50'))
+
+    def test_withdraw_insufficient_funds(self):
+        """Test that an overdraft is rejected and leaves no trace"""
+        wallet = self.customer.wallet
+
+        with self.assertRaises(InsufficientFunds):
+            wallet.withdraw(Decimal('100.01'))
+
+        wallet.refresh_from_db()
+        self.assertEqual(wallet.balance, Decimal('100.00'))
+        self.assertEqual(Transaction.objects.filter(from_wallet=wallet).count(), 0)
+
+    def test_invalid_amounts(self):
+        """Test that zero, negative and same-wallet transfers are rejected"""
+        wallet = self.customer.wallet
+
+        with self.assertRaises(ValueError):
+            wallet.deposit(Decimal('0'))
+
+        with self.assertRaises(ValueError):
+            wallet.transfer(self.business.wallet, Decimal('-5.00'))
+
+        with self.assertRaises(ValueError):
+            wallet.transfer(wallet, Decimal('5.00'))
+
+    def test_transfer(self):
+        """Test that a transfer moves funds and records one transaction"""
+        sender = self.customer.wallet
+        recipient = self.business.wallet
+
+        tx = sender.transfer(recipient, '30.00')
+
+        self.assertEqual(tx.amount, Decimal('30.00'))
+        self.assertEqual(sender.balance, Decimal('70.00'))
+        self.assertEqual(recipient.balance, Decimal('30.00'))
+        self.assertEqual(Wallet.objects.get(pk=recipient.pk).balance, Decimal('30.00'))
+
+    def test_transfer_with_stale_balance(self):
+        """Test that a stale in-memory balance cannot overdraw the wallet"""
+        stale_wallet = Wallet.objects.get(pk=self.customer.wallet.pk)
+
+        # Spend the funds through another instance
+        self.customer.wallet.withdraw(Decimal('90.00'))
+        self.assertEqual(stale_wallet.balance, Decimal('100.00'))
+
+        with self.assertRaises(InsufficientFunds):
+            stale_wallet.transfer(self.business.wallet, Decimal('50.00'))
+
+        self.assertEqual(Wallet.objects.get(pk=stale_wallet.pk).balance, Decimal('10.00'))
+        self.assertEqual(Wallet.objects.get(pk=self.business.wallet.pk).balance, Decimal('0.00'))
+
+    def test_apply_legs_rolls_back_on_failure(self):
+        """Test that a failing leg inside an atomic block undoes earlier legs"""
+        from django.db import transaction
+
+        with self.assertRaises(InsufficientFunds):
+            with transaction.atomic():
+                apply_legs([
+                    (self.business.wallet.pk, Decimal('10.00')),
+                    (self.customer.wallet.pk, Decimal('-500.00')),
+                ])
+
+        self.assertEqual(Wallet.objects.get(pk=self.business.wallet.pk).balance, Decimal('0.00'))
+        self.assertEqual(Wallet.objects.get(pk=self.customer.wallet.pk).balance, Decimal('100.00'))
+
+
+class ConcurrentAcceptTestCase(TestCase):
+    """Test that payment flows cannot be applied twice"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            username="customer",
+            email="customer@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+
+        self.customer.wallet.deposit(Decimal('100.00'))
+
+        self.service = Service.objects.create(
+            name="Test Service",
+            description="A service for testing",
+            business=self.business
+        )
+
+        self.inquiry = Inquiry.objects.create(
+            service=self.service,
+            customer=self.customer,
+            subject="Test Inquiry"
+        )
+
+    def test_payment_request_accepted_once(self):
+        """Test that a second copy of a pending request cannot be accepted"""
+        payment_request = PaymentRequest.objects.create(
+            inquiry=self.inquiry,
+            creator=self.business,
+            recipient=self.customer,
+            amount=Decimal('40.00')
+        )
+        duplicate = PaymentRequest.objects.get(pk=payment_request.pk)
+
+        payment_request.accept()
+
+        with self.assertRaises(ValueError):
+            duplicate.accept()
+
+        with self.assertRaises(ValueError):
+            duplicate.decline()
+
+        payment_request.refresh_from_db()
+        self.assertEqual(payment_request.status, PaymentRequest.Status.ACCEPTED)
+        self.assertIsNotNone(payment_request.transaction)
+        self.assertEqual(Wallet.objects.get(user=self.customer).balance, Decimal('60.00'))
+
+    def test_failed_payment_keeps_request_pending(self):
+        """Test that a failed transfer does not mark the request as accepted"""
+        payment_request = PaymentRequest.objects.create(
+            inquiry=self.inquiry,
+            creator=self.business,
+            recipient=self.customer,
+            amount=Decimal('400.00')
+        )
+
+        with self.assertRaises(ValueError) as context:
+            payment_request.accept()
+
+        self.assertEqual(str(context.exception), "Payment failed: Insufficient funds")
+        payment_request.refresh_from_db()
+        self.assertEqual(payment_request.status, PaymentRequest.Status.PENDING)
+
+    def test_conversation_accepted_once(self):
+        """Test that a stale conversation instance cannot charge the sender twice"""
+        conversation = Conversation.objects.create(
+            sender=self.customer,
+            recipient=self.business
+        )
+        duplicate = Conversation.objects.get(pk=conversation.pk)
+
+        conversation.accept()
+
+        with self.assertRaises(ValueError):
+            duplicate.accept()
+
+        self.assertEqual(Wallet.objects.get(user=self.customer).balance, Decimal('95.00'))
+
+
+class TransactionListPaginationTestCase(APITestCase):
+    """Test case for the keyset paginated transaction list"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            username="customer",
+            email="customer@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.customer)
+        self.url = reverse('accounts:transactions')
+
+        wallet = self.customer.wallet
+        wallet.deposit(Decimal('100.00'))
+        for i in range(3):
+            wallet.transfer(self.business.wallet, Decimal('1.00'))
+            self.business.wallet.transfer(wallet, Decimal('0.50'))
+
+        # Unrelated history must not leak into the customer's pages
+        self.business.wallet.withdraw(Decimal('0.10'))
+
+        # Force ties on created_at so the id tie-breaker is exercised
+        Transaction.objects.filter(amount=Decimal('0.50')).update(
+            created_at=Transaction.objects.get(transaction_type=Transaction.TransactionType.DEPOSIT).created_at
+        )
+
+    def test_pages_cover_history_in_order(self):
+        """Test that following next links returns every transaction exactly once"""
+        expected = list(
+            Transaction.objects.filter(
+                Q(from_wallet=self.customer.wallet) | Q(to_wallet=self.customer.wallet)
+            ).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+        seen = []
+        url = f"{self.url}?page_size=3"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 3)
+            seen += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 7)
+
+    def test_page_size_is_capped(self):
+        """Test that page_size cannot exceed the maximum"""
+        response = self.client.get(self.url, {'page_size': 10000})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 7)
+        self.assertIsNone(response.data['next'])
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor returns 404"""
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(PAGINATION_TRANSITION=True)
+    def test_transition_keeps_plain_list(self):
+        """Test that clients sending no cursor or page_size get the old list during the transition"""
+        expected = list(
+            Transaction.objects.filter(
+                Q(from_wallet=self.customer.wallet) | Q(to_wallet=self.customer.wallet)
+            ).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data], expected)
+
+        response = self.client.get(self.url, {'page_size': 3})
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNotNone(response.data['next'])
+
+    @override_settings(PAGINATION_TRANSITION=False)
+    def test_paginated_by_default_after_transition(self):
+        """Test that the list is paginated without params once the transition flag is off"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 7)
+        self.assertIsNone(response.data['next'])
+
+
+class TransactionExportTestCase(APITestCase):
+    """Test case for the streaming transaction export"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            username="customer",
+            email="customer@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.customer)
+        self.url = reverse('accounts:transaction-export')
+
+        wallet = self.customer.wallet
+        wallet.deposit(Decimal('100.00'))
+        wallet.transfer(self.business.wallet, Decimal('10.00'))
+        self.business.wallet.transfer(wallet, Decimal('2.50'))
+        wallet.withdraw(Decimal('5.00'))
+        self.business.wallet.withdraw(Decimal('1.00'))
+
+    def read_stream(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        """Test that the CSV export contains the wallet history newest first"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment;', response['Content-Disposition'])
+
+        lines = self.read_stream(response).splitlines()
+        self.assertEqual(lines[0], 'id,transaction_id,created_at,transaction_type,direction,amount,from_email,to_email')
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[1].split(',')[3:6], ['WITHDRAWAL', 'OUT', '5.00'])
+        self.assertEqual(lines[-1].split(',')[3:6], ['DEPOSIT', 'IN', '100.00'])
+
+    def test_ndjson_export_with_filters(self):
+        """Test that NDJSON export applies the type and date filters"""
+        import json
+        from django.utils import timezone
+
+        today = timezone.localdate().isoformat()
+        response = self.client.get(self.url, {
+            'export_format': 'ndjson',
+            'transaction_type': 'transfer',
+            'start_date': today,
+            'end_date': today,
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        rows = [json.loads(line) for line in self.read_stream(response).splitlines()]
+        self.assertEqual([row['direction'] for row in rows], ['IN', 'OUT'])
+        self.assertEqual([row['amount'] for row in rows], ['2.50', '10.00'])
+        self.assertEqual(rows[1]['to_email'], 'business@example.com')
+
+        response = self.client.get(self.url, {'export_format': 'ndjson', 'end_date': '2000-01-01'})
+        self.assertEqual(self.read_stream(response), '')
+
+    def test_export_batches_cover_history(self):
+        """Test that keyset batches return every row exactly once"""
+        from .exports import iter_wallet_history
+
+        rows = list(iter_wallet_history(self.customer.wallet, batch_size=1))
+        expected = list(
+            Transaction.objects.filter(
+                Q(from_wallet=self.customer.wallet) | Q(to_wallet=self.customer.wallet)
+            ).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual([row['id'] for row in rows], expected)
+
+    def test_invalid_parameters(self):
+        """Test that bad formats, dates and types are rejected"""
+        for params in [
+            {'export_format': 'xml'},
+            {'start_date': '01/02/2024'},
+            {'transaction_type': 'REFUND'},
+        ]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class IdempotencyKeyTestCase(APITestCase):
+    """Test case for Idempotency-Key replay on money-moving endpoints"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            username="customer",
+            email="customer@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+
+        self.customer.wallet.deposit(Decimal('100.00'))
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.customer)
+
+    def test_transfer_replay(self):
+        """Test that a retried transfer is applied once and replays the response"""
+        url = reverse('accounts:transfer')
+        data = {'recipient_email': 'business@example.com', 'amount': '30.00'}
+
+        first = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='transfer-1')
+        second = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='transfer-1')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertFalse(first.has_header('Idempotent-Replayed'))
+
+        self.assertEqual(Wallet.objects.get(user=self.customer).balance, Decimal('70.00'))
+        self.assertEqual(
+            Transaction.objects.filter(transaction_type=Transaction.TransactionType.TRANSFER).count(), 1
+        )
+
+    def test_requests_without_key_are_not_deduplicated(self):
+        """Test that the header is opt-in"""
+        url = reverse('accounts:deposit')
+        self.client.post(url, {'amount': '10.00'}, format='json')
+        self.client.post(url, {'amount': '10.00'}, format='json')
+
+        self.assertEqual(Wallet.objects.get(user=self.customer).balance, Decimal('120.00'))
+
+    def test_key_reused_with_different_body(self):
+        """Test that reusing a key for another request is rejected"""
+        url = reverse('accounts:withdraw')
+        self.client.post(url, {'amount': '10.00'}, format='json', HTTP_IDEMPOTENCY_KEY='withdraw-1')
+        response = self.client.post(url, {'amount': '20.00'}, format='json', HTTP_IDEMPOTENCY_KEY='withdraw-1')
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Wallet.objects.get(user=self.customer).balance, Decimal('90.00'))
+
+    def test_error_responses_are_replayed(self):
+        """Test that a rejected request replays its stored error"""
+        url = reverse('accounts:withdraw')
+        first = self.client.post(url, {'amount': '500.00'}, format='json', HTTP_IDEMPOTENCY_KEY='withdraw-2')
+        self.customer.wallet.deposit(Decimal('500.00'))
+        second = self.client.post(url, {'amount': '500.00'}, format='json', HTTP_IDEMPOTENCY_KEY='withdraw-2')
+
+        self.assertEqual(first.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(second.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(Wallet.objects.get(user=self.customer).balance, Decimal('600.00'))
+
+    @override_settings(IDEMPOTENCY_KEY_TTL=3600)
+    def test_expired_keys_are_purged(self):
+        """Test that keys past their replay window are purged and can be reused"""
+        url = reverse('accounts:deposit')
+        self.client.post(url, {'amount': '10.00'}, format='json', HTTP_IDEMPOTENCY_KEY='old')
+        self.client.post(url, {'amount': '10.00'}, format='json', HTTP_IDEMPOTENCY_KEY='new')
+        IdempotencyKey.objects.filter(key='old').update(created_at=timezone.now() - timedelta(hours=2))
+
+        output = StringIO()
+        call_command('purge_idempotency_keys', '--dry-run', stdout=output)
+        self.assertIn("Would purge 1 ", output.getvalue())
+        self.assertEqual(IdempotencyKey.objects.count(), 2)
+
+        call_command('purge_idempotency_keys', stdout=StringIO())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['new'])
+
+        # A purged key runs its request again
+        response = self.client.post(url, {'amount': '10.00'}, format='json', HTTP_IDEMPOTENCY_KEY='old')
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(Wallet.objects.get(user=self.customer).balance, Decimal('130.00'))
+
+    @override_settings(IDEMPOTENCY_KEY_TTL=3600)
+    def test_inserts_purge_expired_keys(self):
+        """Test that keyed requests purge expired keys every PURGE_EVERY inserts"""
+        url = reverse('accounts:deposit')
+        self.client.post(url, {'amount': '10.00'}, format='json', HTTP_IDEMPOTENCY_KEY='old')
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(hours=2))
+
+        with mock.patch.object(IdempotencyKey, 'PURGE_EVERY', 1), self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'amount': '10.00'}, format='json', HTTP_IDEMPOTENCY_KEY='new')
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['new'])
+
+    def test_payment_request_accept_replay(self):
+        """Test that a retried accept replays the original success"""
+        service = Service.objects.create(
+            name="Test Service",
+            description="A service for testing",
+            business=self.business
+        )
+        inquiry = Inquiry.objects.create(service=service, customer=self.customer, subject="Test Inquiry")
+        payment_request = PaymentRequest.objects.create(
+            inquiry=inquiry,
+            creator=self.business,
+            recipient=self.customer,
+            amount=Decimal('40.00')
+        )
+
+        url = reverse('accounts:payment-request-action', kwargs={'request_id': payment_request.request_id})
+        first = self.client.post(url, {'action': 'accept'}, format='json', HTTP_IDEMPOTENCY_KEY='accept-1')
+        second = self.client.post(url, {'action': 'accept'}, format='json', HTTP_IDEMPOTENCY_KEY='accept-1')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data['transaction_id'], first.data['transaction_id'])
+        self.assertEqual(Wallet.objects.get(user=self.customer).balance, Decimal('60.00'))
+
+
+class BatchTransferTestCase(APITestCase):
+    """Test case for the batch payout endpoint"""
+
+    def setUp(self):
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+        self.business.wallet.deposit(Decimal('100.00'))
+
+        self.customers = [
+            User.objects.create_user(
+                username=f"customer{i}",
+                email=f"customer{i}@example.com",
+                password="password123",
+                role=User.Role.CUSTOMER
+            )
+            for i in range(5)
+        ]
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.business)
+        self.url = reverse('accounts:batch-transfer')
+
+    def test_batch_transfer(self):
+        """Test that every payout is applied and recorded"""
+        transfers = [
+            {'recipient_email': customer.email, 'amount': f'{i + 1}.00'}
+            for i, customer in enumerate(self.customers)
+        ]
+        # The same recipient may appear more than once
+        transfers.append({'recipient_email': 'customer0@example.com', 'amount': '0.50'})
+
+        response = self.client.post(self.url, {'transfers': transfers}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['transaction_ids']), 6)
+        self.assertEqual(response.data['new_balance'], '84.50')
+
+        balances = dict(Wallet.objects.values_list('user__email', 'balance'))
+        self.assertEqual(balances['business@example.com'], Decimal('84.50'))
+        self.assertEqual(balances['customer0@example.com'], Decimal('1.50'))
+        self.assertEqual(balances['customer4@example.com'], Decimal('5.00'))
+        self.assertEqual(
+            Transaction.objects.filter(
+                from_wallet=self.business.wallet,
+                transaction_type=Transaction.TransactionType.TRANSFER
+            ).count(),
+            6
+        )
+
+    def test_query_count_does_not_grow_with_payouts(self):
+        """Test that the ledger work is a fixed number of queries"""
+        payouts = [(customer.wallet.pk, Decimal('1.00')) for customer in self.customers]
+        wallet = self.business.wallet
+
+        # savepoint, lock, debit, credit, insert, four summary queries
+        # (select, insert missing, reselect, update), refresh, release
+        with self.assertNumQueries(11):
+            wallet.batch_transfer(payouts)
+
+    def test_insufficient_funds_applies_nothing(self):
+        """Test that a batch the sender cannot cover is rejected as a whole"""
+        transfers = [
+            {'recipient_email': customer.email, 'amount': '30.00'}
+            for customer in self.customers
+        ]
+
+        response = self.client.post(self.url, {'transfers': transfers}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Wallet.objects.get(user=self.business).balance, Decimal('100.00'))
+        self.assertFalse(Transaction.objects.filter(to_wallet__user__in=self.customers).exists())
+
+    def test_unknown_recipient(self):
+        """Test that unknown recipients are reported and nothing is applied"""
+        transfers = [
+            {'recipient_email': 'customer0@example.com', 'amount': '1.00'},
+            {'recipient_email': 'nobody@example.com', 'amount': '1.00'},
+        ]
+
+        response = self.client.post(self.url, {'transfers': transfers}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['recipients'], ['nobody@example.com'])
+        self.assertEqual(Wallet.objects.get(user=self.business).balance, Decimal('100.00'))
+
+    def test_invalid_batches(self):
+        """Test that empty batches, bad amounts and self-payments are rejected"""
+        for transfers in [
+            [],
+            [{'recipient_email': 'customer0@example.com', 'amount': '-1.00'}],
+            [{'recipient_email': 'business@example.com', 'amount': '1.00'}],
+        ]:
+            response = self.client.post(self.url, {'transfers': transfers}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class WalletMonthlySummaryTestCase(APITestCase):
+    """Test case for the incrementally maintained monthly summaries"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            username="customer",
+            email="customer@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+
+        wallet = self.customer.wallet
+        wallet.deposit(Decimal('100.00'))
+        wallet.deposit(Decimal('20.00'))
+        wallet.transfer(self.business.wallet, Decimal('30.00'))
+        wallet.withdraw(Decimal('5.00'))
+        self.business.wallet.batch_transfer([(wallet.pk, Decimal('1.00')), (wallet.pk, Decimal('2.00'))])
+
+    def summary(self, user, transaction_type):
+        return WalletMonthlySummary.objects.get(wallet=user.wallet, transaction_type=transaction_type)
+
+    def test_summaries_track_every_save_path(self):
+        """Test that saves and bulk payouts update both sides of each transaction"""
+        deposits = self.summary(self.customer, Transaction.TransactionType.DEPOSIT)
+        self.assertEqual((deposits.count, deposits.inflow, deposits.outflow), (2, Decimal('120.00'), Decimal('0.00')))
+
+        transfers = self.summary(self.customer, Transaction.TransactionType.TRANSFER)
+        self.assertEqual((transfers.count, transfers.inflow, transfers.outflow), (3, Decimal('3.00'), Decimal('30.00')))
+
+        business_transfers = self.summary(self.business, Transaction.TransactionType.TRANSFER)
+        self.assertEqual(
+            (business_transfers.count, business_transfers.inflow, business_transfers.outflow),
+            (3, Decimal('30.00'), Decimal('3.00'))
+        )
+
+        withdrawals = self.summary(self.customer, Transaction.TransactionType.WITHDRAWAL)
+        self.assertEqual((withdrawals.count, withdrawals.outflow), (1, Decimal('5.00')))
+
+    def test_rebuild_command(self):
+        """Test that the command repairs drifted summaries and verifies them"""
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        WalletMonthlySummary.objects.filter(transaction_type=Transaction.TransactionType.DEPOSIT).update(count=99)
+        WalletMonthlySummary.objects.filter(transaction_type=Transaction.TransactionType.WITHDRAWAL).delete()
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_wallet_summaries', '--verify', stdout=StringIO())
+
+        call_command('rebuild_wallet_summaries', stdout=StringIO())
+
+        self.assertEqual(self.summary(self.customer, Transaction.TransactionType.DEPOSIT).count, 2)
+        self.assertEqual(self.summary(self.customer, Transaction.TransactionType.WITHDRAWAL).outflow, Decimal('5.00'))
+        call_command('rebuild_wallet_summaries', '--verify', stdout=StringIO())
+
+    def test_statements_endpoint(self):
+        """Test that the statement endpoint reads the wallet's summaries"""
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.get(reverse('accounts:wallet-statements'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = {row['transaction_type']: row for row in response.data}
+        self.assertEqual(set(rows), {'DEPOSIT', 'TRANSFER', 'WITHDRAWAL'})
+        self.assertEqual(rows['DEPOSIT']['inflow'], '120.00')
+        self.assertEqual(rows['TRANSFER']['month'], timezone.localdate().strftime('%Y-%m'))
+
+
+class ReconciliationTestCase(TestCase):
+    """Test case for balance checkpoints and the reconcile_wallets command"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            username="customer",
+            email="customer@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+
+        self.customer.wallet.deposit(Decimal('100.00'))
+        self.customer.wallet.transfer(self.business.wallet, Decimal('40.00'))
+        self.business.wallet.withdraw(Decimal('15.00'))
+
+    def reconcile(self, *args):
+        from io import StringIO
+        from django.core.management import call_command
+
+        output = StringIO()
+        call_command('reconcile_wallets', '--workers', '1', '--chunk-size', '1', '--settle-seconds', '0', *args, stdout=output)
+        return output.getvalue()
+
+    def test_checkpoints_advance_incrementally(self):
+        """Test that reconciled wallets are checkpointed and later runs build on them"""
+        from .models import BalanceCheckpoint
+
+        self.reconcile()
+
+        checkpoint = BalanceCheckpoint.objects.get(wallet=self.business.wallet)
+        self.assertEqual(checkpoint.balance, Decimal('25.00'))
+        self.assertEqual(checkpoint.last_transaction_pk, Transaction.objects.latest('pk').pk)
+
+        tx = self.business.wallet.deposit(Decimal('5.00'))
+        self.reconcile()
+
+        checkpoint.refresh_from_db()
+        self.assertEqual(checkpoint.balance, Decimal('30.00'))
+        self.assertEqual(checkpoint.last_transaction_pk, tx.pk)
+
+    def test_discrepancy_report(self):
+        """Test that a tampered balance is reported and not checkpointed"""
+        from django.core.management.base import CommandError
+        from .models import BalanceCheckpoint
+
+        Wallet.objects.filter(pk=self.customer.wallet.pk).update(balance=Decimal('70.00'))
+
+        with self.assertRaises(CommandError) as context:
+            self.reconcile('--report', '-')
+
+        self.assertIn('1 wallets do not match', str(context.exception))
+        self.assertFalse(BalanceCheckpoint.objects.filter(wallet=self.customer.wallet).exists())
+        self.assertTrue(BalanceCheckpoint.objects.filter(wallet=self.business.wallet).exists())
+
+    def test_recent_transactions_are_verified_but_not_checkpointed(self):
+        """Test that transactions inside the settle window count towards the check only"""
+        from .reconciliation import reconcile_range
+
+        discrepancies, checkpoints = reconcile_range(
+            self.customer.wallet.pk, self.customer.wallet.pk + 1, high_water=0
+        )
+
+        self.assertEqual(discrepancies, [])
+        self.assertEqual(checkpoints, [])
+
+
+class WalletShardTestCase(APITestCase):
+    """Test case for hot-wallet credit shards"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            username="customer",
+            email="customer@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+
+        self.customer.wallet.deposit(Decimal('100.00'))
+        self.hot_wallet = self.business.wallet
+        self.hot_wallet.deposit(Decimal('10.00'))
+        self.hot_wallet.set_shard_count(4)
+
+    def test_credits_land_on_shards(self):
+        """Test that credits skip the wallet row and show up in the total"""
+        for _ in range(8):
+            self.customer.wallet.transfer(self.hot_wallet, Decimal('5.00'))
+
+        wallet = Wallet.objects.get(pk=self.hot_wallet.pk)
+        self.assertEqual(wallet.balance, Decimal('10.00'))
+        self.assertEqual(wallet.total_balance, Decimal('50.00'))
+        self.assertEqual(wallet.shards.count(), 4)
+
+        self.client.force_authenticate(user=self.business)
+        response = self.client.get(reverse('accounts:wallet'))
+        self.assertEqual(response.data['balance'], '50.00')
+
+    def test_debit_consolidates_shards(self):
+        """Test that a debit larger than the wallet row pulls in the shards"""
+        self.customer.wallet.transfer(self.hot_wallet, Decimal('30.00'))
+
+        self.hot_wallet.withdraw(Decimal('35.00'))
+
+        wallet = Wallet.objects.get(pk=self.hot_wallet.pk)
+        self.assertEqual(wallet.balance, Decimal('5.00'))
+        self.assertEqual(wallet.total_balance, Decimal('5.00'))
+
+        with self.assertRaises(InsufficientFunds):
+            self.hot_wallet.withdraw(Decimal('5.01'))
+
+    def test_disabling_shards_keeps_funds(self):
+        """Test that removing the shards moves their balance into the wallet"""
+        self.customer.wallet.transfer(self.hot_wallet, Decimal('30.00'))
+
+        self.hot_wallet.set_shard_count(0)
+
+        wallet = Wallet.objects.get(pk=self.hot_wallet.pk)
+        self.assertEqual(wallet.shard_count, 0)
+        self.assertEqual(wallet.balance, Decimal('40.00'))
+        self.assertFalse(wallet.shards.exists())
+
+    def test_stale_shard_count_falls_back_to_wallet_row(self):
+        """Test that a credit to a removed shard is applied to the wallet row"""
+        stale = Wallet.objects.get(pk=self.hot_wallet.pk)
+        self.hot_wallet.set_shard_count(0)
+
+        self.customer.wallet.transfer(stale, Decimal('7.00'))
+
+        self.assertEqual(Wallet.objects.get(pk=self.hot_wallet.pk).balance, Decimal('17.00'))
+
+    def test_sharded_wallets_reconcile(self):
+        """Test that reconciliation counts the shard balances"""
+        from .reconciliation import reconcile_range
+
+        self.customer.wallet.transfer(self.hot_wallet, Decimal('30.00'))
+        self.business.wallet.batch_transfer([(self.customer.wallet.pk, Decimal('1.00'))])
+        self.customer.wallet.batch_transfer([(self.hot_wallet.pk, Decimal('2.00'))])
+
+        discrepancies, _ = reconcile_range(self.hot_wallet.pk, self.hot_wallet.pk + 1, high_water=0)
+        self.assertEqual(discrepancies, [])
+
+
+class UUID7TestCase(TestCase):
+    """Test case for time-ordered identifiers"""
+
+    def test_uuid7_format_and_order(self):
+        """Test that uuid7 values are version 7 and sort by creation"""
+        from .identifiers import uuid7
+
+        values = [uuid7() for _ in range(5000)]
+
+        self.assertTrue(all(value.version == 7 for value in values))
+        self.assertTrue(all(value.variant == uuid.RFC_4122 for value in values))
+        self.assertEqual(values, sorted(values))
+        self.assertEqual(len(set(values)), len(values))
+
+    def test_models_use_uuid7(self):
+        """Test that the public identifiers default to uuid7 and still route"""
+        user = User.objects.create_user(
+            username="customer",
+            email="customer@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+        tx = user.wallet.deposit(Decimal('1.00'))
+
+        self.assertEqual(tx.transaction_id.version, 7)
+        self.assertEqual(len(str(tx.transaction_id)), 36)
+
+        conversation = Conversation.objects.create(
+            sender=user,
+            recipient=User.objects.create_user(username="other", email="other@example.com", password="password123")
+        )
+        self.assertEqual(conversation.conversation_id.version, 7)
+        reverse('accounts:conversation-detail', kwargs={'conversation_id': conversation.conversation_id})
+
+
+class MoneyTestCase(APITestCase):
+    """Test case for amounts stored as integer cents"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            username="customer",
+            email="customer@example.com",
+            password="password123",
+            role=User.Role.CUSTOMER
+        )
+        self.business = User.objects.create_user(
+            username="business",
+            email="business@example.com",
+            password="password123",
+            role=User.Role.BUSINESS
+        )
+        self.customer.wallet.deposit(Decimal('100.10'))
+        self.customer.wallet.transfer(self.business.wallet, Decimal('0.29'))
+
+    def test_conversions(self):
+        """Test conversion between amounts and cents"""
+        from .money import to_cents, from_cents
+
+        self.assertEqual(to_cents(Decimal('12.34')), 1234)
+        self.assertEqual(to_cents('0.005'), 1)
+        self.assertEqual(to_cents(0.29), 29)
+        self.assertEqual(to_cents(5), 500)
+        self.assertEqual(from_cents(1234), Decimal('12.34'))
+        self.assertEqual(str(from_cents(0)), '0.00')
+        self.assertEqual(str(from_cents(-5)), '-0.05')
+
+    def test_stored_as_cents(self):
+        """Test that the columns hold cents and instances see Decimals"""
+        from django.db import connection
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT balance FROM accounts_wallet WHERE id = %s", [self.customer.wallet.pk])
+            self.assertEqual(cursor.fetchone()[0], 9981)
+
+        wallet = Wallet.objects.get(pk=self.customer.wallet.pk)
+        self.assertEqual(wallet.balance, Decimal('99.81'))
+        self.assertTrue(Wallet.objects.filter(pk=wallet.pk, balance__gte=Decimal('99.81')).exists())
+        self.assertFalse(Wallet.objects.filter(pk=wallet.pk, balance__gt=Decimal('99.81')).exists())
+
+    def test_api_emits_decimal_strings(self):
+        """Test that the API output is unchanged"""
+        self.client.force_authenticate(user=self.customer)
+
+        response = self.client.get(reverse('accounts:wallet'))
+        self.assertEqual(response.data['balance'], '99.81')
+
+        response = self.client.get(reverse('accounts:transactions'))
+        self.assertEqual([tx['amount'] for tx in response.data], ['0.29', '100.10'])
+
+    def test_cents_aggregation(self):
+        """Test the integer aggregation helpers"""
+        from .money import Cents, SumCents, cents_array, sum_cents
+
+        self.assertEqual(Transaction.objects.aggregate(total=SumCents('amount'))['total'], 10039)
+        self.assertEqual(Transaction.objects.filter(pk=0).aggregate(total=SumCents('amount'))['total'], 0)
+
+        cents = Transaction.objects.annotate(cents=Cents('amount')).order_by('pk').values_list('cents', flat=True)
+        self.assertEqual(list(cents), [10010, 29])
+        self.assertEqual(sum_cents(cents_array(cents)), 10039)
@@ -0,0 +1,75 @@
+"""
+Field change tracking without reload queries.
+
+Models list the attnames their save() compares against the stored row:
+
+    class Service(TrackedFieldsMixin, models.Model):
+        TRACKED_FIELDS = ['logo', 'category_id', 'business_id']
+
+Instances loaded from the database snapshot those columns in from_db(), and
+save() moves the snapshot forward, so stored_values() answers "what did
+the row hold" from memory:
+
+    previous = self.stored_values()   # None for a row not yet saved
+    if previous and previous['category_id'] != self.category_id: ...
+
+Only instances built by hand (Service(pk=...)) or loaded with a tracked
+column deferred fall back to one query for the columns they lack. The
+snapshot is what this instance loaded: columns other writers change with
+F() updates, such as counters, are better read under a lock.
+"""
+from django.db.models import DEFERRED
+
+
+def stored_form(value):
+    # File fields hold FieldFiles, stored as their names
+    return getattr(value, 'name', value)
+
+
+class TrackedFieldsMixin:
+    TRACKED_FIELDS = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        instance._stored_values = {
+            name: loaded[name] for name in cls.TRACKED_FIELDS
+            if name in loaded and loaded[name] is not DEFERRED
+        }
+        return instance
+
+    def remember_values(self, field_names=None):
+        """Snapshot the tracked columns among field_names (all if None) from the instance"""
+        stored = self.__dict__.setdefault('_stored_values', {})
+        for field in self._meta.concrete_fields:
+            if field.attname not in self.TRACKED_FIELDS or field.attname not in self.__dict__:
+                continue
+            if field_names is None or field.name in field_names or field.attname in field_names:
+                stored[field.attname] = stored_form(getattr(self, field.attname))
+
+    def stored_values(self):
+        """Tracked columns as stored in the database, or None if the row does not exist"""
+        if self.pk is None:
+            return None
+        stored = self.__dict__.setdefault('_stored_values', {})
+        missing = [name for name in self.TRACKED_FIELDS if name not in stored]
+        if missing:
+            row = type(self)._base_manager.using(self._state.db).filter(pk=self.pk).values(*missing).first()
+            if row is None:
+                return None
+            stored.update(row)
+        return dict(stored)
+
+    def has_changed(self, name):
+        """Whether tracked attname differs from the stored row (True for a new row)"""
+        stored = self.stored_values()
+        return stored is None or stored[name] != stored_form(getattr(self, name))
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.remember_values(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self.remember_values(fields)
@@ -0,0 +1,183 @@
+"""
+Time-decayed trending scores for services and blog posts.
+
+A score is the sum of recent activity, each event weighted by
+
+    weight * 2 ** (-age / TRENDING_HALF_LIFE_HOURS)
+
+so an inquiry from two days ago counts half as much as one from now (with
+the default half-life). Events and weights:
+
+    services    inquiries (INQUIRY_WEIGHT), reviews (REVIEW_WEIGHT)
+    blog posts  comments (COMMENT_WEIGHT), views (VIEW_WEIGHT)
+
+The refresh_trending command, run periodically (e.g. every 15 minutes from
+cron), updates the ServiceTrend and BlogPostTrend tables incrementally:
+every stored score is multiplied by the decay since the previous refresh in
+one UPDATE, then the events since then are added with bulk_update. Blog
+views have no timestamps and count as happening halfway through the
+interval.
+
+?ordering=trending (hottest first) and ?ordering=-trending are handled by
+TrendingOrderingFilter, which reads the rows in score index order instead
+of aggregating activity per request.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from rest_framework.filters import OrderingFilter
+
+from .models import BlogComment, BlogPost, BlogPostTrend, Inquiry, Review, Service, ServiceTrend
+
+TRENDING = 'trending'
+INQUIRY_WEIGHT = 1.0
+REVIEW_WEIGHT = 2.0
+COMMENT_WEIGHT = 1.0
+VIEW_WEIGHT = 0.1
+# The first refresh scores this many half-lives of history
+HISTORY_HALF_LIVES = 8
+CHUNK_SIZE = 1000
+
+
+def half_life():
+    return timedelta(hours=getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 48))
+
+
+def decay(age):
+    """Weight left after age, a timedelta"""
+    return 0.5 ** (age / half_life())
+
+
+def decay_scores(model, now):
+    """
+    Decay every stored score to now, in one UPDATE.
+
+    Returns:
+        The time of the previous refresh, from which events must be added
+    """
+    since = model.objects.aggregate(since=Max('computed_at'))['since']
+    if since is None:
+        since = now - half_life() * HISTORY_HALF_LIVES
+    model.objects.update(score=F('score') * decay(now - since), computed_at=now)
+    return since
+
+
+def event_gains(sources, since, now):
+    """
+    Decayed weight of the events in (since, now] per object id.
+
+    Args:
+        sources: (queryset, object id field, timestamp field, weight) tuples
+    """
+    gains = defaultdict(float)
+    for queryset, id_field, time_field, weight in sources:
+        events = queryset.filter(**{f'{time_field}__gt': since, f'{time_field}__lte': now}).values_list(
+            id_field, time_field
+        ).order_by()
+        for object_id, moment in events.iterator(chunk_size=CHUNK_SIZE):
+            gains[object_id] += weight * decay(now - moment)
+    return gains
+
+
+def add_gains(model, gains, **fields):
+    """
+    Add gains to the scores of their rows with bulk_update.
+
+    fields maps more field names to {object id: value} to store alongside.
+    """
+    ids = sorted(gains.keys() | {object_id for values in fields.values() for object_id in values})
+    for start in range(0, len(ids), CHUNK_SIZE):
+        rows = list(model.objects.filter(pk__in=ids[start:start + CHUNK_SIZE]))
+        for row in rows:
+            row.score += gains.get(row.pk, 0)
+            for field, values in fields.items():
+                if row.pk in values:
+                    setattr(row, field, values[row.pk])
+        model.objects.bulk_update(rows, ['score', *fields], batch_size=CHUNK_SIZE)
+
+
+def missing_trends(model, owners, owner_field, **defaults):
+    """Create score rows for owners without one, e.g. rows inserted with bulk_create"""
+    missing = owners.filter(trend__isnull=True)
+    model.objects.bulk_create(
+        [
+            model(**{owner_field: row['pk']}, **{field: row[source] for field, source in defaults.items()})
+            for row in missing.values('pk', *defaults.values()).iterator(chunk_size=CHUNK_SIZE)
+        ],
+        batch_size=CHUNK_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def refresh_services(now):
+    missing_trends(ServiceTrend, Service.objects.all(), 'service_id')
+    since = decay_scores(ServiceTrend, now)
+    add_gains(ServiceTrend, event_gains([
+        (Inquiry.objects.all(), 'service_id', 'created_at', INQUIRY_WEIGHT),
+        (Review.objects.all(), 'service_id', 'created_at', REVIEW_WEIGHT),
+    ], since, now))
+
+
+def refresh_blog_posts(now):
+    # Existing views do not count as recent
+    missing_trends(BlogPostTrend, BlogPost.objects.all(), 'post_id', views_seen='views')
+    since = decay_scores(BlogPostTrend, now)
+    gains = event_gains([
+        (BlogComment.objects.all(), 'blog_post_id', 'created_at', COMMENT_WEIGHT),
+    ], since, now)
+
+    views = {}
+    viewed = BlogPostTrend.objects.filter(post__views__gt=F('views_seen')).values_list(
+        'post_id', 'post__views', 'views_seen'
+    )
+    midpoint = decay((now - since) / 2)
+    for post_id, total, seen in viewed.iterator(chunk_size=CHUNK_SIZE):
+        gains[post_id] += (total - seen) * VIEW_WEIGHT * midpoint
+        views[post_id] = total
+    add_gains(BlogPostTrend, gains, views_seen=views)
+
+
+def refresh(now=None):
+    """Bring every trending score up to now and invalidate the cached orderings"""
+    from .response_cache import bump
+    now = now or timezone.now()
+    with transaction.atomic():
+        refresh_services(now)
+        refresh_blog_posts(now)
+    bump(TRENDING)
+
+
+def orders_by_trending(request):
+    """Whether the request asks for ?ordering=trending or -trending"""
+    terms = request.query_params.get(OrderingFilter.ordering_param, '').split(',')
+    return any(term.strip().lstrip('-') == TRENDING for term in terms)
+
+
+class TrendingOrderingFilter(OrderingFilter):
+    """
+    OrderingFilter that also accepts ?ordering=trending (hottest first).
+
+    Views list 'trending' in ordering_fields. Every service and blog post
+    has its score row, so the inner join to it drops nothing and lets the
+    database read the rows in score index order.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering or not any(term.lstrip('-') == TRENDING for term in ordering):
+            return super().filter_queryset(request, queryset, view)
+
+        terms = []
+        for term in ordering:
+            # Ties by primary key, which is also the score row's
+            if term == TRENDING:
+                terms += ['-trend__score', '-pk']
+            elif term == f'-{TRENDING}':
+                terms += ['trend__score', 'pk']
+            else:
+                terms.append(term)
+        return queryset.filter(trend__isnull=False).order_by(*terms)
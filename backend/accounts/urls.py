@@ -45,9 +45,12 @@ urlpatterns = [
     path('wallet/deposit/', views.deposit, name='deposit'),
     path('wallet/withdraw/', views.withdraw, name='withdraw'),
     path('wallet/transfer/', views.transfer, name='transfer'),
+    path('wallet/transfers/batch/', views.batch_transfer, name='batch-transfer'),
+    path('wallet/statements/', views.wallet_statements, name='wallet-statements'),
     
     # Transactions endpoints
     path('transactions/', views.transaction_list, name='transactions'),
+    path('transactions/export/', views.transaction_export, name='transaction-export'),
 
     # Reviews endpoints - RESTful nested resources
     # Service Reviews
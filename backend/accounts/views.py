@@ -7,18 +7,20 @@ from rest_framework.exceptions import PermissionDenied
 from django.contrib.auth import get_user_model, authenticate
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
-from django.http import Http404
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from datetime import date, datetime, time, timedelta
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import (
-    Wallet, Transaction, Service, Inquiry, InquiryMessage, 
+    Wallet, Transaction, WalletMonthlySummary, Service, Inquiry, InquiryMessage, 
     Review, ReviewComment, Category, BlogCategory, BlogPost, BlogComment,
     PaymentRequest, User, Conversation, ConversationMessage, VerifiedServiceCustomer,
-    SupportTicket, SupportMessage
+    SupportTicket, SupportMessage, BusinessStats, BusinessDailyStats, ServiceSimilarity
 )
 from .serializers import (
     UserSerializer, UserProfileSerializer, WalletSerializer,
-    TransactionSerializer, DepositSerializer, WithdrawSerializer,
-    TransferSerializer, ServiceSerializer, InquirySerializer,
+    TransactionSerializer, WalletMonthlySummarySerializer, DepositSerializer, WithdrawSerializer,
+    TransferSerializer, BatchTransferSerializer, ServiceSerializer, InquirySerializer,
     InquiryMessageSerializer, InquiryCreateSerializer, 
     ReviewSerializer, ReviewCommentSerializer, CategorySerializer,
     BlogCategorySerializer, BlogPostListSerializer, BlogPostDetailSerializer,
@@ -29,6 +31,16 @@ from .serializers import (
     SupportTicketSerializer, SupportMessageSerializer, SupportTicketCreateSerializer,
     SupportTicketCloseSerializer
 )
+from .pagination import StandardCursorPagination, WalletTransactionPagination
+from .conditional import ConditionalGetMixin
+from .prefetch import OptimizedQuerysetMixin, related_count
+from .recommendations import TOP_K
+from .idempotency import idempotent
+from .exports import EXPORT_CONTENT_TYPES, iter_wallet_history, stream_csv, stream_ndjson
+from .response_cache import VersionedCacheMixin, generations
+from .search import RankedOrderingFilter, ServiceSearchFilter
+from .suggest import suggest_index
+from .trending import TRENDING, TrendingOrderingFilter, orders_by_trending
 
 User = get_user_model()
 
@@ -197,6 +209,7 @@ def wallet_detail(request):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@idempotent
 def deposit(request):
     """Deposit funds to the user's wallet"""
     serializer = DepositSerializer(data=request.data)
@@ -210,7 +223,7 @@ def deposit(request):
             return Response({
                 'message': f'Successfully deposited {amount}',
                 'transaction_id': str(transaction.transaction_id),
-                'new_balance': str(wallet.balance)
+                'new_balance': str(wallet.total_balance)
             })
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -219,6 +232,7 @@ def deposit(request):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@idempotent
 def withdraw(request):
     """Withdraw funds from the user's wallet"""
     serializer = WithdrawSerializer(data=request.data)
@@ -232,7 +246,7 @@ def withdraw(request):
             return Response({
                 'message': f'Successfully withdrew {amount}',
                 'transaction_id': str(transaction.transaction_id),
-                'new_balance': str(wallet.balance)
+                'new_balance': str(wallet.total_balance)
             })
         except ValueError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -241,6 +255,7 @@ def withdraw(request):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@idempotent
 def transfer(request):
     """Transfer funds to another user's wallet"""
     serializer = TransferSerializer(data=request.data)
@@ -265,7 +280,7 @@ def transfer(request):
             return Response({
                 'message': f'Successfully transferred {amount} to {recipient.email}',
                 'transaction_id': str(transaction.transaction_id),
-                'new_balance': str(sender_wallet.balance)
+                'new_balance': str(sender_wallet.total_balance)
             })
         except ValueError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -273,20 +288,158 @@ def transfer(request):
 
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@idempotent
+def batch_transfer(request):
+    """
+    Transfer funds to many users in one atomic operation.
+    
+    Expects {"transfers": [{"recipient_email": ..., "amount": ...}, ...]}.
+    Either every transfer is applied or none is.
+    """
+    serializer = BatchTransferSerializer(data=request.data)
+    if serializer.is_valid():
+        transfers = serializer.validated_data['transfers']
+        sender_wallet = request.user.wallet
+        
+        # Resolve every recipient in one query
+        emails = {item['recipient_email'] for item in transfers}
+        wallet_ids = dict(
+            Wallet.objects.filter(user__email__in=emails).values_list('user__email', 'pk')
+        )
+        missing = sorted(emails - set(wallet_ids))
+        if missing:
+            return Response(
+                {'error': 'Recipient not found', 'recipients': missing},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        try:
+            transactions = sender_wallet.batch_transfer([
+                (wallet_ids[item['recipient_email']], item['amount'])
+                for item in transfers
+            ])
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        total = sum(item['amount'] for item in transfers)
+        return Response({
+            'message': f'Successfully transferred {total} to {len(emails)} recipients',
+            'transaction_ids': [str(tx.transaction_id) for tx in transactions],
+            'new_balance': str(sender_wallet.total_balance)
+        })
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def wallet_statements(request):
+    """
+    Monthly totals per transaction type for the current user's wallet.
+    
+    'months' limits the statement to the most recent N months (default 12).
+    """
+    try:
+        months = int(request.query_params.get('months', 12))
+    except ValueError:
+        months = 12
+    months = max(1, min(months, 120))
+    
+    today = timezone.localdate()
+    start_index = today.year * 12 + today.month - months
+    since = date(start_index // 12, start_index % 12 + 1, 1)
+    
+    summaries = WalletMonthlySummary.objects.filter(
+        wallet=request.user.wallet,
+        month__gte=since
+    )
+    serializer = WalletMonthlySummarySerializer(summaries, many=True)
+    return Response(serializer.data)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def transaction_list(request):
-    """List all transactions for the current user's wallet"""
+    """
+    List transactions for the current user's wallet, newest first.
+    
+    Results are cursor paginated: follow the 'next' link (or pass its
+    'cursor' parameter) to get the following page. 'page_size' sets the
+    number of rows per page. Requests with neither get the whole history
+    as a plain list while settings.PAGINATION_TRANSITION is on.
+    """
     wallet = request.user.wallet
-    transactions = Transaction.objects.filter(
-        Q(from_wallet=wallet) | Q(to_wallet=wallet)
-    ).order_by('-created_at')
+    paginator = WalletTransactionPagination()
+    transactions = paginator.paginate_wallet(request, wallet)
+    if transactions is None:
+        transactions = paginator.with_related(
+            Transaction.objects.filter(Q(from_wallet=wallet) | Q(to_wallet=wallet))
+        ).order_by('-created_at', '-pk')
+        return Response(TransactionSerializer(transactions, many=True).data)
     
     serializer = TransactionSerializer(transactions, many=True)
-    return Response(serializer.data)
+    return paginator.get_paginated_response(serializer.data)
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def transaction_export(request):
+    """
+    Stream the current user's full transaction history as CSV or NDJSON.
+    
+    Query parameters:
+    - export_format: 'csv' (default) or 'ndjson'
+    - start_date / end_date: inclusive YYYY-MM-DD bounds on created_at
+    - transaction_type: comma separated list of DEPOSIT, WITHDRAWAL, TRANSFER
+    """
+    export_format = request.query_params.get('export_format', 'csv').lower()
+    if export_format not in EXPORT_CONTENT_TYPES:
+        return Response(
+            {'error': "export_format must be 'csv' or 'ndjson'"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    lookups = {}
+    try:
+        start_date = request.query_params.get('start_date')
+        if start_date:
+            lookups['created_at__gte'] = start_of_day(date.fromisoformat(start_date))
+        end_date = request.query_params.get('end_date')
+        if end_date:
+            lookups['created_at__lt'] = start_of_day(date.fromisoformat(end_date) + timedelta(days=1))
+    except ValueError:
+        return Response(
+            {'error': 'Dates must be in YYYY-MM-DD format'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    transaction_type = request.query_params.get('transaction_type')
+    if transaction_type:
+        types = [value.strip().upper() for value in transaction_type.split(',') if value.strip()]
+        invalid = [value for value in types if value not in Transaction.TransactionType.values]
+        if invalid:
+            return Response(
+                {'error': f"Invalid transaction_type: {', '.join(invalid)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        lookups['transaction_type__in'] = types
+    
+    rows = iter_wallet_history(request.user.wallet, lookups)
+    stream = stream_csv(rows) if export_format == 'csv' else stream_ndjson(rows)
+    
+    response = StreamingHttpResponse(stream, content_type=EXPORT_CONTENT_TYPES[export_format])
+    filename = f"transactions-{timezone.localdate().isoformat()}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def start_of_day(day):
+    """Return the aware datetime at which day starts in the current timezone"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class CategoryViewSet(OptimizedQuerysetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for viewing and managing service categories.
     """
@@ -307,18 +460,24 @@ class CategoryViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
 
 
-class ServiceViewSet(viewsets.ModelViewSet):
+class ServiceViewSet(OptimizedQuerysetMixin, ConditionalGetMixin, VersionedCacheMixin, viewsets.ModelViewSet):
     """
     ViewSet for viewing and creating services.
+    List and retrieve responses are cached (see accounts.response_cache)
+    and support conditional GETs (see accounts.conditional).
     """
     queryset = Service.objects.all()
     serializer_class = ServiceSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # ?search= goes to the full-text index and is ranked by relevance
+    filter_backends = [DjangoFilterBackend, ServiceSearchFilter, RankedOrderingFilter]
     filterset_fields = ['category']
-    search_fields = ['name', 'description']
-    ordering_fields = ['name', 'created_at']
+    # avg_rating and rating_count are stored columns with indexes
+    ordering_fields = ['name', 'created_at', 'avg_rating', 'rating_count', 'trending']
     ordering = ['-created_at']  # Default ordering
+    max_page_size = 50
+    # Length of the daily series of the statistics action
+    STATISTICS_DAYS = 30
     
     def get_permissions(self):
         """
@@ -357,6 +516,75 @@ class ServiceViewSet(viewsets.ModelViewSet):
             
         serializer.save(business=user)
     
+    def get_list_validators(self, queryset):
+        # The cache generations also cover category and business renames
+        validators = super().get_list_validators(queryset)
+        validators['generations'] = generations(self.get_cache_scopes())
+        return validators
+    
+    def get_object_validators(self, instance):
+        validators = super().get_object_validators(instance)
+        validators['generations'] = generations(self.get_cache_scopes())
+        return validators
+    
+    @action(detail=False, methods=['get'], url_path='suggest')
+    def suggest(self, request):
+        """
+        Autocomplete for the search box: services, categories and businesses
+        whose names start with or closely resemble ?q=. Served from the
+        in-memory index in accounts.suggest, without a database query.
+        """
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            return Response(
+                {"error": "limit must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if limit < 1:
+            return Response(
+                {"error": "limit must be positive"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(suggest_index.suggest(query, limit))
+    
+    @action(detail=True, methods=['get'], url_path='similar')
+    def similar(self, request, pk=None):
+        """
+        Services most often inquired about or reviewed by the same
+        customers, most similar first, each with its similarity score.
+        Precomputed by the build_recommendations command and read with
+        one query on the (service, rank) index.
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), TOP_K)
+        except ValueError:
+            return Response(
+                {"error": "limit must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if limit < 1:
+            return Response(
+                {"error": "limit must be positive"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not str(pk).isdigit():
+            raise Http404
+        neighbours = list(
+            ServiceSimilarity.objects.filter(service_id=pk).select_related(
+                'similar__business', 'similar__category'
+            ).order_by('rank')[:limit]
+        )
+        if not neighbours and not Service.objects.filter(pk=pk).exists():
+            raise Http404
+        
+        data = self.get_serializer([neighbour.similar for neighbour in neighbours], many=True).data
+        for item, neighbour in zip(data, neighbours):
+            item['similarity'] = round(neighbour.score, 4)
+        return Response(data)
+    
     @action(detail=True, methods=['get'], url_path='check_verification')
     def check_verification(self, request, pk=None):
         """
@@ -419,6 +647,13 @@ class ServiceViewSet(viewsets.ModelViewSet):
         - Total bookings (inquiries)
         - Total reviews
         - Average rating
+        - Verified customers
+        - The same counts per service
+        - New bookings, reviews and verifications per day over the last
+          STATISTICS_DAYS days
+        
+        Every figure is read from counters maintained on write (see
+        accounts.business_stats): the totals are one primary key lookup.
         """
         if not request.user.is_business:
             return Response(
@@ -426,45 +661,59 @@ class ServiceViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Count active listings
-        active_listings = Service.objects.filter(business=request.user).count()
+        stats = BusinessStats.objects.filter(business=request.user).first() or BusinessStats(business=request.user)
         
-        # Count total inquiries
-        total_bookings = Inquiry.objects.filter(
-            service__business=request.user
-        ).count()
-        
-        # Count total reviews
-        reviews = Review.objects.filter(
-            service__business=request.user
+        services = Service.objects.filter(business=request.user).order_by('pk').values(
+            'id', 'name', 'inquiry_count', 'rating_count', 'avg_rating', 'verified_customer_count'
         )
-        total_reviews = reviews.count()
-        
-        # Calculate average rating across all services
-        avg_rating = 0
-        if total_reviews > 0:
-            avg_rating = reviews.aggregate(models.Avg('rating'))['rating__avg']
-            if avg_rating:
-                avg_rating = round(avg_rating, 1)
         
-        # Count verified customers
-        verified_customers_count = VerifiedServiceCustomer.objects.filter(
-            service__business=request.user
-        ).count()
+        # Days without activity have no row
+        today = timezone.localdate()
+        start = today - timedelta(days=self.STATISTICS_DAYS - 1)
+        days = {
+            row['day']: row for row in BusinessDailyStats.objects.filter(
+                business=request.user, day__gte=start
+            ).values('day', 'bookings', 'reviews', 'rating_sum', 'verified_customers')
+        }
+        daily = []
+        for offset in range(self.STATISTICS_DAYS):
+            day = start + timedelta(days=offset)
+            row = days.get(day, {})
+            reviews = row.get('reviews', 0)
+            daily.append({
+                'date': day.isoformat(),
+                'bookings': row.get('bookings', 0),
+                'reviews': reviews,
+                'avg_rating': round(row['rating_sum'] / reviews, 1) if reviews else 0,
+                'verified_customers': row.get('verified_customers', 0),
+            })
         
         return Response({
-            'active_listings': active_listings,
-            'total_bookings': total_bookings,
-            'total_reviews': total_reviews,
-            'avg_rating': avg_rating,
-            'verified_customers': verified_customers_count
+            'active_listings': stats.active_listings,
+            'total_bookings': stats.total_bookings,
+            'total_reviews': stats.total_reviews,
+            'avg_rating': stats.avg_rating,
+            'verified_customers': stats.verified_customers,
+            'services': [
+                {
+                    'id': service['id'],
+                    'name': service['name'],
+                    'bookings': service['inquiry_count'],
+                    'reviews': service['rating_count'],
+                    'avg_rating': service['avg_rating'],
+                    'verified_customers': service['verified_customer_count'],
+                }
+                for service in services
+            ],
+            'daily': daily,
         })
 
 
-class InquiryViewSet(viewsets.ModelViewSet):
+class InquiryViewSet(OptimizedQuerysetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for creating and managing inquiries.
     """
+    validator_related = {'messages': 'created_at'}
     queryset = Inquiry.objects.all()
     permission_classes = [permissions.IsAuthenticated]
     
@@ -547,10 +796,14 @@ class InquiryViewSet(viewsets.ModelViewSet):
         })
 
 
-class InquiryMessageViewSet(viewsets.ModelViewSet):
+class InquiryMessageViewSet(OptimizedQuerysetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for creating and listing messages within an inquiry.
     """
+    pagination_class = StandardCursorPagination
+    cursor_ordering = 'created_at'
+    max_page_size = 200  # short rows, fetched in bulk by chat views
+    validator_field = 'created_at'
     serializer_class = InquiryMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -650,12 +903,15 @@ class IsReviewCommentAllowed(permissions.BasePermission):
         return obj.author == request.user
 
 
-class ServiceReviewListView(generics.ListAPIView):
+class ServiceReviewListView(OptimizedQuerysetMixin, ConditionalGetMixin, generics.ListAPIView):
     """
     API endpoint for listing all reviews for a specific service.
     
     GET: Returns all reviews for the service specified in the URL.
     """
+    pagination_class = StandardCursorPagination
+    cursor_ordering = '-created_at'
+    validator_related = {'comments': 'updated_at'}
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ReviewSerializer
     
@@ -665,12 +921,15 @@ class ServiceReviewListView(generics.ListAPIView):
         return Review.objects.filter(service__id=service_id)
 
 
-class UserReviewListView(generics.ListAPIView):
+class UserReviewListView(OptimizedQuerysetMixin, ConditionalGetMixin, generics.ListAPIView):
     """
     API endpoint for listing all reviews by a specific user.
     
     GET: Returns all reviews written by the user specified in the URL.
     """
+    pagination_class = StandardCursorPagination
+    cursor_ordering = '-created_at'
+    validator_related = {'comments': 'updated_at'}
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ReviewSerializer
     
@@ -717,7 +976,7 @@ class ServiceReviewCreateView(generics.CreateAPIView):
         serializer.save(user=self.request.user, service=service)
 
 
-class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ReviewDetailView(OptimizedQuerysetMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API endpoint for retrieving, updating, and deleting a specific review.
     
@@ -725,6 +984,7 @@ class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
     PUT/PATCH: Update the review (only allowed for the review owner)
     DELETE: Delete the review (only allowed for the review owner)
     """
+    validator_related = {'comments': 'updated_at'}
     permission_classes = [permissions.IsAuthenticated, IsReviewOwner]
     serializer_class = ReviewSerializer
     lookup_url_kwarg = 'review_pk'
@@ -737,13 +997,15 @@ class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
         return Review.objects.all()
 
 
-class ReviewCommentListCreateView(generics.ListCreateAPIView):
+class ReviewCommentListCreateView(OptimizedQuerysetMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """
     API endpoint for listing and creating comments on a specific review.
     
     GET: List all comments for a review
     POST: Create a new comment (only allowed for service owners and moderators)
     """
+    pagination_class = StandardCursorPagination
+    cursor_ordering = 'created_at'
     permission_classes = [permissions.IsAuthenticated, IsReviewCommentAllowed]
     serializer_class = ReviewCommentSerializer
     
@@ -782,7 +1044,7 @@ class ReviewCommentListCreateView(generics.ListCreateAPIView):
         serializer.save(author=self.request.user, review=review)
 
 
-class ReviewCommentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ReviewCommentDetailView(OptimizedQuerysetMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API endpoint for managing a specific comment on a review.
     
@@ -805,13 +1067,14 @@ from django.shortcuts import get_object_or_404
 from rest_framework.exceptions import ValidationError
 
 
-class BlogCategoryViewSet(viewsets.ModelViewSet):
+class BlogCategoryViewSet(OptimizedQuerysetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for blog categories.
     
     Allows listing, creating, retrieving, updating, and deleting blog categories.
     Only moderators can create, update, or delete categories.
     """
+    validator_related = {'blog_posts': 'updated_at'}
     queryset = BlogCategory.objects.all()
     serializer_class = BlogCategorySerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -842,17 +1105,18 @@ class IsAuthorOrModeratorPermission(permissions.BasePermission):
         return obj.author == request.user or request.user.is_moderator
 
 
-class BlogPostViewSet(viewsets.ModelViewSet):
+class BlogPostViewSet(OptimizedQuerysetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for blog posts.
     
     Allows listing, creating, retrieving, updating, and deleting blog posts.
     Only the author or moderators can update or delete posts.
     """
+    validator_related = {'comments': 'updated_at'}
     permission_classes = [permissions.IsAuthenticated, IsAuthorOrModeratorPermission]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend]
+    filter_backends = [filters.SearchFilter, TrendingOrderingFilter, DjangoFilterBackend]
     search_fields = ['title', 'content', 'summary', 'author__username']
-    ordering_fields = ['created_at', 'updated_at', 'views']
+    ordering_fields = ['created_at', 'updated_at', 'views', 'trending']
     ordering = ['-created_at']
     filterset_fields = ['author', 'category', 'is_published']
     
@@ -878,6 +1142,13 @@ class BlogPostViewSet(viewsets.ModelViewSet):
             Q(is_published=True) | Q(author=user)
         )
     
+    def get_list_validators(self, queryset):
+        validators = super().get_list_validators(queryset)
+        if orders_by_trending(self.request):
+            # Refreshed scores reorder the list without touching the posts
+            validators['trending'] = generations([TRENDING])
+        return validators
+    
     def get_serializer_class(self):
         """
         Use different serializers for different actions
@@ -902,15 +1173,17 @@ class BlogPostViewSet(viewsets.ModelViewSet):
         # Only increment views for published posts and not from the author
         if instance.is_published and instance.author != request.user:
             instance.increment_views()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        # Views are saved without touching updated_at, so a 304 may carry
+        # a slightly older count
+        return super().retrieve(request, *args, **kwargs)
 
 
-class BlogPostBySlugView(generics.RetrieveAPIView):
+class BlogPostBySlugView(OptimizedQuerysetMixin, ConditionalGetMixin, generics.RetrieveAPIView):
     """
     API view for retrieving a blog post by its slug.
     This provides a more SEO-friendly URL for accessing posts.
     """
+    validator_related = {'comments': 'updated_at'}
     serializer_class = BlogPostDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
     lookup_field = 'slug'
@@ -934,14 +1207,16 @@ class BlogPostBySlugView(generics.RetrieveAPIView):
         # Only increment views for published posts and not from the author
         if instance.is_published and instance.author != request.user:
             instance.increment_views()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        # Views are saved without touching updated_at, so a 304 may carry
+        # a slightly older count
+        return super().retrieve(request, *args, **kwargs)
 
 
-class UserBlogPostListView(generics.ListAPIView):
+class UserBlogPostListView(OptimizedQuerysetMixin, ConditionalGetMixin, generics.ListAPIView):
     """
     API view for listing blog posts by a specific user.
     """
+    validator_related = {'comments': 'updated_at'}
     serializer_class = BlogPostListSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -966,10 +1241,12 @@ class UserBlogPostListView(generics.ListAPIView):
             return BlogPost.objects.filter(author=target_user, is_published=True)
 
 
-class BlogCommentListCreateView(generics.ListCreateAPIView):
+class BlogCommentListCreateView(OptimizedQuerysetMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """
     API view for listing and creating blog comments.
     """
+    pagination_class = StandardCursorPagination
+    cursor_ordering = 'created_at'
     serializer_class = BlogCommentSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -1008,7 +1285,7 @@ class BlogCommentListCreateView(generics.ListCreateAPIView):
         return super().get_serializer(*args, **kwargs)
 
 
-class BlogCommentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class BlogCommentDetailView(OptimizedQuerysetMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API view for retrieving, updating, or deleting a specific blog comment.
     """
@@ -1027,7 +1304,7 @@ class BlogCommentDetailView(generics.RetrieveUpdateDestroyAPIView):
         return comment
 
 
-class ModeratorListView(generics.ListAPIView):
+class ModeratorListView(OptimizedQuerysetMixin, generics.ListAPIView):
     """
     API endpoint for listing all moderators with their active inquiry counts.
     Excludes admin users from the list.
@@ -1059,7 +1336,7 @@ class ModeratorRequestView(generics.CreateAPIView):
         return inquiry
 
 
-class PaymentRequestListCreateView(generics.ListCreateAPIView):
+class PaymentRequestListCreateView(OptimizedQuerysetMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """
     API endpoint for listing and creating payment requests.
     
@@ -1101,7 +1378,7 @@ class PaymentRequestListCreateView(generics.ListCreateAPIView):
         serializer.save(creator=self.request.user)
 
 
-class PaymentRequestDetailView(generics.RetrieveAPIView):
+class PaymentRequestDetailView(OptimizedQuerysetMixin, ConditionalGetMixin, generics.RetrieveAPIView):
     """
     API endpoint for retrieving details of a payment request.
     
@@ -1128,7 +1405,7 @@ class PaymentRequestDetailView(generics.RetrieveAPIView):
         return PaymentRequest.objects.filter(recipient=user)
 
 
-class PendingPaymentRequestListView(generics.ListAPIView):
+class PendingPaymentRequestListView(OptimizedQuerysetMixin, ConditionalGetMixin, generics.ListAPIView):
     """
     API endpoint for listing pending payment requests for the authenticated user.
     
@@ -1166,6 +1443,7 @@ class PaymentRequestActionView(generics.GenericAPIView):
             
         return payment_request
     
+    @idempotent
     def post(self, request, *args, **kwargs):
         """Process the payment request action"""
         payment_request = self.get_object()
@@ -1185,7 +1463,7 @@ class PaymentRequestActionView(generics.GenericAPIView):
                     'message': 'Payment request accepted',
                     'transaction_id': str(transaction.transaction_id),
                     'amount': str(payment_request.amount),
-                    'new_balance': str(request.user.wallet.balance)
+                    'new_balance': str(request.user.wallet.total_balance)
                 })
             elif action == 'decline':
                 # Decline the payment request
@@ -1206,13 +1484,14 @@ class IsConversationParticipant(permissions.BasePermission):
         return user == obj.sender or user == obj.recipient
 
 
-class ConversationListCreateView(generics.ListCreateAPIView):
+class ConversationListCreateView(OptimizedQuerysetMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """
     API endpoint for listing and creating conversations.
     
     GET: Returns all conversations the authenticated user is a participant in.
     POST: Creates a new conversation with the authenticated user as the sender.
     """
+    validator_related = {'messages': 'created_at'}
     permission_classes = [permissions.IsAuthenticated]
     
     def get_serializer_class(self):
@@ -1225,7 +1504,11 @@ class ConversationListCreateView(generics.ListCreateAPIView):
         user = self.request.user
         return Conversation.objects.filter(
             Q(sender=user) | Q(recipient=user)
-        ).select_related('sender', 'recipient')
+        ).select_related('sender', 'recipient').annotate(
+            unread_for_user=related_count(
+                ConversationMessage.objects.filter(is_read=False).exclude(sender=user), 'conversation'
+            )
+        )
     
     def post(self, request, *args, **kwargs):
         """Create a new conversation with initial message"""
@@ -1242,12 +1525,13 @@ class ConversationListCreateView(generics.ListCreateAPIView):
         return Response(conversation_serializer.data, status=status.HTTP_201_CREATED)
 
 
-class ConversationDetailView(generics.RetrieveAPIView):
+class ConversationDetailView(OptimizedQuerysetMixin, ConditionalGetMixin, generics.RetrieveAPIView):
     """
     API endpoint for retrieving a specific conversation.
     
     GET: Returns the details of a conversation the user is a participant in.
     """
+    validator_related = {'messages': 'created_at'}
     serializer_class = ConversationSerializer
     permission_classes = [permissions.IsAuthenticated, IsConversationParticipant]
     lookup_field = 'conversation_id'
@@ -1258,7 +1542,11 @@ class ConversationDetailView(generics.RetrieveAPIView):
         user = self.request.user
         return Conversation.objects.filter(
             Q(sender=user) | Q(recipient=user)
-        ).select_related('sender', 'recipient')
+        ).select_related('sender', 'recipient').annotate(
+            unread_for_user=related_count(
+                ConversationMessage.objects.filter(is_read=False).exclude(sender=user), 'conversation'
+            )
+        )
 
 
 class ConversationActionView(generics.GenericAPIView):
@@ -1302,7 +1590,7 @@ class ConversationActionView(generics.GenericAPIView):
                     'transaction_id': str(transaction.transaction_id),
                     'amount': "5.00",  # Fixed 5€ fee
                     'conversation_id': str(conversation.conversation_id),
-                    'new_balance': str(conversation.sender.wallet.balance)
+                    'new_balance': str(conversation.sender.wallet.total_balance)
                 })
             elif action == 'deny':
                 # Deny the conversation request
@@ -1315,13 +1603,16 @@ class ConversationActionView(generics.GenericAPIView):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ConversationMessageListCreateView(generics.ListCreateAPIView):
+class ConversationMessageListCreateView(OptimizedQuerysetMixin, generics.ListCreateAPIView):
     """
     API endpoint for listing and creating messages within a conversation.
     
     GET: Returns all messages in a specific conversation.
     POST: Creates a new message in the conversation.
     """
+    pagination_class = StandardCursorPagination
+    cursor_ordering = 'created_at'
+    max_page_size = 200  # short rows, fetched in bulk by chat views
     serializer_class = ConversationMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -1413,13 +1704,14 @@ class UnreadConversationCountView(generics.GenericAPIView):
 
 
 # Support Ticket views
-class SupportTicketListCreateView(generics.ListCreateAPIView):
+class SupportTicketListCreateView(OptimizedQuerysetMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """
     API endpoint for listing and creating support tickets.
     
     GET: Returns all support tickets the authenticated user has access to.
     POST: Creates a new support ticket with an initial message.
     """
+    validator_related = {'messages': 'created_at'}
     permission_classes = [permissions.IsAuthenticated]
     
     def get_serializer_class(self):
@@ -1444,12 +1736,13 @@ class SupportTicketListCreateView(generics.ListCreateAPIView):
         # No need to return anything, serializer.data will be used in the response
 
 
-class SupportTicketDetailView(generics.RetrieveAPIView):
+class SupportTicketDetailView(OptimizedQuerysetMixin, ConditionalGetMixin, generics.RetrieveAPIView):
     """
     API endpoint for accessing a specific support ticket.
     
     GET: Returns details about a specific support ticket.
     """
+    validator_related = {'messages': 'created_at'}
     serializer_class = SupportTicketSerializer
     permission_classes = [permissions.IsAuthenticated]
     lookup_field = 'ticket_id'
@@ -1513,13 +1806,16 @@ class SupportTicketCloseView(generics.GenericAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class SupportMessageListCreateView(generics.ListCreateAPIView):
+class SupportMessageListCreateView(OptimizedQuerysetMixin, generics.ListCreateAPIView):
     """
     API endpoint for listing and creating support ticket messages.
     
     GET: Returns all messages in a support ticket.
     POST: Creates a new message in a support ticket.
     """
+    pagination_class = StandardCursorPagination
+    cursor_ordering = 'created_at'
+    max_page_size = 200  # short rows, fetched in bulk by chat views
     serializer_class = SupportMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Batch job benchmark for the item-to-item service recommendations.
+
+Generates --interactions random (customer, service) inquiries, with
+customer activity and service popularity both skewed like real traffic,
+and times the neighbour computation of accounts.recommendations. The
+interactions are generated in memory, so no database rows are needed.
+
+    python benchmarks/service_recommendations.py --interactions 1000000
+    python benchmarks/service_recommendations.py --python   # without NumPy
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from accounts import recommendations
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--interactions', type=int, default=1_000_000)
+    parser.add_argument('--customers', type=int, default=200_000)
+    parser.add_argument('--services', type=int, default=50_000)
+    parser.add_argument('--top-k', type=int, default=recommendations.TOP_K)
+    parser.add_argument('--python', action='store_true', help='Use the pure Python implementation')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(42)
+    customers = [int(args.customers * rng.random() ** 2) for _ in range(args.interactions)]
+    services = [int(args.services * rng.random() ** 3) for _ in range(args.interactions)]
+    weights = [1.0] * args.interactions
+
+    if args.python or recommendations.numpy is None:
+        compute, backend = recommendations.python_neighbours, "pure Python"
+    else:
+        compute, backend = recommendations.numpy_neighbours, "NumPy"
+
+    started = time.perf_counter()
+    neighbours = compute(customers, services, weights, top_k=args.top_k)
+    elapsed = time.perf_counter() - started
+    rows = sum(len(similar) for similar in neighbours.values())
+    print(
+        f"{backend}: {args.interactions} interactions, {len(neighbours)} services, "
+        f"{rows} similarity rows in {elapsed:.1f}s"
+    )
+
+
+if __name__ == '__main__':
+    main()
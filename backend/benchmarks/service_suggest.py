@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Autocomplete benchmark for the in-memory suggestion index.
+
+Fills a SuggestIndex with --services random service names (plus categories
+and business usernames) and times suggest() for prefix and misspelt
+queries. The index is filled directly, so no database rows are needed.
+
+    python benchmarks/service_suggest.py --services 500000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from accounts.models import CatalogChange
+from accounts.suggest import SuggestIndex
+
+WORDS = (
+    "home garden window cleaning plumbing repair electrical painting roofing moving "
+    "tutoring catering photography wedding event dog walking grooming fitness yoga "
+    "massage beauty hair nails carpet laundry ironing delivery courier furniture "
+    "assembly kitchen bathroom renovation tiling flooring heating boiler solar "
+    "security locksmith computer phone design website marketing accounting legal"
+).split()
+
+QUERIES = ['p', 'plu', 'wedding ph', 'plumbng', 'fotography', 'kichen renovaton', 'lock']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--services', type=int, default=500_000)
+    parser.add_argument('--businesses', type=int, default=20_000)
+    parser.add_argument('--repeat', type=int, default=200, help='Runs per query')
+    parser.add_argument('--limit', type=int, default=10)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(42)
+    index = SuggestIndex()
+
+    started = time.perf_counter()
+    for pk in range(args.services):
+        index.add((CatalogChange.Kind.SERVICE, pk), ' '.join(rng.sample(WORDS, 3)).title())
+    for pk, word in enumerate(WORDS):
+        index.add((CatalogChange.Kind.CATEGORY, pk), word.title())
+    for pk in range(args.businesses):
+        index.add((CatalogChange.Kind.BUSINESS, pk), f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{pk}")
+    index.version = 0
+    print(f"Indexed {len(index.labels)} labels in {time.perf_counter() - started:.1f}s")
+
+    print(f"\n  {'query':<20} {'median':>10} {'p99':>10}  top hit")
+    for query in QUERIES:
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            results = index.suggest(query, args.limit)
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        top = results[0]['label'] if results else '-'
+        print(f"  {query:<20} {statistics.median(samples):7.3f} ms {samples[int(len(samples) * 0.99)]:7.3f} ms  {top}")
+
+
+if __name__ == '__main__':
+    main()
@@ -188,6 +188,12 @@ WHITENOISE_AUTOREFRESH = True
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Uploads are stored once per distinct content, named by hash (see accounts.storage)
+STORAGES = {
+    "default": {"BACKEND": "accounts.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -224,10 +230,59 @@ REST_FRAMEWORK = {
         "rest_framework.filters.SearchFilter",
         "rest_framework.filters.OrderingFilter",
     ],
+    # See accounts.pagination; views set max_page_size to cap ?page_size=
+    "DEFAULT_PAGINATION_CLASS": "accounts.pagination.StandardPagination",
+    "PAGE_SIZE": int(os.environ.get("API_PAGE_SIZE", 20)),
 }
 
+# While on, list requests without page parameters still get the full,
+# unpaginated list. Turn off once every client sends ?page= or ?cursor=.
+PAGINATION_TRANSITION = os.environ.get("PAGINATION_TRANSITION", "true").lower() == "true"
+
 AUTH_USER_MODEL = "accounts.User"
 
+# Full-text search backend for services (dotted path to an accounts.search
+# backend). None picks MySQL FULLTEXT or SQLite FTS5 for the database in use.
+SERVICE_SEARCH_BACKEND = os.environ.get("SERVICE_SEARCH_BACKEND") or None
+
+# Caches. Service responses are cached under generation counters that every
+# worker must share, so production should set CACHE_URL to a Redis server
+# (needs the redis package); the default is a per-process local-memory cache.
+CACHE_URL = os.environ.get("CACHE_URL")
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Seconds a stored Idempotency-Key response is replayed before it may be
+# purged (see accounts.idempotency)
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+
+# Seconds a cached ServiceViewSet list/retrieve response is kept (0 disables
+# the cache, see accounts.response_cache). Off by default without CACHE_URL:
+# other workers would not see a local-memory cache's invalidations.
+SERVICE_CACHE_TIMEOUT = int(os.environ.get("SERVICE_CACHE_TIMEOUT", 300 if CACHE_URL else 0))
+
+# How often each worker applies catalog changes to its in-memory
+# autocomplete index (accounts.suggest)
+SUGGEST_REFRESH_SECONDS = float(os.environ.get("SUGGEST_REFRESH_SECONDS", 2))
+# Seconds after which a catalog change is assumed committed, so the index
+# stops re-reading the ids below it
+SUGGEST_SETTLE_SECONDS = float(os.environ.get("SUGGEST_SETTLE_SECONDS", 60))
+
+# Hours after which an inquiry, review, comment or view counts half as much
+# towards the trending scores (accounts.trending)
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get("TRENDING_HALF_LIFE_HOURS", 48))
+
 # Configure logging
 LOGGING = {
     "version": 1,
@@ -10,4 +10,13 @@ DATABASES = {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": ":memory:",
     }
-}
\ No newline at end of file
+}
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# The cache outlives each test's rolled-back transaction, so responses are
+# only cached by the tests that enable it and clear the cache
+SERVICE_CACHE_TIMEOUT = 0
@@ -26,6 +26,7 @@ from django.shortcuts import redirect
 from django.contrib.auth.views import LoginView
 
 from accounts.admin_dashboard import DashboardAdmin, Dashboard
+from accounts.storage import serve_media
 
 # Health check endpoint for Railway deployment
 def health_check(request):
@@ -329,6 +330,7 @@ urlpatterns = [
     path("admin/api/services/", dashboard_admin.api_services, name="accounts_api_services"),
 ]
 
-# Serve media and static files (both in development and production for Railway)
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Serve media and static files (both in development and production for Railway).
+# Content-addressed media is served with immutable cache headers.
+urlpatterns += static(settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT)
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
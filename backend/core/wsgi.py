@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# Build the autocomplete index up front and keep it in sync with the catalog
+from accounts.suggest import start_refresher  # noqa: E402
+
+start_refresher()
@@ -43,5 +43,12 @@ if [ "${GENERATE_DEMO_DATA:-false}" = "true" ]; then
     python generate_demo_data.py
 fi
 
+# Render queued image variants (accounts.images) next to the web server,
+# restarting the worker if it exits
+if [ "${RUN_IMAGE_WORKER:-false}" = "true" ]; then
+    echo "Starting image worker..."
+    (while true; do python manage.py process_images --workers "${IMAGE_WORKERS:-1}"; sleep 5; done) &
+fi
+
 # Execute the command passed to the script
 exec "$@"
\ No newline at end of file